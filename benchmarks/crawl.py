@@ -0,0 +1,120 @@
+"""
+Measures the GitHub crawl (repo sync plus `refresh`) against the local stand-in.
+
+    python -m benchmarks.crawl --repos 500 --concurrency 1,4,8,16 --latency 0.05 --fail-every 50
+
+Every run starts from an empty database and HTTP cache, so runs with the same
+options make the same requests and can be compared between versions.
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+import click
+from rich import print
+from rich.table import Table
+
+from benchmarks.run import git_revision
+from benchmarks.standin import StandinServer, SyntheticBackend
+from benchmarks.synthetic import generate_org
+from consolebot import refresh
+from consolebot.githubdata import GithubData
+from consolebot.httpcache import ResponseCache
+from consolebot.ratelimit import RateLimiter
+
+
+@contextlib.contextmanager
+def isolated_github_data(api_url, state_dir, rate_limiter, token="standin-token"):
+    """Points GithubData at `api_url`, with its database, caches and a copy of `token` under `state_dir`."""
+    token_path = os.path.join(state_dir, "token")
+    with open(token_path, "w") as file:
+        file.write(token)
+    with contextlib.ExitStack() as stack:
+        for attribute, value in (
+            ("API_URL", api_url),
+            ("BASE_URL", f"{api_url}/orgs/{GithubData.ORG_NAME}/repos"),
+            ("DB_PATH", os.path.join(state_dir, "consolebot.db")),
+            ("LEGACY_DATA_PATH", os.path.join(state_dir, "repos.json")),
+            ("TOKEN_PATH", token_path),
+            ("response_cache", ResponseCache(os.path.join(state_dir, "http-cache"))),
+            ("rate_limiter", rate_limiter),
+            ("_session", None),
+            ("_store", None),
+            ("_formatted_repos_cache", None),
+        ):
+            stack.enter_context(patch.object(GithubData, attribute, value))
+        try:
+            yield GithubData
+        finally:
+            if GithubData._store is not None:  # Closed before the patches restore the real store
+                GithubData._store.close()
+
+
+def crawl(server, concurrency, repeat_refresh=False, graphql=False):
+    """Runs a full sync and a refresh against `server`, returning timings and request counts."""
+    rate_limiter = RateLimiter()
+    with tempfile.TemporaryDirectory() as state_dir, \
+            isolated_github_data(server.base_url, state_dir, rate_limiter) as data_source, \
+            contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        data_source.sync_repos(full=True)
+        synced = time.perf_counter()
+        refresh.refresh_repo_details(concurrency=concurrency, data_source=data_source, graphql=graphql)
+        refreshed = time.perf_counter()
+        result = {
+            "concurrency": concurrency,
+            "sync_seconds": round(synced - start, 3),
+            "refresh_seconds": round(refreshed - synced, 3),
+        }
+        if repeat_refresh:
+            # Everything is cached now, so this measures conditional requests
+            refresh.refresh_repo_details(concurrency=concurrency, data_source=data_source, graphql=graphql)
+            result["cached_refresh_seconds"] = round(time.perf_counter() - refreshed, 3)
+        result.update(rate_limiter.stats())
+    return result
+
+
+@click.command()
+@click.option("--repos", default=200, show_default=True, help="Repositories in the synthetic org.")
+@click.option("--concurrency", default="1,4,8,16", show_default=True, help="Comma separated refresh concurrency levels.")
+@click.option("--latency", default=0.02, show_default=True, help="Seconds the stand-in adds to every response.")
+@click.option("--fail-every", default=0, show_default=True, help="Have the stand-in answer every Nth request with a 429.")
+@click.option("--retry-after", default=0, show_default=True, help="Retry-After of those 429s, in seconds.")
+@click.option("--cached", is_flag=True, help="Also time a second refresh, answered with 304s.")
+@click.option("--graphql", is_flag=True, help="Refresh languages, READMEs and commits with batched GraphQL queries.")
+@click.option("--output", type=click.Path(dir_okay=False), help="Also write the results as JSON.")
+def main(repos, concurrency, latency, fail_every, retry_after, cached, graphql, output):
+    """Measure crawl throughput and retry behavior against a local GitHub stand-in."""
+    backend = SyntheticBackend(generate_org(repos))
+    results = []
+    for level in (int(level) for level in concurrency.split(",")):
+        server = StandinServer(backend, latency=latency, fail_every=fail_every, retry_after=retry_after).start()
+        try:
+            result = crawl(server, level, repeat_refresh=cached, graphql=graphql)
+        finally:
+            server.stop()
+        result.update(server_requests=server.stats["requests"], server_429s=server.stats["throttled"],
+                      server_304s=server.stats["not_modified"])
+        results.append(result)
+
+    table = Table(title=f"{'GraphQL c' if graphql else 'C'}rawl of {repos} repositories, {latency * 1000:.0f}ms latency")
+    columns = ["concurrency", "sync_seconds", "refresh_seconds"] + (["cached_refresh_seconds"] if cached else []) + \
+        ["server_requests", "server_429s", "server_304s", "retries", "throttled_seconds"]
+    for column in columns:
+        table.add_column(column.replace("_", " ").capitalize(), justify="right")
+    for result in results:
+        table.add_row(*(str(result[column]) for column in columns))
+    print(table)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({"version": git_revision(), "repos": repos, "latency": latency, "fail_every": fail_every,
+                       "graphql": graphql, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
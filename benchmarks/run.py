@@ -0,0 +1,270 @@
+"""
+Benchmarks the query pipeline against synthetic organizations.
+
+    python -m benchmarks.run --sizes 100,1000,10000
+    python -m benchmarks.run --baseline benchmarks/results/<earlier revision>.json
+
+Results are written as JSON to benchmarks/results/<git revision>.json, so runs
+from different versions can be compared with --baseline.
+"""
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import click
+from rich import print
+from rich.table import Table
+
+from benchmarks.synthetic import QUERY_LENGTHS, SyntheticGithubData, generate_org, generate_queries
+from consolebot import query
+from consolebot.embeddings import RepoEmbeddings
+from consolebot.repoindex import RepoNameIndex
+from consolebot.summaries import SummaryCache
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = "100,1000,10000"
+MEMORY_SAMPLES = 10  # Calls re-run under tracemalloc, which is too slow to trace every call
+SUMMARY_SAMPLES = 20
+REGRESSION_THRESHOLD = 1.2  # Slowdown ratio flagged as a regression
+MIN_REGRESSION_MS = 0.05  # Ignore slowdowns smaller than timer noise
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(timings_ns, peak_bytes, correct=None):
+    timings = sorted(ns / 1e6 for ns in timings_ns)
+    result = {
+        "count": len(timings),
+        "mean_ms": round(sum(timings) / len(timings), 4) if timings else 0.0,
+        "p50_ms": round(percentile(timings, 50), 4),
+        "p90_ms": round(percentile(timings, 90), 4),
+        "p99_ms": round(percentile(timings, 99), 4),
+        "max_ms": round(timings[-1], 4) if timings else 0.0,
+        "peak_memory_kib": round(peak_bytes / 1024, 1),
+    }
+    if correct is not None:
+        result["accuracy"] = round(correct / len(timings), 3) if timings else 0.0
+    return result
+
+
+def measure(stage, inputs, expected=None):
+    """
+    Times `stage` on every input, then re-runs a sample under tracemalloc for its peak memory.
+
+    Args:
+        stage: Function called with each input.
+        inputs (list): Inputs to call the stage with.
+        expected (list): What each call should return, to report accuracy.
+    """
+    timings = []
+    correct = 0
+    for i, item in enumerate(inputs):
+        start = time.perf_counter_ns()
+        result = stage(item)
+        timings.append(time.perf_counter_ns() - start)
+        if expected is not None and result == expected[i]:
+            correct += 1
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for item in inputs[:MEMORY_SAMPLES]:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            stage(item)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return summarize(timings, peak, correct if expected is not None else None)
+
+
+def _best_match(top_matches):
+    return top_matches[0][0]  # Never prompt while benchmarking
+
+
+def _resolve_repo(text):
+    try:
+        return query.determine_repo_name(text, _best_match)
+    except query.RepoNotFoundException:
+        return None
+
+
+def models_available():
+    try:
+        query.sbert_model()
+        query.summarizer_model()
+        return True
+    except Exception as e:
+        print(f"[yellow]Models could not be loaded, skipping the stages that need them: {e}[/yellow]")
+        return False
+
+
+@contextlib.contextmanager
+def synthetic_environment(org, use_models, cache_dir):
+    """Points the query module at a synthetic org, with the summary and embedding caches in `cache_dir`."""
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patch.object(query, "cached_github_data", org))
+        stack.enter_context(patch.object(query, "data_source", SyntheticGithubData))
+        stack.enter_context(patch.object(query, "summary_cache", SummaryCache(os.path.join(cache_dir, "summaries.json"))))
+        if use_models:
+            embeddings = RepoEmbeddings.build(query.sbert_model(), org, query.MODEL_NAME, cache_dir)
+            stack.enter_context(patch.object(query, "repo_embeddings", lambda: embeddings))
+        else:
+            stack.enter_context(patch.object(query, "match_repo_description", lambda *args, **kwargs: None))
+        # The pipeline prints progress messages, which would swamp the report
+        devnull = stack.enter_context(open(os.devnull, "w"))
+        stack.enter_context(contextlib.redirect_stdout(devnull))
+        query.repo_name_index()  # Built once per org and measured on its own, keep it out of the first query
+        yield
+
+
+def benchmark_org(size, queries_per_length, seed, use_models):
+    """Runs every stage against one synthetic org, returning stage name to statistics."""
+    org = generate_org(size, seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results["RepoNameIndex build"] = measure(lambda _: RepoNameIndex(org), list(range(5)))
+        if use_models:
+            model = query.sbert_model()
+            results["RepoEmbeddings build"] = measure(
+                lambda i: RepoEmbeddings.build(model, org, query.MODEL_NAME, os.path.join(cache_dir, f"build-{i}")), [0])
+
+        with synthetic_environment(org, use_models, cache_dir):
+            for length in QUERY_LENGTHS:
+                corpus = generate_queries(org, queries_per_length, length, seed)
+                texts = [item["query"] for item in corpus]
+                results[f"determine_repo_name[{length}]"] = measure(_resolve_repo, texts, [item["repo"] for item in corpus])
+                results[f"generate_combinations[{length}]"] = measure(query.generate_combinations, texts)
+                results[f"determine_intent[{length}]"] = measure(
+                    lambda item: query.determine_intent(item["query"], item["repo"], query.INTENTS), corpus,
+                    [item["intent"] for item in corpus])
+                if use_models:
+                    results[f"infer_intent[{length}]"] = measure(
+                        lambda item: query.infer_intent(item["query"], item["repo"]), corpus,
+                        [item["intent"] for item in corpus])
+
+            names = list(org)[:SUMMARY_SAMPLES]
+            if use_models:
+                results["get_summary[uncached]"] = measure(lambda name: query.get_summary(name, save=False), names)
+            else:
+                for name in names:
+                    query.summary_cache.put(name, org[name]["readme_sha"], org[name]["description"])
+            results["get_summary[cached]"] = measure(lambda name: query.get_summary(name, save=False), names)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares the p50 and p90 latencies of two result files.
+
+    Returns:
+        (size, stage, baseline p50, current p50, p50 ratio, regressed) rows for every stage in both.
+    """
+    rows = []
+    for size, stages in current["results"].items():
+        for stage, stats in stages.items():
+            before = baseline["results"].get(size, {}).get(stage)
+            if before is None:
+                continue
+            regressed = False
+            for key in ("p50_ms", "p90_ms"):
+                if stats[key] - before[key] > MIN_REGRESSION_MS and stats[key] > before[key] * threshold:
+                    regressed = True
+            ratio = stats["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+            rows.append((size, stage, before["p50_ms"], stats["p50_ms"], ratio, regressed))
+    return rows
+
+
+def render_results(results):
+    table = Table(title="Query pipeline benchmarks")
+    for column in ("Repos", "Stage", "p50 ms", "p90 ms", "p99 ms", "Max ms", "Peak KiB", "Accuracy"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for size, stages in results["results"].items():
+        for stage, stats in stages.items():
+            accuracy = stats.get("accuracy")
+            table.add_row(size, stage, f"{stats['p50_ms']:.3f}", f"{stats['p90_ms']:.3f}", f"{stats['p99_ms']:.3f}",
+                          f"{stats['max_ms']:.3f}", f"{stats['peak_memory_kib']:.1f}",
+                          "" if accuracy is None else f"{accuracy:.0%}")
+    return table
+
+
+def render_comparison(rows, baseline_version, current_version):
+    table = Table(title=f"{current_version} against {baseline_version}")
+    for column in ("Repos", "Stage", "Before p50 ms", "After p50 ms", "Ratio"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for size, stage, before, after, ratio, regressed in rows:
+        style = "bold red" if regressed else ("green" if ratio < 1 / REGRESSION_THRESHOLD else None)
+        table.add_row(size, stage, f"{before:.3f}", f"{after:.3f}", f"{ratio:.2f}x", style=style)
+    return table
+
+
+@click.command()
+@click.option("--sizes", default=DEFAULT_SIZES, show_default=True, help="Comma separated org sizes, in repositories.")
+@click.option("--queries", "queries_per_length", default=50, show_default=True, help="Queries per query length.")
+@click.option("--seed", default=0, show_default=True, help="Seed for the synthetic orgs and queries.")
+@click.option("--models/--no-models", default=True, help="Also run the stages that need the SBERT and summarizer models.")
+@click.option("--output", type=click.Path(dir_okay=False), help="Where to write the results [default: benchmarks/results/<git revision>.json].")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), help="Earlier results to compare against.")
+@click.option("--fail-on-regression", is_flag=True, help="Exit with status 1 if any stage regressed against the baseline.")
+def main(sizes, queries_per_length, seed, models, output, baseline, fail_on_regression):
+    """Benchmark the query pipeline against synthetic organizations."""
+    use_models = models and models_available()
+    results = {
+        "version": git_revision(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "queries_per_length": queries_per_length,
+        "models": use_models,
+        "results": {},
+    }
+    for size in (int(size) for size in sizes.split(",")):
+        print(f"Benchmarking an org of {size} repositories...")
+        results["results"][str(size)] = benchmark_org(size, queries_per_length, seed, use_models)
+    results["peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output = output or os.path.join(RESULTS_DIR, f"{results['version']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(render_results(results))
+    print(f"Results written to {output}")
+
+    if baseline:
+        with open(baseline) as file:
+            earlier = json.load(file)
+        if earlier.get("models") != use_models or earlier.get("queries_per_length") != queries_per_length:
+            print("[yellow]The baseline was run with different settings, so stages may not be comparable.[/yellow]")
+        rows = compare(earlier, results)
+        print(render_comparison(rows, earlier.get("version"), results["version"]))
+        if fail_on_regression and any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
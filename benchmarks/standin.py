@@ -0,0 +1,403 @@
+"""
+A local stand-in for the parts of the GitHub REST API consolebot uses.
+
+    python -m benchmarks.standin serve --synthetic 1000 --latency 0.05 --fail-every 20
+    python -m benchmarks.standin record cassette.json
+    python -m benchmarks.standin serve --replay cassette.json
+    CONSOLEBOT_GITHUB_API_URL=http://127.0.0.1:8765 python consolebot.py refresh
+
+The server answers from a synthetic org or from responses recorded against
+the real API. It paginates with Link headers, sends rate-limit headers,
+answers If-None-Match with 304, and can add latency and 429 responses.
+A synthetic org also answers the GraphQL repository metadata query.
+"""
+import base64
+import collections
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import click
+import requests
+from rich import print
+
+from benchmarks.synthetic import generate_org
+
+GITHUB_API_URL = "https://api.github.com"
+ORG_NAME = "RedHatInsights"
+DEFAULT_PORT = 8765
+RATE_LIMIT = 5000  # Requests per hour for an authenticated user
+RATE_LIMIT_WINDOW = 3600
+# How the metadata query asks for each repository, as `alias: repository(owner: $owner, name: $variable)`
+GRAPHQL_REPOSITORY = re.compile(r"(\w+): repository\(owner: \$owner, name: \$(\w+)\)")
+# Response headers worth recording, the rest are per-request noise
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+def request_key(url):
+    """Canonical key of a request: its path and sorted query, without the host."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query)))
+    return f"{parts.path}?{query}" if query else parts.path
+
+
+class Cassette:
+    """Recorded GitHub API responses, keyed by `request_key`, stored as JSON."""
+
+    def __init__(self, interactions=None):
+        self.interactions = interactions or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as file:
+            return cls(json.load(file)["interactions"])
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version": 1, "interactions": self.interactions}, file)
+        os.replace(tmp_path, path)
+
+    def record(self, url, response):
+        headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        with self._lock:
+            self.interactions[request_key(url)] = {"status": response.status_code, "headers": headers, "body": response.text}
+
+    def get(self, key):
+        return self.interactions.get(key)
+
+
+class RecordingSession(requests.Session):
+    """A session that records every response it receives into a cassette. Request headers, and so tokens, are never recorded."""
+
+    def __init__(self, cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def get(self, url, **kwargs):
+        response = super().get(url, **kwargs)
+        if response.status_code != 304:  # A 304 has no body worth replaying
+            self.cassette.record(url, response)
+        return response
+
+
+class ReplayBackend:
+    """Answers requests from a cassette, pointing the recorded API URLs at the stand-in."""
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    def respond(self, path, query, base_url):
+        interaction = self.cassette.get(request_key(f"{path}?{urlencode(query)}"))
+        if interaction is None:
+            return 404, {}, {"message": "Not recorded"}
+        headers = {name: value.replace(GITHUB_API_URL, base_url) for name, value in interaction["headers"].items()}
+        return interaction["status"], headers, interaction["body"].replace(GITHUB_API_URL, base_url)
+
+
+class SyntheticBackend:
+    """Answers requests from a synthetic org, shaped like the GitHub API responses consolebot reads."""
+
+    DEFAULT_PER_PAGE = 30
+    MAX_PER_PAGE = 100
+
+    def __init__(self, org, org_name=ORG_NAME, commits_per_repo=60, seed=0):
+        self.org = org
+        self.org_name = org_name
+        self.repos = []
+        rng = random.Random(f"standin-{len(org)}-{seed}")
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        for repo_id, (name, repo) in enumerate(org.items(), start=1):
+            updated_at = start + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            self.repos.append({"id": repo_id, "name": name, "description": repo["description"],
+                               "updated_at": updated_at.strftime("%Y-%m-%dT%H:%M:%SZ")})
+        self.commits = {
+            name: [
+                {"sha": hashlib.sha1(f"{name}-{i}".encode()).hexdigest(),
+                 "commit": {"message": f"Change {i} to {name}",
+                            "committer": {"name": rng.choice(repo["contributors"])["login"],
+                                          "date": (start - datetime.timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ")}}}
+                for i in range(commits_per_repo)
+            ]
+            for name, repo in org.items()
+        }
+
+    def _repo_json(self, repo, base_url):
+        repo_url = f"{base_url}/repos/{self.org_name}/{repo['name']}"
+        return {
+            **repo,
+            "full_name": f"{self.org_name}/{repo['name']}",
+            "url": repo_url,
+            "contents_url": f"{repo_url}/contents/{{+path}}",
+            "contributors_url": f"{repo_url}/contributors",
+            "languages_url": f"{repo_url}/languages",
+            "commits_url": f"{repo_url}/commits{{/sha}}",
+        }
+
+    def _page(self, items, path, query, base_url):
+        per_page = min(int(query.get("per_page", self.DEFAULT_PER_PAGE)), self.MAX_PER_PAGE)
+        page = max(int(query.get("page", 1)), 1)
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        links = []
+        for rel, number in (("next", page + 1), ("last", last)):
+            if page < last:
+                links.append(f'<{base_url}{path}?{urlencode({**query, "page": number})}>; rel="{rel}"')
+        headers = {"Link": ", ".join(links)} if links else {}
+        return 200, headers, items[(page - 1) * per_page:page * per_page]
+
+    def respond(self, path, query, base_url):
+        parts = path.strip("/").split("/")
+        if parts == ["orgs", self.org_name, "repos"]:
+            repos = self.repos
+            if query.get("sort") == "updated":
+                repos = sorted(repos, key=lambda repo: repo["updated_at"], reverse=query.get("direction", "desc") == "desc")
+            return self._page([self._repo_json(repo, base_url) for repo in repos], path, query, base_url)
+
+        if len(parts) < 4 or parts[:2] != ["repos", self.org_name] or parts[2] not in self.org:
+            return 404, {}, {"message": "Not Found"}
+        repo = self.org[parts[2]]
+        resource, rest = parts[3], parts[4:]
+        if resource == "contents" and not rest:
+            return 200, {}, [
+                {"name": "README.md", "path": "README.md", "type": "file", "sha": repo["readme_sha"]},
+                {"name": "Makefile", "path": "Makefile", "type": "file", "sha": hashlib.sha1(parts[2].encode()).hexdigest()},
+            ]
+        if resource == "contents" and rest == ["README.md"]:
+            return 200, {}, {"name": "README.md", "sha": repo["readme_sha"], "encoding": "base64",
+                             "content": base64.b64encode(repo["readme"].encode("utf-8")).decode("ascii")}
+        if resource == "readme" and not rest:
+            # Served as application/vnd.github.raw, the only way consolebot asks for it
+            return 200, {"Content-Type": "application/vnd.github.raw; charset=utf-8"}, repo["readme"]
+        if resource == "contributors":
+            counts = collections.Counter(c["login"] for c in repo["contributors"])
+            contributors = [{"login": login, "contributions": count} for login, count in counts.most_common()]
+            return self._page(contributors, path, query, base_url)
+        if resource == "languages":
+            return 200, {}, repo["languages"]
+        if resource == "commits":
+            commits = self.commits[parts[2]]
+            if "since" in query:
+                commits = [commit for commit in commits if commit["commit"]["committer"]["date"] >= query["since"]]
+            if "until" in query:
+                commits = [commit for commit in commits if commit["commit"]["committer"]["date"] <= query["until"]]
+            return self._page(commits, path, query, base_url)
+        return 404, {}, {"message": "Not Found"}
+
+    def graphql(self, request):
+        """Answers the repository metadata query GithubData.get_repos_metadata sends."""
+        variables = request.get("variables") or {}
+        data, errors = {}, []
+        for alias, variable in GRAPHQL_REPOSITORY.findall(request.get("query", "")):
+            name = variables.get(variable)
+            if name not in self.org:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias],
+                               "message": f"Could not resolve to a Repository with the name '{self.org_name}/{name}'."})
+                continue
+            data[alias] = self._metadata_node(name, variables.get("commits", 30), variables.get("languages", 100))
+        return 200, {}, {"data": data, **({"errors": errors} if errors else {})}
+
+    def _metadata_node(self, name, commits, languages):
+        repo = self.org[name]
+        sizes = sorted(repo["languages"].items(), key=lambda item: item[1], reverse=True)[:languages]
+        return {
+            "name": name,
+            "description": repo["description"],
+            "languages": {"edges": [{"size": size, "node": {"name": language}} for language, size in sizes]},
+            "readme_md": {"oid": repo["readme_sha"], "text": repo["readme"]},
+            "readme_adoc": None,
+            "readme_rst": None,
+            "readme_txt": None,
+            "defaultBranchRef": {"target": {"history": {"nodes": [
+                {"oid": commit["sha"], "committedDate": commit["commit"]["committer"]["date"],
+                 "message": commit["commit"]["message"], "committer": {"name": commit["commit"]["committer"]["name"]}}
+                for commit in self.commits[name][:commits]
+            ]}}},
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like api.github.com
+
+    def do_GET(self):
+        self._send(*self.server.respond(self.path, self.headers))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(*self.server.respond(self.path, self.headers, body))
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinServer(ThreadingHTTPServer):
+    """
+    Serves a backend over HTTP with GitHub's rate limiting and some injectable trouble.
+
+    Args:
+        backend: A SyntheticBackend or ReplayBackend.
+        latency (float): Seconds added to every response.
+        fail_every (int): Answer every Nth request with a 429, 0 to never do so.
+        retry_after (float): Retry-After sent with those 429s.
+        rate_limit (int): Requests allowed per window before answering 403 with no remaining budget.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, backend, host="127.0.0.1", port=0, latency=0.0, fail_every=0, retry_after=1, rate_limit=RATE_LIMIT):
+        super().__init__((host, port), _Handler)
+        self.backend = backend
+        self.latency = latency
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.reset_at = int(time.time()) + RATE_LIMIT_WINDOW
+        self.used = 0  # Requests counted against the rate limit
+        self.stats = {"requests": 0, "not_modified": 0, "throttled": 0, "rate_limited": 0, "not_found": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves from a background thread, returning the server."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def _rate_limit_headers(self):
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(self.rate_limit - self.used, 0)),
+            "X-RateLimit-Reset": str(self.reset_at),
+            "X-RateLimit-Used": str(self.used),
+        }
+
+    def respond(self, raw_path, request_headers, request_body=None):
+        """Returns the status, headers and body for a GET, or for a POST of `request_body`."""
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(raw_path)
+        query = dict(parse_qsl(parts.query))
+
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.fail_every and self.stats["requests"] % self.fail_every == 0:
+                self.stats["throttled"] += 1
+                return self._json(429, {"Retry-After": str(self.retry_after)}, {"message": "You have exceeded a secondary rate limit."})
+            if self.used >= self.rate_limit:
+                self.stats["rate_limited"] += 1
+                return self._json(403, self._rate_limit_headers(), {"message": "API rate limit exceeded"})
+            self.used += 1
+
+        if request_body is not None:
+            if parts.path != "/graphql" or not hasattr(self.backend, "graphql"):
+                return self._json(404, self._rate_limit_headers(), {"message": "Not Found"})
+            status, headers, body = self.backend.graphql(json.loads(request_body))
+            return self._json(status, {**headers, **self._rate_limit_headers()}, body)
+
+        status, headers, body = self.backend.respond(parts.path, query, self.base_url)
+        body = body if isinstance(body, str) else json.dumps(body)
+        etag = headers.get("ETag") or f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'
+        with self._lock:
+            if status == 404:
+                self.stats["not_found"] += 1
+            if status == 200 and request_headers.get("If-None-Match") == etag:
+                self.used -= 1  # Conditional hits do not count against the rate limit
+                self.stats["not_modified"] += 1
+                return 304, {"ETag": etag, **self._rate_limit_headers()}, b""
+            rate_limit_headers = self._rate_limit_headers()
+        headers = {"Content-Type": "application/json; charset=utf-8", **headers, "ETag": etag, **rate_limit_headers}
+        return status, headers, body.encode("utf-8")
+
+    def _json(self, status, headers, body):
+        return status, {"Content-Type": "application/json; charset=utf-8", **headers}, json.dumps(body).encode("utf-8")
+
+
+@click.group()
+def cli():
+    """Serve a stand-in GitHub API, or record one to replay."""
+
+
+@cli.command()
+@click.option("--port", default=DEFAULT_PORT, show_default=True)
+@click.option("--synthetic", "synthetic_size", type=int, help="Serve a synthetic org of this many repositories.")
+@click.option("--replay", "cassette_path", type=click.Path(exists=True, dir_okay=False), help="Serve responses recorded with `record`.")
+@click.option("--latency", default=0.0, show_default=True, help="Seconds added to every response.")
+@click.option("--fail-every", default=0, show_default=True, help="Answer every Nth request with a 429.")
+@click.option("--retry-after", default=1, show_default=True, help="Retry-After of those 429s, in seconds.")
+@click.option("--rate-limit", default=RATE_LIMIT, show_default=True, help="Requests allowed before answering 403.")
+def serve(port, synthetic_size, cassette_path, latency, fail_every, retry_after, rate_limit):
+    """Serve a synthetic org or a recording until interrupted."""
+    if cassette_path:
+        backend = ReplayBackend(Cassette.load(cassette_path))
+    else:
+        backend = SyntheticBackend(generate_org(synthetic_size or 100))
+    server = StandinServer(backend, port=port, latency=latency, fail_every=fail_every,
+                           retry_after=retry_after, rate_limit=rate_limit)
+    print(f"GitHub stand-in listening on {server.base_url}, point consolebot at it with "
+          f"CONSOLEBOT_GITHUB_API_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.stats)
+
+
+@cli.command()
+@click.argument("cassette_path", type=click.Path(dir_okay=False))
+@click.option("--limit", type=int, help="Only record the details of the first N repositories.")
+def record(cassette_path, limit):
+    """Record the repository list and every per-repo resource from the GitHub API."""
+    from unittest.mock import patch
+
+    from benchmarks.crawl import isolated_github_data
+    from consolebot.githubdata import GithubData
+    from consolebot.ratelimit import RateLimiter
+    from consolebot.refresh import RESOURCES
+
+    token = GithubData.get_token()
+    if not token:
+        raise click.ClickException(f"Recording needs a GitHub token in {GithubData.TOKEN_PATH}")
+    cassette = Cassette()
+    # A fresh database and response cache, so every response is a full 200 worth recording
+    # and commit logs start empty, whatever the real configuration already holds
+    with tempfile.TemporaryDirectory() as state_dir, \
+            isolated_github_data(GithubData.API_URL, state_dir, RateLimiter(), token) as data_source, \
+            patch.object(data_source, "_session", RecordingSession(cassette)):
+        repos = data_source._get_all_repos(f"{data_source.BASE_URL}?per_page=100", data_source.get_headers())
+        for repo in repos[:limit]:
+            for fetch in RESOURCES.values():
+                fetch(data_source, repo)
+    cassette.save(cassette_path)
+    print(f"Recorded {len(cassette.interactions)} responses to {cassette_path}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,147 @@
+import hashlib
+import random
+
+from consolebot import readmetext
+
+PRODUCTS = [
+    "insights", "frontend", "sources", "rbac", "cost", "notifications", "approval", "catalog", "compliance",
+    "vulnerability", "drift", "patch", "advisor", "inventory", "remediations", "playbook", "image", "content",
+    "export", "chrome", "landing", "policies", "subscriptions", "provisioning", "integrations", "automation",
+    "malware", "ros", "edge", "tasks", "quickstarts", "learning", "payload", "ingress", "entitlements",
+    "config", "sed", "host", "cloud", "connector",
+]
+COMPONENTS = [
+    "core", "api", "engine", "dispatcher", "manager", "service", "backend", "frontend", "worker", "scheduler",
+    "gateway", "proxy", "cache", "store", "collector", "processor", "client", "sdk", "schema", "components",
+    "utils", "common", "tools", "builder", "tracker", "monitor", "registry", "operator", "exporter", "listener",
+    "management", "management-ui", "reports", "rules", "sync", "bridge", "sidecar", "migrations", "templates",
+    "hooks",
+]
+SUFFIXES = ["", "", "", "", "ui", "go", "python", "js", "tests", "e2e", "deploy", "helm", "docs", "build"]
+
+ADJECTIVES = ["lightweight", "scalable", "internal", "shared", "experimental", "legacy", "asynchronous", "declarative"]
+NOUNS = ["service", "library", "operator", "dashboard", "pipeline", "toolkit", "plugin", "microservice", "CLI"]
+DOMAINS = [
+    "tracking cloud costs", "managing user permissions", "sending email notifications", "scanning hosts for CVEs",
+    "building OS images", "syncing subscription data", "rendering the console navigation", "running Ansible playbooks",
+    "ingesting uploaded archives", "reporting configuration drift", "provisioning cloud instances",
+    "exporting inventory reports", "approving change requests", "detecting malware signatures",
+]
+
+INTENT_TEMPLATES = {
+    "summary": ["tell me about {name}", "what is {name}", "describe {name}", "give me an overview of {name}"],
+    "contributors": ["who works on {name}", "who contributed to {name}", "list developers of {name}"],
+    "language": ["what language is {name} written in", "which language is {name} coded in", "{name} technologies used"],
+}
+FILLER = [
+    "please", "quickly", "for", "the", "quarterly", "report", "our", "team", "review", "today", "if", "you", "can",
+    "and", "also", "briefly", "with", "some", "context", "onboarding", "new", "engineers", "next", "week",
+]
+
+# Target query lengths in words, so stages can be compared across query sizes
+QUERY_LENGTHS = {"short": (3, 5), "medium": (8, 10), "long": (14, 16)}
+
+
+def _unique_names(rng, count):
+    names = set()
+    while len(names) < count:
+        words = [rng.choice(PRODUCTS)]
+        words += rng.sample(COMPONENTS, rng.choice([0, 1, 1, 2]))
+        suffix = rng.choice(SUFFIXES)
+        if suffix:
+            words.append(suffix)
+        name = "-".join(words)
+        if name in names:
+            name = f"{name}-{len(names)}"  # Orgs this size run out of natural combinations
+        names.add(name)
+    return sorted(names)
+
+
+def _readme(rng, name, description):
+    paragraphs = [f"# {name}", description + "."]
+    for _ in range(rng.randint(2, 6)):
+        paragraphs.append(" ".join(rng.choice(FILLER + NOUNS + ADJECTIVES) for _ in range(rng.randint(20, 60))) + ".")
+    paragraphs.append("## Installation\n\n```bash\nmake install\n```")
+    return "\n\n".join(paragraphs)
+
+
+def generate_org(size, seed=0):
+    """
+    Generates a synthetic organization of `size` repositories.
+
+    Names are hyphenated like real console.redhat.com repos, built from a
+    product, zero to two components and an optional suffix. Each repo has a
+    description, a markdown README and contributors and languages, in the
+    shape `cached_github_data` holds them.
+    """
+    rng = random.Random(f"org-{size}-{seed}")
+    org = {}
+    for name in _unique_names(rng, size):
+        description = f"A {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} for {rng.choice(DOMAINS)}"
+        readme = _readme(rng, name, description)
+        readme_bytes = readme.encode("utf-8")
+        org[name] = {
+            "name": name,
+            "description": description,
+            "readme": readme,
+            "readme_sha": hashlib.sha1(b"blob %d\0" % len(readme_bytes) + readme_bytes).hexdigest(),  # Git blob SHA
+            "contributors": [{"login": f"dev{rng.randint(1, 500)}"} for _ in range(rng.randint(1, 8))],
+            "languages": {rng.choice(["Python", "Go", "JavaScript", "TypeScript"]): rng.randint(1000, 900000)},
+            "commits": [],
+        }
+    return org
+
+
+def _typo(rng, name):
+    i = rng.randrange(len(name) - 1)
+    if name[i] == "-" or name[i + 1] == "-":
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]  # Swap two letters
+
+
+def _mention(rng, name, repo):
+    """How a query refers to a repo: its exact name, with spaces, with a typo, or by what it does."""
+    style = rng.choice(["exact", "exact", "spaced", "typo", "description"])
+    if style == "spaced":
+        return name.replace("-", " "), style
+    if style == "typo" and len(name) > 4:
+        return _typo(rng, name), style
+    if style == "description":
+        return "the " + repo["description"].split(" for ", 1)[-1], style
+    return name, "exact"
+
+
+def generate_queries(org, count, length, seed=0):
+    """
+    Generates `count` queries about repos of `org`, padded to a `QUERY_LENGTHS` bucket.
+
+    Returns:
+        A list of dicts with the query text, the repo and intent it asks
+        about, and how the repo is mentioned.
+    """
+    rng = random.Random(f"queries-{len(org)}-{length}-{seed}")
+    low, high = QUERY_LENGTHS[length]
+    names = list(org)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        intent = rng.choice(list(INTENT_TEMPLATES))
+        mention, style = _mention(rng, name, org[name])
+        words = rng.choice(INTENT_TEMPLATES[intent]).format(name=mention).split()
+        target = rng.randint(low, high)
+        while len(words) < target:
+            words.append(rng.choice(FILLER))
+        queries.append({"query": " ".join(words), "repo": name, "intent": intent, "mention": style})
+    return queries
+
+
+class SyntheticGithubData:
+    """Serves READMEs from a synthetic org instead of the GitHub API, like the data source the query module expects."""
+
+    @classmethod
+    def get_readme(cls, repo):
+        if not repo.get("readme"):
+            return None
+        if "readme_text" not in repo:
+            repo["readme_text"] = readmetext.plain_text(repo["readme"])  # Cleaned once, like GithubData does by SHA
+        return {"sha": repo["readme_sha"], "content": repo["readme"], "text": repo["readme_text"]}
@@ -1,5 +1,6 @@
 import click
-from consolebot import query
+from rich import print
+from consolebot import daemon, lazy, tracing
 
 class DefaultGroup(click.Group):
 
@@ -27,14 +28,75 @@ def cli():
 
 @click.command(name="ask", context_settings={"ignore_unknown_options": True})
 @click.argument('user_query', nargs=-1, required=False)
-def ask_command(user_query):
+@click.option('--profile-startup', is_flag=True, help="Run in-process and report how long each component took to load.")
+@click.option('--timings', is_flag=True, help="Run in-process and report how long every stage and GitHub request took.")
+@click.option('--trace', 'trace_path', type=click.Path(dir_okay=False), help="Run in-process and write every stage and GitHub request to a trace file.")
+@click.option('--trace-format', type=click.Choice(["chrome", "json"]), default="chrome", show_default=True, help="Chrome Trace Event format (chrome://tracing, Perfetto) or a plain JSON list of spans.")
+def ask_command(user_query, profile_startup, timings, trace_path, trace_format):
     if user_query:
         user_query = ' '.join(user_query)
-        query.run(user_query)
+        in_process = profile_startup or timings or trace_path
+        if timings or trace_path:
+            tracing.enable()
+        # Prefer a warm daemon; fall back to loading everything in-process
+        if in_process or not daemon.ask(user_query):
+            with lazy.timed("consolebot.query import"):
+                from consolebot import query
+            query.run(user_query)
+        if profile_startup:
+            print(lazy.render_startup_profile())
+        if timings:
+            print(tracing.render_timings())
+        if trace_path:
+            tracing.export(trace_path, trace_format)
     else:
         click.echo("Please provide a query.")
 
+@click.command(name="serve")
+@click.option('--socket', 'socket_path', default=daemon.SOCKET_PATH, show_default=True, help="Unix socket to listen on.")
+def serve_command(socket_path):
+    """Keep models and repository data loaded and answer `ask` queries over a Unix socket."""
+    daemon.serve(socket_path)
+
+@click.command(name="summarize")
+def summarize_command():
+    """Summarize every repository into the local summary cache, e.g. from a nightly job."""
+    from consolebot import query
+    query.precompute_summaries()
+
+@click.command(name="refresh")
+@click.option('--concurrency', default=8, show_default=True, help="Maximum number of GitHub requests in flight.")
+@click.option('--full', is_flag=True, help="Re-crawl the whole repository list instead of syncing changes since the last refresh.")
+@click.option('--graphql', is_flag=True, help="Fetch languages, READMEs and commits with GraphQL, many repositories per request.")
+def refresh_command(concurrency, full, graphql):
+    """Sync the repository list, then fetch contributors, languages, READMEs and commits for every repository."""
+    from consolebot import refresh
+    from consolebot.githubdata import GithubData
+    GithubData.sync_repos(full=full)
+    refresh.refresh_repo_details(concurrency=concurrency, graphql=graphql)
+
+@click.command(name="batch")
+@click.argument('input_file', type=click.File('r'), default='-')
+@click.option('--output', '-o', type=click.File('w'), default='-', help="Where to write the JSONL results.")
+def batch_command(input_file, output):
+    """Answer many queries in one process, reading JSONL or one query per line and writing JSONL results."""
+    from consolebot import batch
+    batch.run_batch(input_file, output)
+
+@click.command(name="search")
+@click.argument('words', nargs=-1, required=True)
+@click.option('--limit', default=5, show_default=True, help="Most repositories to list.")
+def search_command(words, limit):
+    """Find repositories by the words in their READMEs, from the index built by `refresh`."""
+    from consolebot import query
+    print(query.search_readmes(' '.join(words), limit))
+
 cli.add_command(ask_command)
+cli.add_command(serve_command)
+cli.add_command(summarize_command)
+cli.add_command(refresh_command)
+cli.add_command(batch_command)
+cli.add_command(search_command)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,167 @@
+import contextlib
+import datetime
+import json
+import sys
+import time
+
+from rich import print
+
+from consolebot import query
+
+
+class _Deferred(Exception):
+    """Raised when resolving a query needs an embedding that has not been encoded yet."""
+
+
+class _DeferredEmbeddings(query.QueryEmbeddings):
+    """Refuses to encode texts one at a time, so they can be encoded together later."""
+
+    def __missing__(self, text):
+        raise _Deferred(text)
+
+
+def _ambiguous(top_matches):
+    # Nobody to ask in batch mode, so a close call is reported rather than guessed
+    candidates = ", ".join(name for name, _ in top_matches)
+    raise query.RepoNotFoundException(f"Ambiguous repository, could be any of: {candidates}")
+
+
+def read_queries(lines):
+    """
+    Parses batch input into query records.
+
+    Each line is either a JSON object with a "query" field, whose other fields
+    (an "id", say) are passed through to the result, or the query as plain text.
+    Blank lines are skipped. A line that cannot be read becomes a record with
+    only its "line" number and an error, and the rest are still answered.
+    """
+    records = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        error = None
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+                if not isinstance(record.get("query"), str):
+                    error = f"Line {number} has no \"query\" field"
+            except ValueError as e:
+                error = f"Line {number} is not valid JSON: {e}"
+            if error:
+                record = {"line": number, "query": None}
+        else:
+            record = {"query": line}
+        record.update(repo=None, person=None, language=None, intent=None, answer=None, error=error)
+        records.append(record)
+    return records
+
+
+def resolve(records):
+    """
+    Fills in the repo and intent of every record, or the person or language
+    for queries about one. Topic searches only get their intent.
+
+    Queries are first resolved with name and fuzzy matching alone. Every
+    text that still needs the SBERT model is then encoded in one call,
+    and only those queries are resolved again.
+    """
+    deferred = _DeferredEmbeddings()
+    pending = []
+    for record in records:
+        if record["query"] is None:
+            continue  # Unreadable input line
+        try:
+            record["person"] = query.determine_person(record["query"])
+            if record["person"]:
+                record["intent"] = "person"
+                continue
+            record["language"] = query.determine_language(record["query"])
+            if record["language"]:
+                record["intent"] = "language_search"
+                continue
+            if query.determine_search(record["query"]):
+                record["intent"] = "search"
+                continue
+            record["repo"] = query.determine_repo_name(record["query"], _ambiguous, deferred)
+        except _Deferred:
+            pending.append(record)
+            continue
+        except query.RepoNotFoundException as e:
+            record["error"] = str(e)
+            continue
+        except Exception as e:
+            record["error"] = f"An unexpected error occurred: {e}"
+            continue
+        record["intent"] = query.determine_intent(record["query"], record["repo"], query.INTENTS, min_margin=query.INTENT_MATCH_MARGIN)
+        if record["intent"] is None:
+            pending.append(record)
+
+    if not pending:
+        return records
+
+    texts = []
+    for record in pending:
+        if record["repo"] is None:
+            # A repo matched by its description is not named in the query, so the whole query says what is asked
+            texts += [record["query"], query.intent_text(record["query"], "")]
+        else:
+            texts.append(query.intent_text(record["query"], record["repo"]))
+    embeddings = query.QueryEmbeddings().encode(texts)
+
+    for record in pending:
+        try:
+            if record["repo"] is None:
+                record["repo"] = query.determine_repo_name(record["query"], _ambiguous, embeddings)
+                record["intent"] = query.determine_intent(record["query"], record["repo"], query.INTENTS, min_margin=query.INTENT_MATCH_MARGIN)
+            if record["intent"] is None:
+                record["intent"] = query.infer_intent(record["query"], record["repo"], embeddings)
+        except query.RepoNotFoundException as e:
+            record["error"] = str(e)
+        except Exception as e:
+            record["error"] = f"An unexpected error occurred: {e}"
+    return records
+
+
+def answer(records):
+    """Answers every resolved record, looking up each (repo, person, language or search, intent, time window) only once."""
+    answers = {}
+    now = datetime.datetime.now().astimezone()  # The same time windows for every record
+    for record in records:
+        subject = record["query"] if record["intent"] == "search" else record["person"] or record["language"] or record["repo"]
+        if subject is None or record["intent"] is None:
+            continue
+        since = query.activity_window(record["query"], now)
+        key = (subject, record["intent"], since)
+        if key not in answers:
+            try:
+                answers[key] = (query.answer_intent(record["intent"], subject, since=since), None)
+            except Exception as e:
+                answers[key] = (None, f"An unexpected error occurred: {e}")
+        record["answer"], error = answers[key]
+        record["error"] = record["error"] or error
+    return records
+
+
+def run_batch(lines, output):
+    """
+    Answers many queries in one process and writes one JSON result per line.
+
+    Progress messages from the query pipeline go to stderr so the output
+    stays valid JSONL when written to stdout.
+
+    Args:
+        lines: Iterable of input lines, see `read_queries`.
+        output: Text stream the results are written to.
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        records = answer(resolve(read_queries(lines)))
+    for record in records:
+        output.write(json.dumps(record) + "\n")
+    output.flush()
+
+    elapsed = time.perf_counter() - start
+    with contextlib.redirect_stdout(sys.stderr):
+        print(f"Answered {len(records)} queries in {elapsed:.1f}s ({len(records) / elapsed if elapsed else 0:.1f} queries/sec).")
+    return records
@@ -0,0 +1,190 @@
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+
+import rich
+from rich.console import Console
+
+SOCKET_PATH = os.path.expanduser('~/.config/consolebot/consolebot.sock')
+
+
+class _Channel:
+    """Newline-delimited JSON messages over a pair of socket file objects."""
+
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+
+    def send(self, **message):
+        self.wfile.write((json.dumps(message) + "\n").encode('utf-8'))
+        self.wfile.flush()
+
+    def receive(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("Connection closed by peer.")
+        return json.loads(line)
+
+    def prompt(self, text=""):
+        """Asks the client to read a line from its terminal and returns it."""
+        self.send(prompt=text)
+        return self.receive().get("input", "")
+
+
+class _ClientStream:
+    """File-like object that forwards everything written to it to the client."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def write(self, text):
+        if text:
+            self.channel.send(output=text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+@contextlib.contextmanager
+def _client_output(console, stream):
+    """Routes both rich and builtin prints to the client for the duration of a request."""
+    previous = rich._console
+    rich._console = console
+    try:
+        with contextlib.redirect_stdout(stream):
+            yield
+    finally:
+        rich._console = previous
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        channel = _Channel(self.rfile, self.wfile)
+        try:
+            request = channel.receive()
+        except (ConnectionError, ValueError):
+            return
+
+        stream = _ClientStream(channel)
+        color_system = request.get("color_system")
+        console = Console(
+            file=stream,
+            force_terminal=color_system is not None,
+            color_system=color_system,
+            width=request.get("width"),
+        )
+        try:
+            self.server.reload_if_stale()
+            with _client_output(console, stream):
+                self.server.runner(request.get("query", ""), prompt=channel.prompt)
+        except ConnectionError:
+            return
+        except Exception as e:
+            channel.send(error=f"An unexpected error occurred: {str(e)}")
+        channel.send(done=True)
+
+
+class QueryServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server answering queries with a long-lived runner.
+
+    Requests are handled one at a time: the runner shares models, caches and
+    the global rich console between requests. When `data_version` returns
+    something new, `reload` is called before the next request is answered,
+    so a sync or refresh run from another process is picked up.
+    """
+
+    def __init__(self, socket_path, runner, data_version=None, reload=None):
+        self.runner = runner
+        self.data_version = data_version
+        self.reload = reload
+        self.loaded_version = data_version() if data_version else None
+        super().__init__(socket_path, QueryHandler)
+
+    def reload_if_stale(self):
+        if self.data_version is None:
+            return
+        version = self.data_version()
+        if version != self.loaded_version:
+            self.reload()
+            self.loaded_version = version
+
+
+def is_running(socket_path=SOCKET_PATH):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+
+def serve(socket_path=SOCKET_PATH):
+    """Loads the query pipeline once and answers queries until interrupted."""
+    if is_running(socket_path):
+        print(f"A consolebot daemon is already listening on {socket_path}")
+        return
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Stale socket from a daemon that did not shut down cleanly
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+    from consolebot import lazy, query
+    lazy.load_all()  # Load every model and the repository data once, up front
+    query.repo_embeddings()
+
+    server = QueryServer(socket_path, query.run, data_version=query.data_version, reload=query.reload_data)
+    os.chmod(socket_path, 0o600)
+    print(f"consolebot daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def ask(user_query, socket_path=SOCKET_PATH):
+    """
+    Forwards a query to a running daemon and streams its response to stdout.
+
+    Returns:
+        False if no daemon is listening on the socket, True otherwise.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return False
+
+    console = Console()
+    stdout = sys.stdout  # Bound up front, a daemon in the same process swaps sys.stdout while it answers
+    with sock, sock.makefile('rb') as rfile, sock.makefile('wb') as wfile:
+        channel = _Channel(rfile, wfile)
+        channel.send(query=user_query, color_system=console.color_system, width=console.width)
+        while True:
+            try:
+                message = channel.receive()
+            except ConnectionError:
+                print("Lost connection to the consolebot daemon.", file=sys.stderr)
+                break
+            if "output" in message:
+                stdout.write(message["output"])
+                stdout.flush()
+            elif "prompt" in message:
+                channel.send(input=input(message["prompt"]))
+            elif "error" in message:
+                print(message["error"], file=sys.stderr)
+            elif message.get("done"):
+                break
+    return True
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR = os.path.expanduser('~/.config/consolebot/embeddings')
+
+
+def _cache_key(model_name, payload):
+    """Returns a filesystem-safe key for a model and the texts it encoded."""
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return f"{model_name.replace('/', '_')}-{digest}"
+
+
+def _save_matrix(path, matrix):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as file:
+        np.save(file, matrix)
+    os.replace(tmp_path, path)  # Never leave a half-written matrix behind
+
+
+class IntentMatrix:
+    """
+    Normalized embeddings of every intent key phrase, stacked into one matrix.
+
+    Each row belongs to the intent at the same position in `labels`, so a
+    query is scored against every phrase with a single matrix-vector product.
+    """
+
+    def __init__(self, labels, matrix):
+        self.labels = labels
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, model, intents, model_name, cache_dir=CACHE_DIR):
+        """
+        Loads the matrix from disk, encoding the phrases in one batch on a cache miss.
+
+        Args:
+            model: A SentenceTransformer (anything with a compatible `encode`).
+            intents (dict): Intent name to list of key phrases.
+            model_name (str): Name of the model, part of the cache key.
+            cache_dir (str): Directory holding cached matrices.
+        """
+        labels = [intent for intent, phrases in intents.items() for _ in phrases]
+        phrases = [phrase for _, phrases in intents.items() for phrase in phrases]
+        path = os.path.join(cache_dir, f"intents-{_cache_key(model_name, intents)}.npy")
+
+        if os.path.exists(path):
+            matrix = np.load(path)
+            if matrix.shape[0] == len(phrases):
+                return cls(labels, matrix)
+
+        matrix = np.asarray(model.encode(phrases, convert_to_numpy=True, normalize_embeddings=True), dtype=np.float32)
+        _save_matrix(path, matrix)
+        return cls(labels, matrix)
+
+    def rank(self, query_embedding):
+        """Returns (intent, similarity) pairs, best phrase per intent, most similar first."""
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query_embedding)
+        if norm:
+            query_embedding = query_embedding / norm
+        scores = self.matrix @ query_embedding
+
+        best = {}
+        for label, score in zip(self.labels, scores.tolist()):
+            if score > best.get(label, -2.0):
+                best[label] = score
+        return sorted(best.items(), key=lambda item: -item[1])
+
+    def best(self, query_embedding):
+        """Returns the top intent, its similarity and its margin over the runner-up intent."""
+        ranked = self.rank(query_embedding)
+        intent, similarity = ranked[0]
+        margin = similarity - ranked[1][1] if len(ranked) > 1 else similarity
+        return intent, similarity, margin
+
+
+def repo_text(repo_name, repo):
+    """The text a repo is embedded from: its name as words, followed by its description."""
+    words = repo_name.replace('-', ' ').replace('_', ' ')
+    description = repo.get("description") or ""
+    return f"{words}. {description}".strip()
+
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class RepoEmbeddings:
+    """
+    Normalized embeddings of every repo's name and description.
+
+    Each row is stored with a hash of the text it was computed from, so a
+    rebuild only encodes repos that are new or whose description changed.
+    """
+
+    def __init__(self, names, hashes, matrix):
+        self.names = names
+        self.hashes = hashes
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, model, repos, model_name, cache_dir=CACHE_DIR):
+        """
+        Loads the stored embeddings and brings them up to date with `repos`.
+
+        Args:
+            model: A SentenceTransformer (anything with a compatible `encode`).
+            repos (dict): Repo name to repository data, as in `cached_github_data`.
+            model_name (str): Name of the model, part of the cache file name.
+            cache_dir (str): Directory holding cached matrices.
+        """
+        path = os.path.join(cache_dir, f"repos-{model_name.replace('/', '_')}.npz")
+        texts = {name: repo_text(name, repo) for name, repo in repos.items()}
+        hashes = {name: _text_hash(text) for name, text in texts.items()}
+
+        stored = {}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                for name, text_hash, row in zip(data["names"].tolist(), data["hashes"].tolist(), data["matrix"]):
+                    stored[name] = (text_hash, row)
+
+        stale = [name for name in texts if name not in stored or stored[name][0] != hashes[name]]
+        if stale:
+            encoded = model.encode([texts[name] for name in stale], convert_to_numpy=True, normalize_embeddings=True)
+            for name, row in zip(stale, np.asarray(encoded, dtype=np.float32)):
+                stored[name] = (hashes[name], row)
+
+        names = list(texts)
+        if names:
+            matrix = np.stack([stored[name][1] for name in names]).astype(np.float32)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        embeddings = cls(names, [hashes[name] for name in names], matrix)
+        if stale or len(stored) != len(names):
+            embeddings.save(path)
+        return embeddings
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, names=np.array(self.names, dtype=str), hashes=np.array(self.hashes, dtype=str), matrix=self.matrix)
+        os.replace(tmp_path, path)
+
+    def search(self, query_embedding, k=3):
+        """Returns the `k` most similar repos as (name, cosine similarity) pairs, best first."""
+        if not self.names:
+            return []
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query_embedding)
+        if norm:
+            query_embedding = query_embedding / norm
+        scores = self.matrix @ query_embedding
+        k = min(k, len(self.names))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.names[i], float(scores[i])) for i in top]
@@ -1,23 +1,72 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
-import base64
-import re
-from docutils import nodes
-from docutils.core import publish_doctree
+import hashlib
 import os
 import datetime
 import logging
+import threading
+from urllib.parse import urlencode, urlsplit
+from consolebot import readmetext, tracing
+from consolebot.httpcache import ResponseCache
+from consolebot.ratelimit import RateLimiter
+from consolebot.store import RepoStore
+
+# Everything the GraphQL refresh needs from one repository, queried for many repos at once under aliases
+REPO_METADATA_FRAGMENT = """
+fragment RepoMetadata on Repository {
+  name
+  description
+  languages(first: $languages, orderBy: {field: SIZE, direction: DESC}) {
+    edges { size node { name } }
+  }
+  readme_md: object(expression: "HEAD:README.md") { ...ReadmeBlob }
+  readme_adoc: object(expression: "HEAD:README.adoc") { ...ReadmeBlob }
+  readme_rst: object(expression: "HEAD:README.rst") { ...ReadmeBlob }
+  readme_txt: object(expression: "HEAD:README.txt") { ...ReadmeBlob }
+  defaultBranchRef {
+    target {
+      ... on Commit {
+        history(first: $commits) {
+          nodes { oid committedDate message committer { name } }
+        }
+      }
+    }
+  }
+}
+
+fragment ReadmeBlob on GitObject {
+  ... on Blob { oid text }
+}
+"""
+README_ALIASES = {"readme_md": "md", "readme_adoc": "adoc", "readme_rst": "rst", "readme_txt": "md"}  # Alias to text format
 
 logger = logging.getLogger("GithubData")
 logger.setLevel(logging.INFO)
 
 class GithubData:
     ORG_NAME = "RedHatInsights"
-    BASE_URL = f"https://api.github.com/orgs/{ORG_NAME}/repos"
-    DATA_PATH = os.path.expanduser('~/.config/consolebot/repos.json')
+    GITHUB_API_URL = "https://api.github.com"
+    API_URL = os.environ.get("CONSOLEBOT_GITHUB_API_URL", GITHUB_API_URL).rstrip("/")  # e.g. a local stand-in
+    BASE_URL = f"{API_URL}/orgs/{ORG_NAME}/repos"
+    DB_PATH = os.path.expanduser('~/.config/consolebot/consolebot.db')
+    LEGACY_DATA_PATH = os.path.expanduser('~/.config/consolebot/repos.json')
     TOKEN_PATH = os.path.expanduser('~/.config/consolebot/token')
-    CACHE_DURATION = datetime.timedelta(days=30)
+    SYNC_INTERVAL = datetime.timedelta(hours=12)
+    FULL_SYNC_INTERVAL = datetime.timedelta(days=7)
+    SYNC_OVERLAP = datetime.timedelta(minutes=10)  # Re-check a little before the last sync, in case of clock skew
+    POOL_SIZE = 32
+    RAW_MEDIA_TYPE = "application/vnd.github.raw"  # File contents as they are, instead of base64 in JSON
+    COMMITS_PER_PAGE = 100  # The most the commits API returns in one page
+    COMMIT_LOG_FETCH = 100  # Most commits fetched into a repo's commit log at once
+    GRAPHQL_MAX_REPOS = 25  # Repos per GraphQL query, README texts make bigger queries slow to answer
+    GRAPHQL_NODE_LIMIT = 500000  # GitHub rejects queries that could return more nodes than this
+    response_cache = ResponseCache()
+    rate_limiter = RateLimiter()
     _formatted_repos_cache = None
+    _session = None
+    _session_lock = threading.Lock()
+    _store = None
 
     @classmethod
     def get_formatted_repos(cls):
@@ -35,171 +84,182 @@ class GithubData:
         return formatted_repos
 
     @classmethod
-    def extract_plain_text_from_adoc(cls, adoc_content):
-        """Extract plain English text from AsciiDoc content by removing common markup."""
-        
-        # Remove inline styles: *bold*, _italic_, +monospace+, etc.
-        adoc_content = re.sub(r'[\*\_\+\^\~]', '', adoc_content)
-        
-        # Remove links: link:[text], http://example.com[text], etc.
-        adoc_content = re.sub(r'link:\[.*?\]', '', adoc_content)
-        adoc_content = re.sub(r'http[s]?://\S+\[.*?\]', '', adoc_content)
-        
-        # Remove image tags: image::path[Alt Text]
-        adoc_content = re.sub(r'image::.*?\[.*?\]', '', adoc_content)
-        
-        # Remove source code blocks
-        adoc_content = re.sub(r'\[source,.*?\]\n----.*?----', '', adoc_content, flags=re.DOTALL)
-        
-        # Remove other blocks: NOTE, TIP, WARNING, etc.
-        adoc_content = re.sub(r'^NOTE:.*?$', '', adoc_content, flags=re.MULTILINE)
-        adoc_content = re.sub(r'^TIP:.*?$', '', adoc_content, flags=re.MULTILINE)
-        adoc_content = re.sub(r'^WARNING:.*?$', '', adoc_content, flags=re.MULTILINE)
-        adoc_content = re.sub(r'^IMPORTANT:.*?$', '', adoc_content, flags=re.MULTILINE)
-        
-        # Remove block quotes
-        adoc_content = re.sub(r'^____.*?____', '', adoc_content, flags=re.DOTALL)
-        
-        # Remove headers: == Header, === Sub-header, etc.
-        adoc_content = re.sub(r'^=+ .*?$', '', adoc_content, flags=re.MULTILINE)
-        
-        # Remove lists: . Item, * Item, etc.
-        adoc_content = re.sub(r'^\. .*?$', '', adoc_content, flags=re.MULTILINE)
-        adoc_content = re.sub(r'^\* .*?$', '', adoc_content, flags=re.MULTILINE)
-        
-        # Remove comments
-        adoc_content = re.sub(r'^//.*?$', '', adoc_content, flags=re.MULTILINE)
+    def get_repo_root_entries(cls, repo):
+        headers = cls.get_headers()
+        """Returns the contents API entries (name, sha, type, ...) in the root directory of a repo."""
+        contents_url = repo["contents_url"].replace("{+path}", "")
+        response = cls._safe_request(contents_url, headers)
+        if not response or response.status_code != 200:
+            return []
+        return response.json()
 
-        # Additional cleanups, like consecutive newlines
-        adoc_content = re.sub(r'\n{3,}', '\n\n', adoc_content)
-        
-        return adoc_content.strip()
+    @classmethod
+    def get_repo_root_files(cls, repo):
+        """Returns the list of files in the root directory of a repo."""
+        return [item['name'] for item in cls.get_repo_root_entries(repo)]
+
+    @staticmethod
+    def blob_sha(content):
+        """Returns the git blob SHA of a file's bytes, the same SHA GitHub lists for the file."""
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
 
     @classmethod
-    def extract_plain_text_from_rst(cls, rst_content):
-        """Extract plain text from reStructuredText (RST) content."""
-        
-        # Parse the RST content into a document tree
-        doctree = publish_doctree(rst_content)
-
-        # Define a visitor class to extract text from the document tree
-        class TextVisitor(nodes.SparseNodeVisitor):
-            def __init__(self, document):
-                nodes.SparseNodeVisitor.__init__(self, document)
-                self.text_list = []
-            
-            def default_visit(self, node):
-                if isinstance(node, nodes.Text):
-                    self.text_list.append(node.astext())
-        
-        # Apply the visitor to the document tree
-        visitor = TextVisitor(doctree)
-        doctree.walk(visitor)
-        
-        # Join the text and return
-        return '\n'.join(visitor.text_list).strip()
+    def get_readme(cls, repo):
+        """
+        Returns a repo's README, or None if it has none.
+
+        The README is a dict of its blob "sha", its "content" as written and
+        its prose as "text", one sentence per line (see `readmetext`). The
+        README endpoint serves the raw file in a single request, which is
+        revalidated with its ETag, and the text is stored by blob SHA, so an
+        unchanged README is neither downloaded nor cleaned up again.
+
+        Raises ValueError if the README could not be fetched.
+        """
+        repo_name = repo['name']
+        readme_url = repo["contents_url"].replace("/contents/{+path}", "/readme")
+        headers = {**dict(cls.get_headers()), "Accept": cls.RAW_MEDIA_TYPE}
+        readme_response = cls._safe_request(readme_url, headers, missing_ok=True)
+        if readme_response is None:
+            raise ValueError(f"Failed to fetch the README of {repo_name}.")
+        if readme_response.status_code == 404:
+            print(f"No README found for {repo_name}. Skipping...")
+            return None
+
+        content = readme_response.content.decode('utf-8', errors='replace')
+        return cls._readme(cls.blob_sha(readme_response.content), content)
 
     @classmethod
-    def get_repo_root_files(cls, repo):
-        headers = cls.get_headers()
-        """Returns the list of files in the root directory of a repo."""
-        contents_url = repo["contents_url"].replace("{+path}", "")
-        response = cls._safe_request(requests.get, contents_url, headers)
-        if not response or response.status_code != 200:
-            return []
-        return [item['name'] for item in response.json()]
+    def _readme(cls, readme_sha, content, text_format=None):
+        """
+        Builds a README dict, cleaning its text up only if no README with this blob SHA was cleaned before.
+
+        `text_format` is told from the markup when the file name is not known, see `readmetext.readme_format`.
+        """
+        store = cls.get_store()
+        text = store.get_readme_text(readme_sha)
+        if text is None:
+            text = readmetext.plain_text(content, text_format)
+            store.put_readme_text(readme_sha, text)
+        return {"sha": readme_sha, "content": content, "text": text}
 
     @classmethod
     def get_readme_content(cls, repo):
-        headers = cls.get_headers()
-        repo_name = repo['name']
+        readme = cls.get_readme(repo)
+        return readme["content"] if readme else None
 
-        # Get the exact README filename
-        readme_filename = cls.has_readme(repo)
-        if not readme_filename:
-            print(f"No README found for {repo['name']}. Skipping...")
-            return None
+    @classmethod
+    def get_repo_contributions(cls, repo):
+        """
+        Returns every contributor of a repo as {"login", "contributions"}, following all pages.
 
-        readme_url = repo["contents_url"].replace("{+path}", readme_filename)
-        readme_response = cls._safe_request(requests.get, readme_url, headers)
-        if not readme_response:
-            print(f"Failed to fetch {readme_filename} for {repo_name} after max retries.")
-            return None
-        
-        if readme_response.status_code == 200:
-            readme_content_encoded = readme_response.json()["content"]
-            readme_content_decoded = base64.b64decode(readme_content_encoded).decode('utf-8')
-            
-            # Convert to markdown or plain text depending on format
-            if readme_filename.endswith('.adoc'):
-                readme_content_decoded = cls.extract_plain_text_from_adoc(readme_content_decoded)
-            elif readme_filename.endswith('.rst'):
-                readme_content_decoded = cls.extract_plain_text_from_rst(readme_content_decoded)
-            # For .txt, it's plain text, and for .md, it's already markdown, so no conversions are needed.
-        else:
-            print(f"Failed to fetch {readme_filename} for {repo_name}. Status code: {readme_response.status_code}")
-            readme_content_decoded = None
-        
-        return readme_content_decoded
+        Raises ValueError if a page could not be fetched, rather than returning part of the list.
+        """
+        headers = cls.get_headers()
+        contributions = []
+        contributors_url = f"{repo['contributors_url']}?per_page=100"
+        while contributors_url:
+            response = cls._safe_request(contributors_url, headers)
+            if not response or response.status_code != 200:
+                raise ValueError(f"Failed to fetch the contributors of {repo['name']}.")
+            contributions.extend({"login": contributor["login"], "contributions": contributor.get("contributions", 0)}
+                                 for contributor in response.json() if contributor.get("login"))  # Anonymous ones have no login
+            contributors_url = response.links.get("next", {}).get("url")  # Pagination
+        return contributions
 
     @classmethod
     def get_repo_contributors(cls, repo):
-        headers = cls.get_headers()
         """Returns the list of contributors for a repo."""
-        contributors_url = repo["contributors_url"]
-        response = cls._safe_request(requests.get, contributors_url, headers)
-        if not response or response.status_code != 200:
-            return []
-        return [contributor['login'] for contributor in response.json()]
+        return [contributor['login'] for contributor in cls.get_repo_contributions(repo)]
 
     @classmethod
-    def has_readme(cls, repo):
-        """Checks if a repository has a README file and returns its format."""
-        formats = ["md", "adoc", "rst", "txt"]
+    def get_person_repos(cls, login):
+        """Returns (repo name, contribution count) pairs for a login from the contributor index built by `refresh`."""
+        return cls.get_store().get_person_repos(login)
 
-        root_files = cls.get_repo_root_files(repo)
-        # Finding any readme file irrespective of its case and format
-        for file in root_files:
-            if file.lower() == "readme.md" or file.lower() == "readme.adoc" or file.lower() == "readme.rst" or file.lower() == "readme.txt":
-                return file  # Return the exact filename of the found README file
+    @classmethod
+    def get_indexed_contributors(cls, repo_name):
+        """Returns (login, contribution count) pairs of a repo from the contributor index, most contributions first."""
+        return cls.get_store().get_repo_contributions(repo_name)
 
-        return None
+    @classmethod
+    def get_contributor_logins(cls):
+        return cls.get_store().get_logins()
 
     @classmethod
-    def get_repo_languages(cls, repo):
+    def get_readme_sha(cls, repo):
+        """Returns the blob SHA of the repo's README, which changes whenever its content does."""
+        readme = cls.get_readme(repo)
+        return readme["sha"] if readme else None
+
+    @classmethod
+    def get_repo_language_bytes(cls, repo):
+        """
+        Fetch the languages of a repo with the bytes of code in each, largest first.
+
+        A repo without code has no languages; raises ValueError if they could not be fetched.
+        """
         languages_url = repo["languages_url"]
         headers = cls.get_headers()
+        response = cls._safe_request(languages_url, headers=headers)
+        if not response or response.status_code != 200:
+            raise ValueError(f"Failed to fetch the languages of {repo['name']}.")
+        return response.json()
+
+    @classmethod
+    def get_repo_languages(cls, repo):
         """Fetch languages for a repo."""
-        response = cls._safe_request(requests.get, languages_url, headers=headers)
-        if response.status_code == 200:
-            return list(response.json().keys())
-        else:
-            print(f"Failed request for URL {languages_url}. Status code: {response.status_code}")
-            return []
+        return list(cls.get_repo_language_bytes(repo))
 
     @classmethod
-    def get_commits(cls, repo, max_commits=100):
+    def get_indexed_languages(cls, repo_name):
+        """Returns (language, bytes, percent) of a repo from the language index built by `refresh`, largest first."""
+        return cls.get_store().get_repo_languages(repo_name)
+
+    @classmethod
+    def get_language_repos(cls, language):
+        """Returns (repo name, bytes, percent of the repo) of the repos using a language, from the language index."""
+        return cls.get_store().get_language_repos(language)
+
+    @classmethod
+    def get_language_totals(cls):
+        """Returns (language, bytes, repo count) for every language in the language index."""
+        return cls.get_store().get_language_totals()
+
+    @classmethod
+    def get_commits(cls, repo, max_commits=100, since=None, until=None):
+        """
+        Returns up to `max_commits` of a repo's commits, newest first.
+
+        Pages are sized to what is still needed, so a handful of commits is a
+        single small request, and paging stops as soon as enough have arrived.
+
+        Args:
+            repo (dict): The repository.
+            max_commits (int): Most commits to fetch.
+            since (str): ISO timestamp, only commits from then on.
+            until (str): ISO timestamp, only commits up to then.
+        """
         headers = cls.get_headers()
         commit_data = []
-        commit_count = 0
-        commits_url = repo["commits_url"].split("{")[0]
-        while commits_url and commit_count < max_commits:
-            commits_response = cls._safe_request(requests.get, commits_url, headers)
+        params = {"per_page": min(max_commits, cls.COMMITS_PER_PAGE)}
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
+        commits_url = f'{repo["commits_url"].split("{")[0]}?{urlencode(params)}'
+        while commits_url and len(commit_data) < max_commits:
+            commits_response = cls._safe_request(commits_url, headers)
             if not commits_response:
                 break
             if commits_response.status_code == 200:
-                for commit in commits_response.json():
-                    if commit_count >= max_commits:
-                        break
-
-                    commit_info = {
+                for commit in commits_response.json()[:max_commits - len(commit_data)]:
+                    commit_data.append({
+                        "sha": commit["sha"],
                         "contributor": commit["commit"]["committer"]["name"],
                         "date": commit["commit"]["committer"]["date"],
                         "message": commit["commit"]["message"]
-                    }
-
-                    commit_data.append(commit_info)
-                    commit_count += 1
+                    })
 
                 commits_url = commits_response.links.get("next", {}).get("url")  # Pagination for commits
                 
@@ -209,6 +269,130 @@ class GithubData:
 
         return commit_data
 
+    @classmethod
+    def get_recent_commits(cls, repo, count=None, since=None):
+        """
+        Returns commits from the repo's local commit log, newest first, after bringing it up to date.
+
+        The log always covers every commit from its oldest one to its newest,
+        so updating it only asks for the commits since the newest one, which is
+        one small request when nothing changed. Older commits are only fetched
+        when `since` reaches further back than the log does.
+
+        Args:
+            repo (dict): The repository.
+            count (int): Most commits to return, every one in range by default.
+            since (datetime or str): Only return commits from then on.
+        """
+        store = cls.get_store()
+        repo_name = repo["name"]
+        if isinstance(since, datetime.datetime):
+            since = since.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        oldest, newest = store.commit_range(repo_name)
+        if newest is None:
+            store.add_commits(repo_name, cls.get_commits(repo, max_commits=count or cls.COMMIT_LOG_FETCH, since=since))
+            return store.get_commits(repo_name, limit=count, since=since)
+
+        new_commits = cls.get_commits(repo, max_commits=cls.COMMIT_LOG_FETCH, since=newest)
+        if len(new_commits) >= cls.COMMIT_LOG_FETCH:
+            # More changed than one update fetches, start over rather than leave a gap in the log
+            store.replace_commits(repo_name, new_commits)
+            oldest = new_commits[-1]["date"]
+        else:
+            store.add_commits(repo_name, new_commits)
+        if since and since < oldest:
+            store.add_commits(repo_name, cls.get_commits(repo, max_commits=cls.COMMIT_LOG_FETCH, since=since, until=oldest))
+        return store.get_commits(repo_name, limit=count, since=since)
+
+    @classmethod
+    def graphql_chunk_size(cls, commits, languages):
+        """Returns how many repos fit in one metadata query without going over GitHub's node limit."""
+        return max(1, min(cls.GRAPHQL_MAX_REPOS, cls.GRAPHQL_NODE_LIMIT // (commits + languages)))
+
+    @classmethod
+    def get_repos_metadata(cls, repos, commits=30, languages=100):
+        """
+        Fetches the description, languages, README and latest commits of many repos with GraphQL.
+
+        Repos are queried in chunks of `graphql_chunk_size`, so covering the
+        whole org takes a few dozen requests instead of several per repo. READMEs
+        and commits also go into the README text cache and the commit logs.
+
+        Args:
+            repos (list): Repositories, only their names are used.
+            commits (int): Latest commits to fetch per repo, at most 100.
+            languages (int): Languages to fetch per repo, the largest first, at most 100.
+
+        Returns:
+            Repo name to a dict of "description", "languages", "language_bytes"
+            (language to bytes of code), "readme" (see
+            `get_readme`, None without one) and "commits", for every repo that was found.
+        """
+        metadata = {}
+        size = cls.graphql_chunk_size(commits, languages)
+        for start in range(0, len(repos), size):
+            metadata.update(cls._get_metadata_chunk(repos[start:start + size], commits, languages))
+        return metadata
+
+    @classmethod
+    def _get_metadata_chunk(cls, repos, commits, languages):
+        variables = {"owner": cls.ORG_NAME, "commits": commits, "languages": languages}
+        variables.update((f"n{index}", repo["name"]) for index, repo in enumerate(repos))
+        names = "".join(f", $n{index}: String!" for index in range(len(repos)))
+        aliases = " ".join(f"r{index}: repository(owner: $owner, name: $n{index}) {{ ...RepoMetadata }}" for index in range(len(repos)))
+        query = f"query RepoMetadata($owner: String!, $commits: Int!, $languages: Int!{names}) {{ {aliases} }}{REPO_METADATA_FRAGMENT}"
+
+        # GitHub answers queries it cannot finish in time with a 502, so a failing chunk is split in half
+        body = cls._graphql(query, variables, max_retries=2 if len(repos) > 1 else 5)
+        if body is None or (not body.get("data") and body.get("errors")):
+            if len(repos) == 1:
+                print(f"Failed to fetch metadata for {repos[0]['name']}: {(body or {}).get('errors')}")
+                return {}
+            middle = len(repos) // 2
+            return {**cls._get_metadata_chunk(repos[:middle], commits, languages),
+                    **cls._get_metadata_chunk(repos[middle:], commits, languages)}
+
+        metadata = {}
+        for index, repo in enumerate(repos):
+            node = body["data"].get(f"r{index}")
+            if node:  # Null for repos that were deleted or renamed since the last sync
+                metadata[repo["name"]] = cls._parse_metadata(node, commits)
+        return metadata
+
+    @classmethod
+    def _parse_metadata(cls, node, commits):
+        alias = next((alias for alias in README_ALIASES if node.get(alias) and node[alias].get("text") is not None), None)
+        readme = node[alias] if alias else None
+        target = (node.get("defaultBranchRef") or {}).get("target") or {}
+        history = [
+            {
+                "sha": commit["oid"],
+                "contributor": (commit.get("committer") or {}).get("name"),
+                "date": commit["committedDate"],
+                "message": commit["message"],
+            }
+            for commit in (target.get("history") or {}).get("nodes", [])
+        ]
+        cls._log_latest_commits(node["name"], history, commits)
+        return {
+            "description": node.get("description"),
+            "languages": [edge["node"]["name"] for edge in node["languages"]["edges"]],
+            "language_bytes": {edge["node"]["name"]: edge["size"] for edge in node["languages"]["edges"]},
+            "readme": cls._readme(readme["oid"], readme["text"], README_ALIASES[alias]) if readme else None,
+            "commits": history,
+        }
+
+    @classmethod
+    def _log_latest_commits(cls, repo_name, commits, limit):
+        """Adds a repo's latest `limit` commits to its commit log, starting the log over when they do not reach back to it."""
+        store = cls.get_store()
+        _, newest = store.commit_range(repo_name)
+        if newest and len(commits) >= limit and commits[-1]["date"] > newest:
+            store.replace_commits(repo_name, commits)
+        else:
+            store.add_commits(repo_name, commits)
+
     @classmethod
     def get_headers(cls):
         token = cls.get_token()
@@ -222,12 +406,51 @@ class GithubData:
 
     @classmethod
     def get_repos(cls):
-        headers = cls.get_headers()
-        
-        repos = cls._load_cache()
-        if not repos:
-            repos = cls._fetch_and_cache_repos(headers)
+        cache = cls._load_cache()
+        if not cache.get('repos'):
+            repos = cls.sync_repos(full=True)
             print("Data fetched from GitHub.")
+            return repos
+        last_sync = cls._parse_time(cache.get('synced_at'))
+        if not last_sync or cls._now() - last_sync > cls.SYNC_INTERVAL:
+            try:
+                return cls.sync_repos()
+            except ValueError as e:
+                logger.warning(f"Could not sync repositories, using cached data. {e}")
+        return cache['repos']
+
+    @classmethod
+    def sync_repos(cls, full=False):
+        """
+        Brings the local repository cache up to date and returns the repos.
+
+        An incremental sync lists repos most recently updated first and stops paging
+        at the first one not updated since the last sync, then merges them into the
+        cache by id so renamed repos replace their old entry. Deleted repos simply
+        vanish from the listing, so a full crawl runs every FULL_SYNC_INTERVAL to
+        prune them.
+        """
+        headers = cls.get_headers()
+        cache = cls._load_cache()
+        now = cls._now()
+        last_sync = cls._parse_time(cache.get('synced_at'))
+        last_full_sync = cls._parse_time(cache.get('full_synced_at'))
+
+        if full or not cache.get('repos') or not last_sync or not last_full_sync or now - last_full_sync > cls.FULL_SYNC_INTERVAL:
+            repos = cls._get_all_repos(f"{cls.BASE_URL}?per_page=100", headers)
+            last_full_sync = now
+        else:
+            updated = cls._get_updated_repos(last_sync - cls.SYNC_OVERLAP, headers)
+            repos = cls._merge_repos(cache['repos'], updated)
+            logger.info(f"Synced {len(updated)} updated repositories.")
+
+        repos = [RepoStore.slim(repo) for repo in repos]
+        cls._save_cache({
+            'repos': repos,
+            'synced_at': now.isoformat(),
+            'full_synced_at': last_full_sync.isoformat(),
+        })
+        cls.forget_formatted_repos()
         return repos
 
     @classmethod
@@ -237,30 +460,96 @@ class GithubData:
                 return file.read().strip()
         return None
 
+    @classmethod
+    def forget_formatted_repos(cls):
+        """Drops the memoized repository list, so the next call reads it from the store again."""
+        cls._formatted_repos_cache = None
+
+    @classmethod
+    def get_store(cls):
+        if cls._store is None:
+            cls._store = RepoStore(cls.DB_PATH)
+        return cls._store
+
+    @classmethod
+    def get_repo(cls, repo_name):
+        """Looks a single repository up by name, without loading the whole list."""
+        return cls.get_store().get_repo(repo_name)
+
     @classmethod
     def _load_cache(cls):
-        if os.path.exists(cls.DATA_PATH):
-            with open(cls.DATA_PATH, 'r') as file:
-                cache = json.load(file)
-                timestamp = cache.get('timestamp')
-                if not timestamp:
-                    return []
-                last_updated = datetime.datetime.fromisoformat(timestamp)
-                if datetime.datetime.now() - last_updated > cls.CACHE_DURATION:
-                    logger.info("Cache is old. Consider refreshing the data.")
-                return cache.get('repos', [])
-        return []
-
-    @classmethod
-    def _fetch_and_cache_repos(cls, headers):
-        repos = cls._get_all_repos(cls.BASE_URL, headers)
-        cache = {
+        store = cls.get_store()
+        repos = store.get_repos()
+        if not repos and os.path.exists(cls.LEGACY_DATA_PATH):
+            return cls._migrate_legacy_cache()
+        return {
             'repos': repos,
-            'timestamp': datetime.datetime.now().isoformat()
+            'synced_at': store.get_meta('synced_at'),
+            'full_synced_at': store.get_meta('full_synced_at'),
         }
-        with open(cls.DATA_PATH, 'w') as file:
-            json.dump(cache, file)
-        return repos
+
+    @classmethod
+    def _save_cache(cls, cache):
+        store = cls.get_store()
+        store.replace_repos(cache['repos'])
+        store.set_meta(synced_at=cache['synced_at'], full_synced_at=cache['full_synced_at'])
+
+    @classmethod
+    def _migrate_legacy_cache(cls):
+        """Moves the repos.json cache of earlier versions into the store."""
+        with open(cls.LEGACY_DATA_PATH, 'r') as file:
+            legacy_cache = json.load(file)
+        timestamp = cls._parse_time(legacy_cache.get('synced_at') or legacy_cache.get('timestamp'))
+        full_timestamp = cls._parse_time(legacy_cache.get('full_synced_at') or legacy_cache.get('timestamp'))
+        cache = {
+            'repos': [RepoStore.slim(repo) for repo in legacy_cache.get('repos', [])],
+            'synced_at': timestamp.isoformat() if timestamp else None,
+            'full_synced_at': full_timestamp.isoformat() if full_timestamp else None,
+        }
+        cls._save_cache(cache)
+        os.remove(cls.LEGACY_DATA_PATH)
+        logger.info(f"Migrated {len(cache['repos'])} repositories from {cls.LEGACY_DATA_PATH}.")
+        return cache
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    @staticmethod
+    def _parse_time(timestamp):
+        """Parses our own and GitHub's ISO timestamps into aware datetimes."""
+        if not timestamp:
+            return None
+        parsed = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.astimezone()  # Caches written before syncing used naive local time
+        return parsed
+
+    @classmethod
+    def _get_updated_repos(cls, since, headers):
+        """Returns the repos updated after `since`, paging only as far as needed."""
+        url = f"{cls.BASE_URL}?sort=updated&direction=desc&per_page=100"
+        updated = []
+        while url:
+            response = cls._safe_request(url, headers=headers)
+            if not response:
+                raise ValueError("Failed to fetch updated repos after max retries.")
+            for repo in response.json():
+                if cls._parse_time(repo['updated_at']) < since:
+                    return updated
+                updated.append(repo)
+            url = response.links.get("next", {}).get("url")  # Pagination
+        return updated
+
+    @staticmethod
+    def _merge_repos(cached_repos, updated_repos):
+        merged = {repo['id']: repo for repo in cached_repos}
+        for repo in updated_repos:
+            if repo['name'].endswith('-build'):  # Skip repos ending in '-build', also when renamed to one
+                merged.pop(repo['id'], None)
+            else:
+                merged[repo['id']] = repo
+        return list(merged.values())
 
     @classmethod
     def _get_all_repos(cls, base_url, headers):
@@ -268,7 +557,7 @@ class GithubData:
         page_num = 1
         while base_url:
             print(f"Fetching repositories from page {page_num}...")
-            response = cls._safe_request(requests.get, base_url, headers=headers)
+            response = cls._safe_request(base_url, headers=headers)
             if not response:
                 raise ValueError(f"Failed to fetch repos after max retries. Aborting.")
             if response.status_code != 200:
@@ -279,26 +568,116 @@ class GithubData:
         print(f"Total repositories fetched: {len(repos)}")
         return repos
 
-    @staticmethod
-    def _safe_request(request_func, url, headers, max_retries=3):
+    @classmethod
+    def use_api(cls, api_url):
+        """Sends every request to another GitHub API root, such as a local stand-in server."""
+        cls.API_URL = api_url.rstrip("/")
+        cls.BASE_URL = f"{cls.API_URL}/orgs/{cls.ORG_NAME}/repos"
+
+    @classmethod
+    def api_url(cls, url):
+        """Rewrites a GitHub API URL, like the per-repo URLs stored with each repo, onto API_URL."""
+        if cls.API_URL != cls.GITHUB_API_URL and url.startswith(cls.GITHUB_API_URL):
+            return cls.API_URL + url[len(cls.GITHUB_API_URL):]
+        return url
+
+    @classmethod
+    def get_session(cls):
+        """Returns the shared HTTP session, so connections and TLS sessions are reused across calls."""
+        with cls._session_lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=cls.POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                cls._session = session
+            return cls._session
+
+    @classmethod
+    def _safe_request(cls, url, headers, max_retries=5, missing_ok=False):
         """
-        Performs a safe request, retrying in case of timeouts.
+        Performs a safe conditional GET through the shared session, retrying in case of failures.
+
+        When the response cache holds a validator for the URL it is sent along, and a
+        304 Not Modified answer (free against the rate limit) is served from the cache.
+        Retries are paced by the rate limiter: server errors back off exponentially,
+        rate-limited responses wait as long as GitHub asks, other errors are not retried.
         
         Args:
-            request_func: A function like requests.get or requests.head.
             url (str): The URL to fetch.
             headers (dict): The headers for the request.
-            max_retries (int): The number of retries.
+            max_retries (int): The maximum number of attempts.
+            missing_ok (bool): Return a 404 response instead of None, for resources that may not exist.
             
         Returns:
             The response object or None in case of failures after retries.
         """
-        for _ in range(max_retries):
-            try:
-                response = request_func(url, headers=headers, timeout=10)  # Setting a timeout of 10 seconds
-                if response.status_code == 200:
-                    return response
-                print(f"Failed request for URL {url}. Status code: {response.status_code}")
-            except requests.exceptions.RequestException as e:
-                print(f"Error occurred while fetching {url}. Error: {e}")
+        headers = dict(headers or {})
+        url = cls.api_url(url)
+        with tracing.span(f"GET {urlsplit(url).path}", "http", url=url) as request_span:
+            response = None
+            for attempt in range(max_retries):
+                cls.rate_limiter.before_request()
+                try:
+                    conditional_headers = cls.response_cache.conditional_headers(url, headers)
+                    response = cls.get_session().get(url, headers={**headers, **conditional_headers}, timeout=10)  # Setting a timeout of 10 seconds
+                except requests.exceptions.RequestException as e:
+                    print(f"Error occurred while fetching {url}. Error: {e}")
+                    response = None
+                else:
+                    cls.rate_limiter.update(response)
+                    if response.status_code == 304:
+                        cached_response = cls.response_cache.replay(url, headers)
+                        if cached_response:
+                            request_span.set(status=304, bytes=0, retries=attempt)
+                            return cached_response
+                        continue
+                    if response.status_code == 200:
+                        cls.response_cache.store(url, headers, response)
+                        request_span.set(status=200, bytes=len(response.content), retries=attempt)
+                        return response
+                    if response.status_code == 404 and missing_ok:
+                        request_span.set(status=404, bytes=0, retries=attempt)
+                        return response
+                    print(f"Failed request for URL {url}. Status code: {response.status_code}")
+
+                delay = cls.rate_limiter.retry_delay(response, attempt)
+                if delay is None or attempt == max_retries - 1:
+                    break
+                cls.rate_limiter.wait_to_retry(delay)
+            request_span.set(status=response.status_code if response is not None else None, retries=attempt)
+        return None
+
+    @classmethod
+    def _graphql(cls, query, variables, max_retries=5):
+        """
+        POSTs a GraphQL query through the shared session, retrying like `_safe_request`.
+
+        Returns:
+            The decoded response body, which may hold "errors" next to partial
+            "data", or None in case of failures after retries.
+        """
+        url = f"{cls.API_URL}/graphql"
+        headers = dict(cls.get_headers())
+        with tracing.span("POST /graphql", "http", url=url) as request_span:
+            response = None
+            for attempt in range(max_retries):
+                cls.rate_limiter.before_request()
+                try:
+                    response = cls.get_session().post(url, json={"query": query, "variables": variables}, headers=headers, timeout=30)
+                except requests.exceptions.RequestException as e:
+                    print(f"Error occurred while querying {url}. Error: {e}")
+                    response = None
+                else:
+                    cls.rate_limiter.update(response)
+                    if response.status_code == 200:
+                        request_span.set(status=200, bytes=len(response.content), retries=attempt)
+                        return response.json()
+                    print(f"Failed GraphQL query. Status code: {response.status_code}")
+
+                delay = cls.rate_limiter.retry_delay(response, attempt)
+                if delay is None or attempt == max_retries - 1:
+                    break
+                cls.rate_limiter.wait_to_retry(delay)
+            request_span.set(status=response.status_code if response is not None else None, retries=attempt)
         return None
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+HTTP_CACHE_DIR = os.path.expanduser('~/.config/consolebot/http-cache')
+
+# Response headers worth replaying from a cached 200, e.g. Link for pagination
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+class ResponseCache:
+    """
+    On-disk store of GET response bodies and their validators (ETag / Last-Modified).
+
+    Cached validators are sent as If-None-Match / If-Modified-Since, and a
+    304 Not Modified answer is turned back into the stored 200 response.
+    Entries are keyed by URL and Accept header.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _paths(self, url, headers):
+        accept = (headers or {}).get("Accept", "")
+        key = hashlib.sha1(f"{accept} {url}".encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _load_meta(self, url, headers):
+        meta_path, body_path = self._paths(url, headers)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url, headers):
+        """Returns the validator headers to send for this URL, empty if nothing is cached."""
+        meta = self._load_meta(url, headers)
+        if not meta:
+            return {}
+        conditional = {}
+        if meta.get("ETag"):
+            conditional["If-None-Match"] = meta["ETag"]
+        if meta.get("Last-Modified"):
+            conditional["If-Modified-Since"] = meta["Last-Modified"]
+        return conditional
+
+    def store(self, url, headers, response):
+        """Stores a 200 response if GitHub gave us a validator to revalidate it with later."""
+        if response.status_code != 200:
+            return
+        meta = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        if not (meta.get("ETag") or meta.get("Last-Modified")):
+            return
+
+        meta_path, body_path = self._paths(url, headers)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Body first, so a metadata file always points at a complete body
+        for path, mode, data in ((body_path, 'wb', response.content), (meta_path, 'w', json.dumps(meta))):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, mode) as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+
+    def replay(self, url, headers):
+        """Rebuilds the cached 200 response for a URL, or returns None if it is gone."""
+        meta = self._load_meta(url, headers)
+        if not meta:
+            return None
+        _, body_path = self._paths(url, headers)
+        try:
+            with open(body_path, 'rb') as file:
+                content = file.read()
+        except OSError:
+            return None
+
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(meta)
+        response._content = content
+        response.from_cache = True
+        return response
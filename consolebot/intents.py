@@ -0,0 +1,36 @@
+from rapidfuzz import fuzz, process, utils
+
+
+class IntentTable:
+    """
+    Every intent key phrase, preprocessed once for fuzzy scoring.
+
+    Scoring a query preprocesses it a single time and scores it against
+    every distinct phrase in one `process.extract` call, giving the same
+    scores as `process.extractOne(query, [phrase])` would for each phrase.
+    """
+
+    def __init__(self, intents):
+        """
+        Args:
+            intents (dict): Intent name to list of key phrases.
+        """
+        self.phrases = {}  # processed phrase -> intents it belongs to
+        for intent, phrases in intents.items():
+            for phrase in phrases:
+                intents_for_phrase = self.phrases.setdefault(utils.default_process(phrase), [])
+                if intent not in intents_for_phrase:
+                    intents_for_phrase.append(intent)
+        self.choices = list(self.phrases)
+        self.intents = list(intents)
+
+    def rank(self, query):
+        """Returns (intent, score) pairs, best phrase per intent, highest score first."""
+        processed_query = utils.default_process(query)
+        best = dict.fromkeys(self.intents, 0)
+        if processed_query:
+            matches = process.extract(processed_query, self.choices, scorer=fuzz.WRatio, processor=None, limit=None)
+            for phrase, score, _ in matches:
+                for intent in self.phrases[phrase]:
+                    best[intent] = max(best[intent], round(score))
+        return sorted(best.items(), key=lambda item: -item[1])
@@ -0,0 +1,112 @@
+import contextlib
+import threading
+import time
+from collections.abc import Mapping
+
+from rich.table import Table
+
+from consolebot import tracing
+
+_components = {}
+_timings = {}
+_local = threading.local()
+
+
+class LazyComponent:
+    """
+    A model, dataset or library that is only materialized the first time it is requested.
+
+    Calling the component returns the loaded value, loading it on the first call.
+    Load time is recorded per component; time spent loading other components
+    from inside the loader is attributed to those components, not this one.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.loaded = False
+        self._lock = threading.RLock()
+        _components[name] = self
+
+    def __call__(self):
+        if self.loaded:
+            return self.value
+        with self._lock:
+            if not self.loaded:
+                with timed(self.name):
+                    self.value = self.loader()
+                self.loaded = True
+        return self.value
+
+    def reset(self):
+        """Forgets the loaded value so the next call loads it again."""
+        with self._lock:
+            self.value = None
+            self.loaded = False
+
+
+def component(name):
+    """Decorator turning a loader function into a LazyComponent."""
+    def decorator(loader):
+        return LazyComponent(name, loader)
+    return decorator
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Records how long the block took under `name`, excluding nested timed blocks."""
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        with tracing.span(name, "load"):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        _timings[name] = _timings.get(name, 0.0) + elapsed - nested
+
+
+def load_all():
+    """Loads every registered component, e.g. to warm up a long-lived process."""
+    for lazy_component in list(_components.values()):
+        lazy_component()
+
+
+def startup_profile():
+    """Returns (name, seconds) for everything loaded so far, in load order."""
+    return list(_timings.items())
+
+
+def render_startup_profile():
+    table = Table(title="Startup profile")
+    table.add_column("Component")
+    table.add_column("Load time", justify="right")
+    total = 0.0
+    for name, seconds in startup_profile():
+        table.add_row(name, f"{seconds * 1000:.0f} ms")
+        total += seconds
+    table.add_row("[bold]total[/bold]", f"[bold]{total * 1000:.0f} ms[/bold]")
+    return table
+
+
+class LazyMapping(Mapping):
+    """Read-only mapping backed by a component that is loaded on first access."""
+
+    def __init__(self, lazy_component):
+        self.lazy_component = lazy_component
+
+    def __getitem__(self, key):
+        return self.lazy_component()[key]
+
+    def __iter__(self):
+        return iter(self.lazy_component())
+
+    def __len__(self):
+        return len(self.lazy_component())
+
+    def items(self):
+        return self.lazy_component().items()
@@ -1,52 +1,172 @@
+import datetime
+import functools
 import itertools
-import spacy
 import json
-from summarizer import Summarizer
-from fuzzywuzzy import process
-import markdown
-from bs4 import BeautifulSoup
 from rich import print
 from rich.text import Text
-from fuzzywuzzy import fuzz
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import wordnet, stopwords
-from nltk.tokenize import word_tokenize
 import re
 import warnings
 import os
+from consolebot import lazy, tracing
 from consolebot.githubdata import GithubData 
-from sentence_transformers import SentenceTransformer, util
+from consolebot.embeddings import IntentMatrix, RepoEmbeddings
+from consolebot.intents import IntentTable
+from consolebot.readmeindex import ReadmeIndex
+from consolebot.summaries import SummaryCache
+from consolebot.repoindex import RepoNameIndex
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
-warnings.filterwarnings("ignore", category=UserWarning, message=".*was trained with spaCy.*")
+
+# Heavy models and data are loaded on first use, see consolebot.lazy
+NLTK_RESOURCES = {
+    'corpora/wordnet': 'wordnet',
+    'corpora/stopwords': 'stopwords',
+    'tokenizers/punkt': 'punkt',
+    'taggers/averaged_perceptron_tagger': 'averaged_perceptron_tagger',
+}
+
+@lazy.component("nltk")
+def nltk_data():
+    """Imports NLTK and downloads the datasets we use, only if they are not installed yet."""
+    import nltk
+    for resource, package in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
+    return nltk
+
+@lazy.component("stopwords")
+def english_stop_words():
+    nltk_data()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+@lazy.component("lemmatizer")
+def lemmatizer():
+    nltk_data()
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
 
 data_source = GithubData
-cached_github_data = data_source.get_formatted_repos()
 
-# Download necessary NLTK data
-import nltk
-nltk.download('wordnet', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('punkt', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
+@lazy.component("repository data")
+def github_repos():
+    return data_source.get_formatted_repos()
 
-stop_words = set(stopwords.words('english'))
+cached_github_data = lazy.LazyMapping(github_repos)
 
-class RepoNotFoundException(Exception):
-    pass
+@lazy.component("contributor index")
+def contributor_logins():
+    """Maps every login in the contributor index built by `refresh`, lowercased, to the login."""
+    return {login.lower(): login for login in data_source.get_contributor_logins()}
+
+@lazy.component("language index")
+def indexed_languages():
+    """Maps every language in the language index built by `refresh`, lowercased, to its name."""
+    return {language.lower(): language for language, _, _ in data_source.get_language_totals()}
 
-nlp = spacy.load("en_core_web_md")
+@lazy.component("readme index")
+def readme_index():
+    return ReadmeIndex(data_source.get_store())
 
+def compile_language_pattern(languages):
+    """
+    Matches a language named where a query asks what repos are written in:
+    after "use", "using", "written in" or "in", or right before "repos" or "projects".
+    """
+    # Longest first, so "JavaScript" is not read as "Java"; names like "C++" end in symbols, hence the custom boundaries
+    names = "|".join(re.escape(language) for language in sorted(languages, key=len, reverse=True))
+    return re.compile(rf"\b(?:use[sd]?|using|written in|in)\s+({names})(?![\w+#-])"
+                      rf"|(?<![\w+#-])({names})\s+(?:repos|repositories|projects|services|codebases)\b", re.IGNORECASE)
 
-# These are used for the intent inferance SBERT model
-model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-intent_embeddings = {}
+@lazy.component("language pattern")
+def language_pattern():
+    """Matches the name of any indexed language in context, or is None while the index is empty."""
+    languages = indexed_languages().values()
+    return compile_language_pattern(languages) if languages else None
 
-# Initialize lemmatizer
-lemmatizer = WordNetLemmatizer()
+summary_cache = SummaryCache()
 
+class RepoNotFoundException(Exception):
+    pass
+
+# These are used for the intent inferance SBERT model, and to match repos by description
+MODEL_NAME = 'paraphrase-MiniLM-L6-v2'
+SEMANTIC_MATCH_THRESHOLD = 0.45
+
+# Fuzzy intent matches are trusted above this score, and when answering a query only if no other
+# intent scores within the margin; anything else is left to the SBERT model. rapidfuzz aligns partial
+# matches optimally and scores them higher than fuzzywuzzy did, 85 makes the decisions 80 made before
+INTENT_MATCH_THRESHOLD = 85
+INTENT_MATCH_MARGIN = 5
+
+@lazy.component("sentence-transformer")
+def sbert_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+@lazy.component("summarizer")
+def summarizer_model():
+    from summarizer import Summarizer
+    return Summarizer()
+
+# Define intents and their key phrases
+INTENTS = {
+    "summary": [
+        "summary", "describe", "explain", "what is", "tell me about", 
+        "details", "overview", "tell me a bit about", "does do", "info", 
+        "give details", "exposition", "give a brief", "description about", 
+        "can you describe", "elucidate"
+    ],
+
+    "contributors": [
+        "who works", "works", "contributors", "team members", "developers", 
+        "maintainers", "people", "team", "who contributed", "list developers", 
+        "who built", "authors", "people behind", "who made"
+    ],
+
+    "language": [
+        "language", "written in", "coding language", "programmed in", 
+        "developed in", "coded in", "developed in", "which language", 
+        "platform", "stack", "technologies used", "frameworks", "language used"
+    ],
+
+    "recent_activity": [
+        "recent activity", "what's new", "whats new", "latest changes", "recent changes",
+        "recent commits", "latest commits", "what changed", "what has changed", "updates",
+        "activity", "changelog"
+    ],
+}
+
+# Time windows a recent activity query can ask about, e.g. "what changed in clowder this week"
+ACTIVITY_WINDOW = re.compile(r"\b(?:(today)|(yesterday)|this (week|month|year)|(?:last|past) (?:(\d+) )?(day|week|month|year)s?)\b")
+WINDOW_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+WINDOW_COMMITS = 20  # Most commits listed for a time window
+
+# Words of a query that could be a GitHub login, which is letters, digits and hyphens, optionally @-mentioned
+LOGIN_TOKEN = re.compile(r"(?<![\w-])(@?)([A-Za-z0-9][A-Za-z0-9-]*)")
+# A login that is not @-mentioned only names a person in a question about one, e.g. "what does adamrdrew work on"
+PERSON_CUE = re.compile(r"\b(?:who is|work(?:s|ed|ing)? on|contribut\w* to|commits? by)\b", re.IGNORECASE)
+INTENT_WORDS = frozenset(word for phrases in INTENTS.values() for phrase in phrases for word in re.findall(r"[a-z]+", phrase))
+PERSON_REPOS = 10  # Most repos listed for a person
+
+# A language named together with one of these asks about the whole org, e.g. "which repos use Go"
+LANGUAGE_SEARCH = re.compile(r"\b(?:repos|repositories|projects|services|codebases)\b", re.IGNORECASE)
+LANGUAGE_REPOS = 10  # Most repos listed for a language
+
+# Queries looking for a repo by what it does rather than its name, e.g. "which repo handles kafka ingestion".
+# Explicit searches always are, the rest only when they name no repo ("what service does clowder provide")
+EXPLICIT_SEARCH = re.compile(r"^\s*(?:search(?: for)?|(?:which|what) (?:repos|repositories|services|projects) mention)\b", re.IGNORECASE)
+TOPIC_QUERY = re.compile(r"^\s*(?:(?:which|what) (?:repo|repository|service|project)s?|find)\b", re.IGNORECASE)
+SEARCH_RESULTS = 5
+
+LEMMA_CACHE_SIZE = 65536  # (token, part of speech) pairs whose lemma is remembered
+
+@functools.lru_cache(maxsize=None)
 def get_wordnet_pos(treebank_tag):
     """Map treebank pos tag to first character used by WordNetLemmatizer"""
+    from nltk.corpus import wordnet
     tag = treebank_tag[0].upper()
     tag_dict = {"J": wordnet.ADJ,
                 "N": wordnet.NOUN,
@@ -54,88 +174,219 @@ def get_wordnet_pos(treebank_tag):
                 "R": wordnet.ADV}
     return tag_dict.get(tag, wordnet.NOUN)
 
-def preprocess_text(text, remove_stopwords=True):
-    # Tokenize
-    tokens = nltk.word_tokenize(text)
-    
-    # Lemmatize
-    lemmatized_tokens = [lemmatizer.lemmatize(token) for token in tokens]
-    
-    # Remove stopwords
-    if remove_stopwords:
-        lemmatized_tokens = [token for token in lemmatized_tokens if token.lower() not in stopwords.words('english')]
-    
-    # Joining tokens
-    processed_text = ' '.join(lemmatized_tokens)
-    return processed_text
-
-
-
-
-
-
-def get_summary(repo_name):
-    for repo_key, repo in cached_github_data.items():
-        if repo_key == repo_name:
-            readme = data_source.get_readme_content(repo)
-            if not readme:
-                return "No summary available."
-
-            html_content = markdown.markdown(readme)
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove unwanted tags
-            for tag in soup.find_all(['img']):
-                tag.decompose()
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token, pos):
+    """Lemmatizes a token as the WordNet part of speech `pos`, memoized as the same words keep coming back."""
+    return lemmatizer().lemmatize(token, pos)
 
-            plain_text = ' '.join(soup.stripped_strings)
+def preprocess_texts(texts, remove_stopwords=True):
+    """
+    Tokenizes and lemmatizes many texts at once, e.g. every sentence of a README.
 
-            # Remove unwanted patterns or strings
-            for pattern in [':note-caption:', ':informationsource:', 'image:', 'adoc[Learn More]']:
-                plain_text = plain_text.replace(pattern, '')
+    All texts are part-of-speech tagged in one call, each token is lemmatized
+    as its part of speech, and stopwords are dropped before lemmatizing.
 
-            # Replace multiple newlines/spaces with a single space
-            plain_text = re.sub(r'\s+', ' ', plain_text)
-            
-            # Direct Extraction of first N sentences
-            sentences = plain_text.split('.')
-            intro_text = '. '.join(sentences[:3]).strip()  # Taking the first 5 sentences as an example
+    Returns:
+        The processed texts, tokens joined by spaces, in the same order.
+    """
+    nltk = nltk_data()
+    stop_words = english_stop_words() if remove_stopwords else frozenset()
+    tagged_texts = nltk.pos_tag_sents([nltk.word_tokenize(text) for text in texts])
+    return [' '.join(lemmatize(token, get_wordnet_pos(tag)) for token, tag in tagged if token.lower() not in stop_words)
+            for tagged in tagged_texts]
 
-            # Now, summarize this introduction
-            description = repo.get("description") or ""
-            model = Summarizer()
-            nlp_summary = model(intro_text, num_sentences=3)  # Adjust the count as needed
-            nlp_summary = description + "\n" + nlp_summary
+def preprocess_text(text, remove_stopwords=True):
+    return preprocess_texts([text], remove_stopwords)[0]
 
-            return nlp_summary
-    return "Repository not found."
 
+def get_summary(repo_name, save=True):
+    repo = cached_github_data.get(repo_name)
+    if repo is None:
+        return "Repository not found."
 
-def get_recent_activity(repo_name, num_commits=5):  # default to showing the last 5 commits
-    for repo_key, repo in cached_github_data.items():
-        if repo_key == repo_name:
-            commits = data_source.get_commits(repo)
-            recent_commits = [commit["message"] for commit in commits[:3]]
-            # If there are fewer commits than the default number, show them all
-            return "\n".join(recent_commits[:num_commits]) if recent_commits else "No recent commits found."
-    return "Repository not found."
+    try:
+        readme = data_source.get_readme(repo)  # One request for both the SHA and the text
+    except ValueError as e:
+        return str(e)
+    if not readme:
+        return "No summary available."
+    readme_sha = readme["sha"]
+    cached_summary = summary_cache.get(repo_name, readme_sha)
+    if cached_summary is not None:
+        return cached_summary
+
+    # The README text is already cleaned of markup, one sentence per line
+    sentences = readme["text"].splitlines()
+    if not sentences:
+        return "No summary available."
+    intro_text = ' '.join(sentences[:3])  # Summarize the introduction, the first 3 sentences
+
+    # Now, summarize this introduction
+    description = repo.get("description") or ""
+    summarizer = summarizer_model()
+    with tracing.span("summarize", characters=len(intro_text)):
+        nlp_summary = summarizer(intro_text, num_sentences=3)  # Adjust the count as needed
+    nlp_summary = description + "\n" + nlp_summary
+
+    summary_cache.put(repo_name, readme_sha, nlp_summary)
+    if save:
+        summary_cache.save()
+    return nlp_summary
+
+
+def precompute_summaries():
+    """Summarizes every repository whose README changed since it was last summarized."""
+    from rich.progress import track
+
+    summarizer_model()  # Load the model before the progress bar starts
+    repo_names = sorted(cached_github_data)
+    for count, repo_name in enumerate(track(repo_names, description="Summarizing repositories..."), 1):
+        get_summary(repo_name, save=False)
+        if count % 25 == 0:
+            summary_cache.save()  # Keep progress if the run is interrupted
+    summary_cache.save()
+
+
+def activity_window(query, now=None):
+    """Returns when the time window a query mentions starts, as an aware datetime, or None."""
+    match = ACTIVITY_WINDOW.search(query.lower())
+    if not match:
+        return None
+    today, yesterday, this, count, unit = match.groups()
+    now = now or datetime.datetime.now().astimezone()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if today:
+        return midnight
+    if yesterday:
+        return midnight - datetime.timedelta(days=1)
+    if this == "week":
+        return midnight - datetime.timedelta(days=midnight.weekday())
+    if this == "month":
+        return midnight.replace(day=1)
+    if this == "year":
+        return midnight.replace(month=1, day=1)
+    return now - datetime.timedelta(days=int(count or 1) * WINDOW_DAYS[unit])
+
+
+def get_recent_activity(repo_name, num_commits=3, since=None):
+    """Lists the latest commit messages of a repo, or the ones since the start of a time window."""
+    repo = cached_github_data.get(repo_name)
+    if repo is None:
+        return "Repository not found."
+
+    commits = data_source.get_recent_commits(repo, count=WINDOW_COMMITS if since else num_commits, since=since)
+    if not commits:
+        return "No commits since then." if since else "No recent commits found."
+    return "\n".join(commit["message"] for commit in commits)
 
 
 def get_contributors(repo_name):
-    for repo_key, repo in cached_github_data.items():
-        if repo_key == repo_name:
-            contributors = [name for name in data_source.get_repo_contributors(repo) if name != "Github"]
-            return ", ".join(sorted(contributors))
-    return "Repository not found."
+    repo = cached_github_data.get(repo_name)
+    if repo is None:
+        return "Repository not found."
 
+    contributors = [login for login, _ in data_source.get_indexed_contributors(repo_name)]
+    if not contributors:
+        try:
+            contributors = data_source.get_repo_contributors(repo)  # Not refreshed yet
+        except ValueError as e:
+            return str(e)
+    return ", ".join(sorted(name for name in contributors if name != "Github"))
+
+
+def determine_person(query):
+    """
+    Returns the login of a contributor the query names, e.g. "what does @adamrdrew work on", or None.
+
+    Only exact logins from the contributor index count. Logins that are not
+    @-mentioned need a question about a person, and are skipped when they are
+    also repo names, stopwords or words of an intent phrase.
+    """
+    logins = contributor_logins()
+    if not logins:
+        return None
+    cued = PERSON_CUE.search(query) is not None
+    skipped = None
+    for mention, token in LOGIN_TOKEN.findall(query):
+        login = logins.get(token.lower())
+        if not login:
+            continue
+        if mention:
+            return login
+        if not cued:
+            continue
+        if skipped is None:
+            skipped = english_stop_words() | INTENT_WORDS
+        word = token.lower()
+        if word not in skipped and word not in cached_github_data:
+            return login
+    return None
+
+def get_person_repos(login):
+    """Lists the repos a person contributed to, most contributions first, from the contributor index."""
+    repos = data_source.get_person_repos(login)
+    if not repos:
+        return "No repositories found."
+    lines = [f"{repo} ({count} contributions)" for repo, count in repos[:PERSON_REPOS]]
+    if len(repos) > PERSON_REPOS:
+        lines.append(f"...and {len(repos) - PERSON_REPOS} more")
+    return "\n".join(lines)
+
+def determine_language(query):
+    """
+    Returns the language a query searches the org for, e.g. "which repos use go", or None.
+
+    Only languages in the language index count, only in the context `compile_language_pattern`
+    looks for, and only when the query asks about repos in general.
+    """
+    pattern = language_pattern()
+    if pattern is None or not LANGUAGE_SEARCH.search(query):
+        return None
+    match = pattern.search(query)
+    return indexed_languages()[(match.group(1) or match.group(2)).lower()] if match else None
+
+def get_language_repos(language):
+    """Lists the repos using a language, most bytes first, from the language index."""
+    repos = data_source.get_language_repos(language)
+    if not repos:
+        return "No repositories found."
+    total = sum(size for _, size, _ in repos)
+    lines = [f"{len(repos)} repositories, {total / 1024:.1f} KiB in total"]
+    lines += [f"{repo}: {size / 1024:.1f} KiB, {percent:.0f}% of the repo" for repo, size, percent in repos[:LANGUAGE_REPOS]]
+    if len(repos) > LANGUAGE_REPOS:
+        lines.append(f"...and {len(repos) - LANGUAGE_REPOS} more")
+    return "\n".join(lines)
+
+def determine_search(query):
+    """Whether a query looks for repos by topic, to be answered from the README index."""
+    if EXPLICIT_SEARCH.search(query):
+        return True
+    return bool(TOPIC_QUERY.search(query)) and named_repo(query) is None
+
+def search_readmes(query, limit=SEARCH_RESULTS):
+    """Lists the repos whose READMEs best match a query, from the README index."""
+    with tracing.span("search readmes") as stage:
+        results = readme_index().search(query, limit)
+        stage.set(results=len(results))
+    if not results:
+        return "No repositories found."
+    return "\n".join(f"{name} ({score:.1f})" for name, score in results)
 
 def get_language(repo_name):
-    for repo_key, repo in cached_github_data.items():
-        if repo_key == repo_name:
-            return ', '.join(data_source.get_repo_languages(repo))
-    return "Repository not found."
+    repo = cached_github_data.get(repo_name)
+    if repo is None:
+        return "Repository not found."
+
+    languages = data_source.get_indexed_languages(repo_name)
+    if languages:
+        return ", ".join(f"{language} {percent:.1f}%" for language, _, percent in languages)
+    try:
+        return ', '.join(data_source.get_repo_languages(repo))  # Not refreshed yet
+    except ValueError as e:
+        return str(e)
 
 def generate_combinations(query):
+    stop_words = english_stop_words()
     query_words = [word for word in query.split() if word not in stop_words]
     combinations = []
 
@@ -146,7 +397,7 @@ def generate_combinations(query):
     return combinations
 
 
-def disambiguate_repo_name(top_matches):
+def disambiguate_repo_name(top_matches, prompt=input):
     print("Multiple repositories matched your query:")
     for idx, (match_name, match_score) in enumerate(top_matches, 1):
         print(f"{idx}. {match_name} ({match_score}%)")
@@ -155,7 +406,7 @@ def disambiguate_repo_name(top_matches):
     attempts = 0
     
     while attempts < max_attempts:
-        choice = input("Please select the correct repository by number: ")
+        choice = prompt("Please select the correct repository by number: ")
         try:
             selected_repo = top_matches[int(choice)-1][0]
             return selected_repo
@@ -168,34 +419,117 @@ def disambiguate_repo_name(top_matches):
                 print(f"Invalid choice. You have {max_attempts - attempts} attempts left. Please select a valid number from the list.")
 
 
-def determine_repo_name(query, disambiguator=disambiguate_repo_name):
-    repo_name = None
-    
-    # Extract repo names for fuzzy matching
-    repo_names = [repo_key for repo_key, repo in cached_github_data.items()]
+_repo_name_index = (None, None)
+
+def repo_name_index():
+    """Returns the name index for the current repository data, rebuilding it if the data was swapped."""
+    global _repo_name_index
+    indexed_data, index = _repo_name_index
+    if indexed_data is not cached_github_data:
+        index = RepoNameIndex(cached_github_data)
+        _repo_name_index = (cached_github_data, index)
+    return index
+
+
+class QueryEmbeddings(dict):
+    """
+    Query text to normalized SBERT embedding.
+
+    Texts can be encoded together ahead of time with `encode`; any text
+    looked up without having been encoded is encoded on its own.
+    """
+
+    def encode(self, texts):
+        """Encodes every text not seen yet in a single batch."""
+        missing = [text for text in dict.fromkeys(texts) if text not in self]
+        if missing:
+            self.update(zip(missing, sbert_model().encode(missing, normalize_embeddings=True)))
+        return self
+
+    def __missing__(self, text):
+        self[text] = sbert_model().encode(text, normalize_embeddings=True)
+        return self[text]
+
+
+_repo_embeddings = (None, None)
+
+def repo_embeddings():
+    """Returns name and description embeddings for the current repository data, encoding only what changed."""
+    global _repo_embeddings
+    embedded_data, embeddings = _repo_embeddings
+    if embedded_data is not cached_github_data:
+        with lazy.timed("repo embeddings"):
+            embeddings = RepoEmbeddings.build(sbert_model(), cached_github_data, MODEL_NAME)
+        _repo_embeddings = (cached_github_data, embeddings)
+    return embeddings
+
+
+# Everything loaded from the store, as opposed to models that do not change while a process runs
+DATA_COMPONENTS = (github_repos, contributor_logins, indexed_languages, language_pattern, readme_index)
+
+def data_version():
+    """Returns when the repository list was last synced and the indexes last refreshed."""
+    store = data_source.get_store()
+    return store.get_meta('synced_at'), store.get_meta('refreshed_at')
+
+
+def reload_data():
+    """Forgets the repository data and everything derived from it, so the next query loads it from the store again."""
+    global _repo_name_index, _repo_embeddings
+    data_source.forget_formatted_repos()
+    for lazy_component in DATA_COMPONENTS:
+        lazy_component.reset()
+    _repo_name_index = (None, None)
+    _repo_embeddings = (None, None)
+
+
+def match_repo_description(query, disambiguator=disambiguate_repo_name, embeddings=None):
+    """Returns the repo whose name and description are semantically closest to the query, if any is close enough."""
+    query_embedding = (QueryEmbeddings() if embeddings is None else embeddings)[query]
+    matches = [(name, round(similarity * 100)) for name, similarity in repo_embeddings().search(query_embedding, k=3)
+               if similarity >= SEMANTIC_MATCH_THRESHOLD]
+    if not matches:
+        return None
+    if len(matches) > 1 and (matches[0][1] - matches[1][1]) < 5:
+        return disambiguator(matches)
+    return matches[0][0]
+
+
+def named_repo(query):
+    """Returns the repo a query names exactly, by its name or all the words of it, or None."""
+    index = repo_name_index()
 
-    query_combinations = generate_combinations(query)
     # Check for multi-word exact matches first
-    multi_word_matches = [name for name in repo_names if name in query_combinations]
+    stop_words = english_stop_words()
+    query_words = [word for word in query.split() if word not in stop_words]
+    multi_word_matches = index.multi_word_matches(query_words)
 
     if multi_word_matches:
-        repo_name = max(multi_word_matches, key=len)  # choose the longest match, assuming it's more specific
-    else:
-        # Check for single-word exact matches
-        query_words = set(query.split())
-        single_word_matches = query_words.intersection(repo_names)
-        if single_word_matches:
-            repo_name = single_word_matches.pop()  # take any exact match (if multiple, just take one)
-    
+        return max(sorted(multi_word_matches), key=len)  # choose the longest match, assuming it's more specific
+    # Check for single-word exact matches
+    single_word_matches = index.single_word_matches(query.split())
+    if single_word_matches:
+        return sorted(single_word_matches)[0]  # take any exact match (if multiple, just take one)
+    return None
+
+def determine_repo_name(query, disambiguator=disambiguate_repo_name, embeddings=None):
+    index = repo_name_index()
+    repo_name = named_repo(query)
+
     if not repo_name:
         # Find the best fuzzy match for the repo name in the query
-        matches = process.extract(query, repo_names, limit=10)
+        matches = index.fuzzy_matches(query, limit=10)
         matches = sorted(matches, key=lambda x: (-x[1], len(x[0])))
         
         # Check the top matches for disambiguation
         top_matches = matches[:3]  # Get top 3 matches
         best_match, best_match_score = top_matches[0]
 
+        if best_match_score < 70:
+            # Nothing is spelled like the query, look for a repo it describes instead
+            repo_name = match_repo_description(query, disambiguator, embeddings)
+
+    if not repo_name:
         if len(top_matches) > 1 and (best_match_score - top_matches[1][1]) < 10:  # Threshold of 10 can be adjusted
             repo_name = disambiguator(top_matches)
         elif best_match_score >= 70:
@@ -206,75 +540,123 @@ def determine_repo_name(query, disambiguator=disambiguate_repo_name):
     # Determine intent
     return repo_name
 
-def infer_intent(query, repo_name):
+@lazy.component("intent embeddings")
+def intent_matrix():
+    return IntentMatrix.build(sbert_model(), INTENTS, MODEL_NAME)
+
+def intent_text(query, repo_name):
+    """The part of a query that says what is being asked, with the repo name taken out."""
+    return query.replace(repo_name, '').strip().lower()
+
+def infer_intent(query, repo_name, embeddings=None):
     print("Attempting to infer intent...")
-    query = query.replace(repo_name, '').strip().lower()
+    query = intent_text(query, repo_name)
 
-    query_embedding = model.encode(query)
-    
-    best_similarity = -1
-    for intent, embeddings in intent_embeddings.items():
-        for embed in embeddings:
-            similarity = util.pytorch_cos_sim(query_embedding, embed)
-            if similarity > best_similarity:
-                best_similarity = similarity
-                detected_intent = intent
-        
+    query_embedding = (QueryEmbeddings() if embeddings is None else embeddings)[query]
+    detected_intent, similarity, margin = intent_matrix().best(query_embedding)
     return detected_intent
 
-def determine_intent(query, repo_name, intents):
+_intent_table = (None, None)
+
+def intent_table(intents):
+    """Returns the precompiled phrase table for a set of intents, built once per intents dict."""
+    global _intent_table
+    table_intents, table = _intent_table
+    if table_intents is not intents:
+        table = IntentTable(intents)
+        _intent_table = (intents, table)
+    return table
+
+def rank_intents(query, repo_name, intents=INTENTS):
+    """
+    Fuzzy scores the query against every intent phrase in a single pass.
+
+    Returns:
+        The (intent, score) pairs, highest first, and the margin between the top two intents.
+    """
+    ranked = intent_table(intents).rank(intent_text(query, repo_name))
+    if not ranked:
+        return ranked, 0
+    margin = ranked[0][1] - ranked[1][1] if len(ranked) > 1 else ranked[0][1]
+    return ranked, margin
+
+def determine_intent(query, repo_name, intents, min_margin=0):
+    """Returns the fuzzy matched intent, or None when it is below the threshold or within `min_margin` of another intent."""
     print("Determining intent...")
-    query = query.replace(repo_name, '').strip().lower()
-
-    best_match_score = -1
-    detected_intent = None
-
-    for intent, phrases in intents.items():
-        for phrase in phrases:
-            score = process.extractOne(query, [phrase])[1]
-            if score > best_match_score:
-                best_match_score = score
-                detected_intent = intent
+    ranked, margin = rank_intents(query, repo_name, intents)
+    if not ranked:
+        return None
+    detected_intent, best_match_score = ranked[0]
 
     # Setting a threshold, below which the intent is considered not detected (you can adjust as needed)
-    if best_match_score < 80:  # Adjust the threshold based on your observation
+    if best_match_score < INTENT_MATCH_THRESHOLD:
         print("Intent match score is below threshold.")
         return None
+    if margin < min_margin:
+        print("Intent match is ambiguous.")
+        return None
     return detected_intent
 
-def run(query):
+def answer_intent(intent, repo_name, since=None):
+    """
+    Returns the answer to an intent about a repository, or None for an unknown intent.
+    For the "person" intent `repo_name` is the person's login instead, for "language_search" the language
+    and for "search" the query itself.
+
+    `since` is the start of the time window the query asked about, see `activity_window`.
+    """
+    with tracing.span(f"answer {intent}", repo=repo_name):
+        return _answer_intent(intent, repo_name, since)
+
+def _answer_intent(intent, repo_name, since=None):
+    if intent == "summary":
+        return get_summary(repo_name)
+    elif intent == "contributors":
+        return get_contributors(repo_name)
+    elif intent == "language":
+        return get_language(repo_name)
+    elif intent == "recent_activity":
+        return get_recent_activity(repo_name, since=since)
+    elif intent == "person":
+        return get_person_repos(repo_name)
+    elif intent == "language_search":
+        return get_language_repos(repo_name)
+    elif intent == "search":
+        return search_readmes(repo_name)
+    return None
+
+def run(query, prompt=input):
     
-    # Define intents and their key phrases
-    intents = {
-        "summary": [
-            "summary", "describe", "explain", "what is", "tell me about", 
-            "details", "overview", "tell me a bit about", "does do", "info", 
-            "give details", "exposition", "give a brief", "description about", 
-            "can you describe", "elucidate"
-        ],
-
-        "contributors": [
-            "who works", "works", "contributors", "team members", "developers", 
-            "maintainers", "people", "team", "who contributed", "list developers", 
-            "who built", "authors", "people behind", "who made"
-        ],
-
-        "language": [
-            "language", "written in", "coding language", "programmed in", 
-            "developed in", "coded in", "developed in", "which language", 
-            "platform", "stack", "technologies used", "frameworks", "language used"
-        ],
-    }
-    # Convert intents' key phrases into embeddings
-    for intent, phrases in intents.items():
-        intent_embeddings[intent] = [model.encode(phrase) for phrase in phrases]
     intent = None
     repo_name = None
+    person = None
+    language = None
+    embeddings = QueryEmbeddings()
     try:
-        repo_name = determine_repo_name(query)
-        intent = determine_intent(query, repo_name, intents)
-        if intent == None:
-            intent = infer_intent(query, repo_name)
+        with tracing.span("determine_person") as stage:
+            person = determine_person(query)
+            stage.set(person=person)
+        if not person:
+            with tracing.span("determine_language") as stage:
+                language = determine_language(query)
+                stage.set(language=language)
+        if person:
+            intent = "person"  # Answered from the contributor index alone
+        elif language:
+            intent = "language_search"  # Answered from the language index alone
+        elif determine_search(query):
+            intent = "search"  # Answered from the README index alone
+        else:
+            with tracing.span("determine_repo_name") as stage:
+                repo_name = determine_repo_name(query, lambda top_matches: disambiguate_repo_name(top_matches, prompt), embeddings)
+                stage.set(repo=repo_name)
+            with tracing.span("determine_intent") as stage:
+                intent = determine_intent(query, repo_name, INTENTS, min_margin=INTENT_MATCH_MARGIN)
+                stage.set(intent=intent)
+            if intent == None:
+                with tracing.span("infer_intent") as stage:
+                    intent = infer_intent(query, repo_name, embeddings)
+                    stage.set(intent=intent)
         # rest of your code
     except RepoNotFoundException as e:
         print(e)  # or print(str(e)) for just the message without the traceback
@@ -289,25 +671,25 @@ def run(query):
     else:
         response_text.append("Intent not identified.", style="bold red")
 
-    if isinstance(repo_name, str):
+    if person:
+        response_text.append("\nPerson: ", style="none")
+        response_text.append(person, style="bold green")
+    elif language:
+        response_text.append("\nLanguage: ", style="none")
+        response_text.append(language, style="bold green")
+    elif isinstance(repo_name, str):
         response_text.append("\nRepository: ", style="none")
         response_text.append(repo_name, style="bold green")
-    else:
+    elif intent != "search":
         response_text.append("\nRepository not identified.", style="bold red")
 
+    subject = query if intent == "search" else person or language or repo_name
+    answer = answer_intent(intent, subject, since=activity_window(query))
     if intent == "summary":
-        summary = get_summary(repo_name)
         response_text.append("\nSummary: ", style="none")
-        response_text.append(summary)
-    elif intent == "contributors":
-        contributors = get_contributors(repo_name)
-        response_text.append("\n" + contributors)
-    elif intent == "language":
-        language = get_language(repo_name)
-        response_text.append("\n" + language)
-    elif intent == "recent_activity":
-        recent_activity = get_recent_activity(repo_name)
-        response_text.append("\n" + recent_activity)
+        response_text.append(answer)
+    elif answer is not None:
+        response_text.append("\n" + answer)
 
     print(response_text)
 
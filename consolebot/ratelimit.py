@@ -0,0 +1,145 @@
+import email.utils
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Paces GitHub API requests using the rate-limit headers of earlier responses.
+
+    Failed requests are retried with jittered exponential backoff, rate-limited
+    ones (429, or 403 from the primary or secondary limit) wait for as long as
+    GitHub asks, and requests slow down proactively once the remaining budget
+    runs low. Counters of requests, retries and time spent throttled are kept
+    for reporting.
+    """
+
+    LOW_BUDGET = 50  # Start spreading requests out below this many remaining calls
+    SECONDARY_LIMIT_WAIT = 60.0  # GitHub asks for at least a minute when no Retry-After is given
+
+    def __init__(self, base_delay=1.0, max_delay=60.0, max_wait=900.0, sleep=time.sleep, clock=time.time):
+        """
+        Args:
+            base_delay (float): Backoff before the first retry, in seconds.
+            max_delay (float): Upper bound for a single backoff, in seconds.
+            max_wait (float): Longest rate-limit wait we accept before giving up, in seconds.
+            sleep: Function used to wait, replaceable in tests.
+            clock: Function returning the current epoch time, replaceable in tests.
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.sleep = sleep
+        self.clock = clock
+        self.remaining = None
+        self.reset_at = None
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Counts the request, first pausing if the remaining budget is low."""
+        with self._lock:
+            self.requests += 1
+            delay = self._budget_delay()
+        if delay > 0:
+            self._pause(delay)
+
+    def _budget_delay(self):
+        if self.remaining is None or self.reset_at is None or self.remaining > self.LOW_BUDGET:
+            return 0.0
+        window = self.reset_at - self.clock()
+        if window <= 0:
+            return 0.0
+        if self.remaining <= 0:
+            return min(window, self.max_wait)
+        # Spread what is left of the budget over the rest of the window
+        return min(window / self.remaining, self.max_delay)
+
+    def update(self, response):
+        """Records the rate-limit headers of a response."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_at = response.headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset_at is not None:
+                self.reset_at = float(reset_at)
+
+    def retry_delay(self, response, attempt):
+        """
+        Decides whether a failed request should be retried.
+
+        Args:
+            response: The failed response, or None if the request raised.
+            attempt (int): Zero-based number of the attempt that failed.
+
+        Returns:
+            Seconds to wait before retrying, or None if retrying is pointless.
+        """
+        if response is None or response.status_code >= 500:
+            return self.backoff(attempt)
+        if not self._is_rate_limited(response):
+            return None  # Other client errors (404, 401, ...) will not go away on their own
+
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            delay = retry_after
+        elif response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset"):
+            delay = float(response.headers["X-RateLimit-Reset"]) - self.clock() + 1
+        else:
+            delay = max(self.SECONDARY_LIMIT_WAIT, self.backoff(attempt))
+        if delay > self.max_wait:
+            print(f"GitHub rate limit resets in {delay:.0f}s, giving up.")
+            return None
+        return max(delay, 0.0)
+
+    def _retry_after(self, response):
+        """Seconds asked for by a Retry-After header, given either as seconds or as an HTTP-date."""
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return email.utils.parsedate_to_datetime(value).timestamp() - self.clock()
+        except (TypeError, ValueError):
+            return None  # Unparseable, fall back to the default wait
+
+    @staticmethod
+    def _is_rate_limited(response):
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        if response.headers.get("Retry-After") or response.headers.get("X-RateLimit-Remaining") == "0":
+            return True
+        return "rate limit" in response.text.lower()
+
+    def backoff(self, attempt):
+        """Exponential backoff with jitter, so parallel workers do not retry in lockstep."""
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def wait_to_retry(self, delay):
+        with self._lock:
+            self.retries += 1
+        self._pause(delay)
+
+    def _pause(self, delay):
+        with self._lock:
+            self.throttled_seconds += delay
+        self.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "rate_limit_remaining": self.remaining,
+            }
@@ -0,0 +1,76 @@
+import math
+import re
+from collections import Counter
+
+from consolebot import readmetext
+
+TOKEN = re.compile(r"[a-z0-9]+")
+K1 = 1.2  # How quickly repeating a term stops adding to the score
+B = 0.75  # How much longer READMEs are penalized for matching more terms
+COMMON_TERM = 0.5  # Terms in more than this share of READMEs are left out of searches with rarer terms
+
+
+def tokenize(text):
+    """The lowercased words of `text`, in order."""
+    return TOKEN.findall(text.lower())
+
+
+class ReadmeIndex:
+    """
+    BM25 full-text index over the cleaned README text of every repo, kept in a RepoStore.
+
+    Each README is indexed together with its blob SHA, so updating the index
+    only re-reads the READMEs that changed since. Searching scores the
+    postings of the query's terms in the store and needs no network.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def update(self, details):
+        """
+        Brings the index in line with the stored details of every repo.
+
+        READMEs whose SHA did not change are skipped, and repos that are gone
+        or lost their README are dropped from the index.
+
+        Args:
+            details (dict): Repo name to its details, as saved by `refresh`, for
+                every repo in the repository list and no others.
+
+        Returns:
+            The number of READMEs (re-)indexed and the number dropped.
+        """
+        indexed = self.store.indexed_readmes()
+        changed = []
+        current = set()
+        for name, repo_details in details.items():
+            sha = repo_details.get("readme_sha")
+            if not sha:
+                continue
+            current.add(name)
+            if indexed.get(name) == sha:
+                continue
+            # The text is cached by SHA when the README was fetched, older details only have the markup
+            text = self.store.get_readme_text(sha)
+            if text is None:
+                text = readmetext.plain_text(repo_details.get("readme") or "")
+            changed.append((name, sha, Counter(tokenize(text))))
+        stale = [name for name in indexed if name not in current]
+        self.store.index_readmes(changed)
+        self.store.remove_readmes(stale)
+        return len(changed), len(stale)
+
+    def search(self, query, limit=5):
+        """Returns up to `limit` (repo name, BM25 score) pairs for the READMEs best matching the query, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        documents, average_length = self.store.readme_stats()
+        frequencies = self.store.readme_frequencies(terms)
+        if not frequencies:
+            return []
+        # Words like "the" and "for" are in most READMEs, weigh next to nothing and have the longest postings
+        rare = {term: count for term, count in frequencies.items() if count <= documents * COMMON_TERM}
+        weights = {term: math.log(1 + (documents - count + 0.5) / (count + 0.5)) for term, count in (rare or frequencies).items()}
+        return self.store.score_readmes(weights, K1, B, average_length, limit)
@@ -0,0 +1,121 @@
+import re
+
+# Markup that only AsciiDoc and reStructuredText READMEs use, anything else is read as Markdown.
+# The raw README endpoint does not say which file it served, so this is how the format is told.
+# A line like ":rocket: Fast deploys" is an emoji in Markdown, so AsciiDoc attributes only count under a "= Title".
+ADOC_TITLE = re.compile(r"^= \S", re.MULTILINE)
+ADOC_ATTRIBUTE = re.compile(r"^:[\w-]+:(?: \S[^\n]*)?$", re.MULTILINE)
+ADOC_MACRO = re.compile(r"^(?:image|include)::\S", re.MULTILINE)
+RST_MARKUP = re.compile(r"^\.\. (?:[\w-]+::|_[^:]+:)|`[^`]+ <[^>]+>`_", re.MULTILINE)
+
+# Each rule is a pattern and its replacement, where "{}" stands for the pattern's first group that matched.
+# Earlier rules win at the same position. Patterns match across lines only where they say so,
+# everything line based uses [^\n].
+COMMON_RULES = (
+    (r":note-caption:|:informationsource:|adoc\[Learn More\]", ""),
+)
+
+MARKDOWN_RULES = (
+    (r"^(?:```|~~~)[^\n]*\n.*?^(?:```|~~~)[ \t]*$", ""),  # Fenced code
+    (r"<!--.*?-->", ""),
+    (r"\[!\[[^\]\n]*\]\([^)\n]*\)\]\([^)\n]*\)", ""),  # Linked badges
+    (r"!\[[^\]\n]*\]\([^)\n]*\)|<img\b[^>]*>", ""),
+    (r"^\[[^\]\n]+\]:[^\n]*$", ""),  # Link reference definitions
+    (r"\[([^\]\n]*)\](?:\([^)\n]*\)|\[[^\]\n]*\])", "{}"),  # Links keep their text
+    (r"</?[A-Za-z][^>\n]*>", ""),  # Other HTML tags, their text stays
+    (r"^[ \t]*(?:[-*_=][ \t]*){3,}$", ""),  # Horizontal rules and setext underlines
+    (r"^[ \t]*\|?(?:[ \t]*:?-{3,}:?[ \t]*\|?)+[ \t]*$", ""),  # Table header separators
+    (r"^[ \t]*(?:#{1,6}|>+|[-*+]|\d+\.)[ \t]+", ""),  # Heading, quote and list markers
+    (r"[*`|]+|(?<!\w)_+|_+(?!\w)", ""),  # Emphasis, code and table markup
+) + COMMON_RULES
+
+ADOC_RULES = (
+    (r"^\[source[^\]\n]*\]\n----[ \t]*\n.*?^----[ \t]*$", ""),  # Source blocks
+    (r"^----[ \t]*\n.*?^----[ \t]*$|^\.\.\.\.[ \t]*\n.*?^\.\.\.\.[ \t]*$", ""),  # Listing and literal blocks
+    (r"^____[ \t]*\n.*?^____[ \t]*$", ""),  # Quote blocks
+    (r"^(?:NOTE|TIP|WARNING|IMPORTANT|CAUTION):[^\n]*$", ""),
+    (r"^=+ [^\n]*$", ""),  # Headers
+    (r"^(?:\.+|\*+|-) [^\n]*$", ""),  # Lists
+    (r"^//[^\n]*$", ""),  # Comments
+    (r"^:[\w-]+:[^\n]*$|^\[[^\]\n]*\][ \t]*$", ""),  # Attribute entries and block attributes
+    (r"image::?[^\s\[]*\[[^\]\n]*\]", ""),
+    (r"(?:link:|https?://)[^\s\[]*\[([^\]\n]*)\]", "{}"),  # Links keep their text
+    (r"[*_+^~`]+", ""),  # Inline styles
+) + COMMON_RULES
+
+RST_RULES = (
+    (r"^\.\. [\w-]+::[^\n]*\n(?:[ \t]+[^\n]*\n|[ \t]*\n)*", ""),  # Directives with their indented body
+    (r"(?<=\S)::[ \t]*\n(?:[ \t]+[^\n]*\n|[ \t]*\n)*", ":\n"),  # Literal blocks
+    (r"^\.\. [^\n]*$", ""),  # Comments and link targets
+    (r"^(?:={3,}|-{3,}|~{3,}|\^{3,}|\*{3,}|#{3,}|\+{3,}|`{3,}|'{3,}|\"{3,})[ \t]*$", ""),  # Section adornments
+    (r"`([^`<\n]*?)\s*<[^>\n]*>`__?", "{}"),  # Links keep their text
+    (r":[\w-]+:`([^`\n]*)`|``([^`\n]+)``|`([^`\n]+)`_{0,2}", "{}"),  # Roles, literals and references
+    (r"\*{1,2}([^*\n]+)\*{1,2}", "{}"),  # Emphasis
+    (r"^[ \t]*[-*+][ \t]+", ""),  # Bullets
+) + COMMON_RULES
+
+WHITESPACE = re.compile(r"\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+
+class Cleaner:
+    """Strips one markup format from a document in a single pass of one precompiled alternation."""
+
+    def __init__(self, rules):
+        parts = []
+        self.replacements = {}
+        self.groups = {}
+        group = 0
+        for index, (pattern, replacement) in enumerate(rules):
+            name = f"rule{index}"
+            parts.append(f"(?P<{name}>{pattern})")
+            inner = re.compile(pattern).groups
+            self.replacements[name] = replacement
+            self.groups[name] = range(group + 2, group + 2 + inner)
+            group += 1 + inner
+        self.pattern = re.compile("|".join(parts), re.MULTILINE | re.DOTALL)
+
+    def _replace(self, match):
+        name = match.lastgroup
+        replacement = self.replacements[name]
+        if not replacement:
+            return replacement
+        text = next((match.group(group) for group in self.groups[name] if match.group(group) is not None), "")
+        return replacement.format(text)
+
+    def clean(self, text):
+        return self.pattern.sub(self._replace, text)
+
+
+CLEANERS = {
+    "md": Cleaner(MARKDOWN_RULES),
+    "adoc": Cleaner(ADOC_RULES),
+    "rst": Cleaner(RST_RULES),
+}
+
+
+def readme_format(text):
+    """Tells AsciiDoc and reStructuredText READMEs apart from Markdown by their markup."""
+    if ADOC_MACRO.search(text) or (ADOC_TITLE.search(text) and ADOC_ATTRIBUTE.search(text)):
+        return "adoc"
+    if RST_MARKUP.search(text):
+        return "rst"
+    return "md"
+
+
+def sentences(text, text_format=None):
+    """
+    Returns the prose of a README as a list of sentences, with markup and extra whitespace removed.
+
+    Args:
+        text (str): The README as written.
+        text_format (str): "md", "adoc" or "rst", told from the markup by default.
+    """
+    cleaned = CLEANERS[text_format or readme_format(text)].clean(text)
+    cleaned = WHITESPACE.sub(" ", cleaned).strip()
+    return SENTENCE_END.split(cleaned) if cleaned else []
+
+
+def plain_text(text, text_format=None):
+    """Returns the sentences of a README one per line, the form READMEs are cached and summarized in."""
+    return "\n".join(sentences(text, text_format))
@@ -0,0 +1,145 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rich import print
+from rich.progress import Progress
+
+from consolebot.githubdata import GithubData
+from consolebot.readmeindex import ReadmeIndex
+
+DEFAULT_CONCURRENCY = 8
+RECENT_COMMITS = 30  # Commits kept in the details, and fetched into an empty commit log
+LANGUAGES = 100  # The most GraphQL returns, the languages API returns every one
+
+
+def _fetch_contributors(data_source, repo):
+    contributions = data_source.get_repo_contributions(repo)
+    # The store indexes the counts by login, which answers what a person works on
+    return {"contributors": [contributor["login"] for contributor in contributions],
+            "contributions": {contributor["login"]: contributor["contributions"] for contributor in contributions}}
+
+
+def _fetch_languages(data_source, repo):
+    # The store indexes the byte counts by language, which answers which repos use one
+    language_bytes = data_source.get_repo_language_bytes(repo)
+    return {"languages": list(language_bytes), "language_bytes": language_bytes}
+
+
+def _fetch_readme(data_source, repo):
+    readme = data_source.get_readme(repo) or {}  # None only when the repo has no README
+    return {"readme_sha": readme.get("sha"), "readme": readme.get("content")}
+
+
+def _fetch_commits(data_source, repo):
+    # Brings the repo's commit log up to date, which after the first refresh only fetches new commits
+    return {"commits": data_source.get_recent_commits(repo, count=RECENT_COMMITS)}
+
+
+# Each fetcher returns the fields it contributes to a repo's stored details
+RESOURCES = {
+    "contributors": _fetch_contributors,
+    "languages": _fetch_languages,
+    "readme": _fetch_readme,
+    "commits": _fetch_commits,
+}
+
+# The resources a GraphQL metadata query fetches for a whole chunk of repos at once
+GRAPHQL_RESOURCES = ("languages", "readme", "commits")
+
+
+def _fetch_metadata(data_source, repos):
+    """Returns the details of a chunk of repos from one GraphQL query, by repo name."""
+    details = {}
+    for repo_name, metadata in data_source.get_repos_metadata(repos, commits=RECENT_COMMITS, languages=LANGUAGES).items():
+        readme = metadata["readme"] or {}
+        details[repo_name] = {
+            "description": metadata["description"],
+            "languages": metadata["languages"],
+            "language_bytes": metadata["language_bytes"],
+            "readme_sha": readme.get("sha"),
+            "readme": readme.get("content"),
+            "commits": metadata["commits"],
+        }
+    return details
+
+
+def refresh_repo_details(concurrency=DEFAULT_CONCURRENCY, data_source=GithubData, store=None, resources=RESOURCES, graphql=False):
+    """
+    Fetches every per-repo resource of every repository in parallel and saves them locally.
+
+    Each (repo, resource) pair is a separate task on a bounded thread pool, so
+    slow repos do not hold up the rest of the crawl. With `graphql`, languages,
+    READMEs and commits come from GraphQL queries covering a chunk of repos
+    each instead, which are tasks on the same pool.
+
+    Args:
+        concurrency (int): Maximum number of requests in flight.
+        data_source: Where repositories and their details come from.
+        store (RepoStore): Where the details are saved, the data source's store by default.
+        resources (dict): Resource name to fetcher function.
+        graphql (bool): Fetch GRAPHQL_RESOURCES in batched GraphQL queries.
+
+    Returns:
+        The store holding the refreshed details.
+    """
+    store = store or data_source.get_store()
+    repos = data_source.get_formatted_repos()
+    start = time.perf_counter()
+    failures = 0
+    chunks = []
+    if graphql:
+        resources = {resource: fetch for resource, fetch in resources.items() if resource not in GRAPHQL_RESOURCES}
+        repo_list = list(repos.values())
+        size = data_source.graphql_chunk_size(RECENT_COMMITS, LANGUAGES)
+        chunks = [repo_list[index:index + size] for index in range(0, len(repo_list), size)]
+
+    with Progress() as progress, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        task = progress.add_task("Refreshing repositories...", total=len(repos) * (len(resources) + bool(chunks)))
+        futures = {
+            executor.submit(fetch, data_source, repo): (repo_name, resource)
+            for repo_name, repo in repos.items()
+            for resource, fetch in resources.items()
+        }
+        for chunk in chunks:
+            futures[executor.submit(_fetch_metadata, data_source, chunk)] = (chunk, "metadata")
+        for future in as_completed(futures):
+            target, resource = futures[future]
+            if resource == "metadata":
+                names = [repo["name"] for repo in target]
+                try:
+                    details = future.result()
+                except Exception as e:
+                    details = {}
+                    progress.console.print(f"Failed to refresh metadata for {len(names)} repositories: {e}")
+                for repo_name in names:
+                    if repo_name in details:
+                        store.update_details(repo_name, **details[repo_name])
+                    else:
+                        failures += 1
+                progress.advance(task, len(names))
+                continue
+            try:
+                store.update_details(target, **future.result())
+            except Exception as e:
+                failures += 1
+                progress.console.print(f"Failed to refresh {resource} for {target}: {e}")
+            progress.advance(task)
+
+    refreshed_at = datetime.datetime.now().isoformat()
+    for repo_name in repos:
+        store.update_details(repo_name, refreshed_at=refreshed_at)
+    # Only READMEs whose SHA changed are re-indexed, and repos no longer in the list are dropped
+    details = {repo_name: repo_details for repo_name, repo_details in store.all_details().items() if repo_name in repos}
+    indexed, dropped = ReadmeIndex(store).update(details)
+    store.set_meta(refreshed_at=refreshed_at)  # Tells a running daemon to reload the indexes
+
+    elapsed = time.perf_counter() - start
+    print(f"Refreshed {len(repos)} repositories in {elapsed:.1f}s with {failures} failures.")
+    print(f"Search index: {indexed} READMEs indexed, {dropped} dropped.")
+    rate_limiter = getattr(data_source, "rate_limiter", None)
+    if rate_limiter:
+        stats = rate_limiter.stats()
+        print(f"GitHub requests: {stats['requests']}, retries: {stats['retries']}, "
+              f"throttled: {stats['throttled_seconds']:.1f}s, rate limit remaining: {stats['rate_limit_remaining']}")
+    return store
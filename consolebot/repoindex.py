@@ -0,0 +1,106 @@
+import re
+from collections import Counter, defaultdict
+
+from rapidfuzz import fuzz, process, utils
+
+NAME_SEPARATORS = re.compile(r'[-_]')
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+SHORTLIST_SIZE = 50  # Fuzzy candidates kept after trigram filtering
+
+
+def trigrams(text):
+    """Character trigrams of the lowercased, space-padded words in `text`."""
+    text = f" {NON_ALPHANUMERIC.sub(' ', text.lower()).strip()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def split_repo_name(name):
+    """Splits a repository name like `frontend-operator` or `insights_core` into its tokens."""
+    return tuple(token for token in NAME_SEPARATORS.split(name) if token)
+
+
+class RepoNameIndex:
+    """
+    Precomputed lookup structures over repository names.
+
+    Multi-token names (split on '-' and '_') are indexed by each token, so
+    only the names sharing every token with a query are checked for whether
+    the query spells them out, which keeps the lookup linear in the number
+    of query words.
+
+    For fuzzy matching, a character trigram inverted index shortlists the
+    names sharing the most trigrams with the query, and only the shortlist
+    is scored, in one batch.
+    """
+
+    def __init__(self, repo_names, shortlist_size=SHORTLIST_SIZE):
+        self.names = list(repo_names)
+        self.shortlist_size = shortlist_size
+        self.name_set = set(self.names)
+        self.tokens = {}  # multi-token name -> its tokens
+        self.postings = defaultdict(set)  # token -> multi-token names containing it
+        self.token_counts = {}  # multi-token name -> number of distinct tokens
+        self.trigram_postings = defaultdict(list)  # trigram -> names containing it
+        self.trigram_counts = {}  # name -> number of distinct trigrams
+
+        for name in self.names:
+            name_trigrams = trigrams(name)
+            for trigram in name_trigrams:
+                self.trigram_postings[trigram].append(name)
+            self.trigram_counts[name] = len(name_trigrams)
+
+            tokens = split_repo_name(name)
+            if len(tokens) < 2:
+                continue  # Single-word names are matched directly against query words
+            self.tokens[name] = tokens
+            for token in set(tokens):
+                self.postings[token].add(name)
+            self.token_counts[name] = len(set(tokens))
+
+    def multi_word_matches(self, query_words):
+        """
+        Returns the multi-token repo names mentioned by a list of query words.
+
+        A name is mentioned when its tokens occur in the query in order, though
+        not necessarily next to each other, like the combinations of query words
+        `generate_combinations` lists: "frontend for the operator" mentions
+        `frontend-operator`, "operator for the frontend" does not, and a token
+        repeated in a name has to be repeated in the query.
+        """
+        hits = Counter()
+        for word in set(query_words):
+            hits.update(self.postings.get(word, ()))
+        return {name for name, count in hits.items()
+                if count == self.token_counts[name] and self._in_order(self.tokens[name], query_words)}
+
+    @staticmethod
+    def _in_order(tokens, words):
+        remaining = iter(words)
+        return all(token in remaining for token in tokens)  # Each `in` resumes where the previous token was found
+
+    def single_word_matches(self, query_words):
+        return self.name_set.intersection(query_words)
+
+    def fuzzy_candidates(self, query):
+        """
+        Returns the names worth fuzzy scoring against a query.
+
+        Names are ranked by the share of their trigrams that also occur in the
+        query, which favours names contained in the query as WRatio does.
+        """
+        if len(self.names) <= self.shortlist_size:
+            return self.names
+
+        hits = Counter()
+        for trigram in trigrams(query):
+            hits.update(self.trigram_postings.get(trigram, ()))
+        if not hits:
+            return self.names  # Nothing in common at all, let the scorer decide
+        ranked = sorted(hits, key=lambda name: (-hits[name] / self.trigram_counts[name], name))
+        return ranked[:self.shortlist_size]
+
+    def fuzzy_matches(self, query, limit=10):
+        """Returns up to `limit` (name, score) pairs, scoring the shortlist with WRatio in one call."""
+        candidates = self.fuzzy_candidates(query)
+        matches = process.extract(query, candidates, scorer=fuzz.WRatio, processor=utils.default_process, limit=limit)
+        return [(name, round(score)) for name, score, _ in matches]
@@ -0,0 +1,357 @@
+import json
+import os
+import sqlite3
+import threading
+
+DB_PATH = os.path.expanduser('~/.config/consolebot/consolebot.db')
+
+# The only repository fields consolebot reads; everything else the GitHub API returns is dropped
+REPO_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "updated_at",
+    "contents_url",
+    "contributors_url",
+    "languages_url",
+    "commits_url",
+)
+
+COMMIT_FIELDS = ("repo", "sha", "date", "contributor", "message")
+
+# Tables holding per-repo rows, with their repo name column, pruned when a repo leaves the repository list
+REPO_TABLES = (
+    ("repo_details", "name"),
+    ("readme_index", "repo"),
+    ("readme_terms", "repo"),
+    ("contributions", "repo"),
+    ("languages", "repo"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    updated_at TEXT,
+    contents_url TEXT,
+    contributors_url TEXT,
+    languages_url TEXT,
+    commits_url TEXT
+);
+CREATE TABLE IF NOT EXISTS repo_details (
+    name TEXT PRIMARY KEY,
+    details TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    date TEXT NOT NULL,
+    contributor TEXT,
+    message TEXT,
+    PRIMARY KEY (repo, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_by_date ON commits (repo, date);
+CREATE TABLE IF NOT EXISTS readme_texts (
+    sha TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contributions (
+    login TEXT NOT NULL COLLATE NOCASE,
+    repo TEXT NOT NULL,
+    contributions INTEGER NOT NULL,
+    PRIMARY KEY (login, repo)
+);
+CREATE INDEX IF NOT EXISTS contributions_by_repo ON contributions (repo);
+CREATE TABLE IF NOT EXISTS languages (
+    repo TEXT NOT NULL,
+    language TEXT NOT NULL COLLATE NOCASE,
+    bytes INTEGER NOT NULL,
+    percent REAL NOT NULL,
+    PRIMARY KEY (repo, language)
+);
+CREATE INDEX IF NOT EXISTS languages_by_language ON languages (language, bytes);
+CREATE TABLE IF NOT EXISTS readme_index (
+    repo TEXT PRIMARY KEY,
+    sha TEXT NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS readme_terms (
+    term TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, repo)
+);
+CREATE INDEX IF NOT EXISTS readme_terms_by_repo ON readme_terms (repo);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class RepoStore:
+    """
+    SQLite store of the repository list, per-repo details and sync metadata.
+
+    Repos are stored with only the fields in REPO_FIELDS and are indexed by
+    name. Details fetched by `refresh` (contributors, languages, README,
+    commits) are kept per repo name as a JSON document. Each repo also has a
+    commit log, which only ever grows by the commits newer than its newest one.
+    The prose of each README, cleaned of markup, is kept by blob SHA.
+    Contribution counts in the details are also indexed by login, so the
+    repos a person works on are found without going through every repo, and
+    language byte counts by language, so are the repos written in one.
+    README text is indexed by term for full-text search, see `ReadmeIndex`.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._connection = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def slim(repo):
+        """Projects a GitHub API repository onto the fields we store."""
+        return {field: repo.get(field) for field in REPO_FIELDS}
+
+    def get_repos(self):
+        with self._lock:
+            rows = self._connect().execute(f"SELECT {', '.join(REPO_FIELDS)} FROM repos").fetchall()
+        return [dict(row) for row in rows]
+
+    def get_repo(self, name):
+        with self._lock:
+            row = self._connect().execute(f"SELECT {', '.join(REPO_FIELDS)} FROM repos WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row else None
+
+    def replace_repos(self, repos):
+        """Replaces the whole repository list in one transaction, dropping what is stored for repos no longer in it."""
+        rows = [tuple(self.slim(repo)[field] for field in REPO_FIELDS) for repo in repos]
+        placeholders = ", ".join("?" for _ in REPO_FIELDS)
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM repos")
+                connection.executemany(f"INSERT OR REPLACE INTO repos ({', '.join(REPO_FIELDS)}) VALUES ({placeholders})", rows)
+                for table, column in REPO_TABLES:  # Deleted and renamed repos
+                    connection.execute(f"DELETE FROM {table} WHERE {column} NOT IN (SELECT name FROM repos)")
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, **values):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items())
+
+    def get_details(self, name):
+        with self._lock:
+            row = self._connect().execute("SELECT details FROM repo_details WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["details"]) if row else None
+
+    def all_details(self):
+        with self._lock:
+            rows = self._connect().execute("SELECT name, details FROM repo_details").fetchall()
+        return {row["name"]: json.loads(row["details"]) for row in rows}
+
+    def update_details(self, name, **details):
+        """
+        Merges the given fields into a repo's stored details.
+
+        Its "contributions" (login to count) and "language_bytes" (language
+        to bytes of code) are re-indexed when given.
+        """
+        with self._lock:
+            merged = self.get_details(name) or {}
+            merged.update(details)
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO repo_details (name, details) VALUES (?, ?)", (name, json.dumps(merged)))
+                if "contributions" in details:
+                    connection.execute("DELETE FROM contributions WHERE repo = ?", (name,))
+                    connection.executemany("INSERT OR REPLACE INTO contributions (login, repo, contributions) VALUES (?, ?, ?)",
+                                           [(login, name, count) for login, count in details["contributions"].items()])
+                if "language_bytes" in details:
+                    total = sum(details["language_bytes"].values()) or 1
+                    connection.execute("DELETE FROM languages WHERE repo = ?", (name,))
+                    connection.executemany("INSERT OR REPLACE INTO languages (repo, language, bytes, percent) VALUES (?, ?, ?, ?)",
+                                           [(name, language, size, 100.0 * size / total) for language, size in details["language_bytes"].items()])
+
+    def get_person_repos(self, login):
+        """Returns (repo name, contribution count) pairs of the repos a login contributed to, most contributions first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT repo, contributions FROM contributions WHERE login = ? ORDER BY contributions DESC, repo", (login,)).fetchall()
+        return [(row["repo"], row["contributions"]) for row in rows]
+
+    def get_repo_contributions(self, name):
+        """Returns (login, contribution count) pairs of a repo's indexed contributors, most contributions first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT login, contributions FROM contributions WHERE repo = ? ORDER BY contributions DESC, login", (name,)).fetchall()
+        return [(row["login"], row["contributions"]) for row in rows]
+
+    def get_logins(self):
+        """Returns every login in the contributor index."""
+        with self._lock:
+            rows = self._connect().execute("SELECT DISTINCT login FROM contributions").fetchall()
+        return [row["login"] for row in rows]
+
+    def get_language_repos(self, language):
+        """Returns (repo name, bytes, percent of the repo) for every repo written partly in a language, most bytes first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT repo, bytes, percent FROM languages WHERE language = ? ORDER BY bytes DESC, repo", (language,)).fetchall()
+        return [(row["repo"], row["bytes"], row["percent"]) for row in rows]
+
+    def get_repo_languages(self, name):
+        """Returns (language, bytes, percent of the repo) for every language of a repo, most bytes first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT language, bytes, percent FROM languages WHERE repo = ? ORDER BY bytes DESC, language", (name,)).fetchall()
+        return [(row["language"], row["bytes"], row["percent"]) for row in rows]
+
+    def get_language_totals(self):
+        """Returns (language, bytes, repo count) for every language in the org, most bytes first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT language, SUM(bytes) AS bytes, COUNT(*) AS repos FROM languages GROUP BY language ORDER BY bytes DESC").fetchall()
+        return [(row["language"], row["bytes"], row["repos"]) for row in rows]
+
+    def indexed_readmes(self):
+        """Returns the blob SHA each repo's README was indexed at, by repo name."""
+        with self._lock:
+            rows = self._connect().execute("SELECT repo, sha FROM readme_index").fetchall()
+        return {row["repo"]: row["sha"] for row in rows}
+
+    def index_readmes(self, readmes):
+        """Replaces the indexed terms of each (repo name, blob SHA, term to occurrences) README, in one transaction."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for name, sha, term_counts in readmes:
+                    connection.execute("DELETE FROM readme_terms WHERE repo = ?", (name,))
+                    connection.execute("INSERT OR REPLACE INTO readme_index (repo, sha, length) VALUES (?, ?, ?)",
+                                       (name, sha, sum(term_counts.values())))
+                    connection.executemany("INSERT INTO readme_terms (term, repo, count) VALUES (?, ?, ?)",
+                                           [(term, name, count) for term, count in term_counts.items()])
+
+    def remove_readmes(self, names):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany("DELETE FROM readme_terms WHERE repo = ?", [(name,) for name in names])
+                connection.executemany("DELETE FROM readme_index WHERE repo = ?", [(name,) for name in names])
+
+    def readme_stats(self):
+        """Returns the number of indexed READMEs and their average length in terms."""
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*) AS documents, AVG(length) AS average FROM readme_index").fetchone()
+        return row["documents"], row["average"] or 0.0
+
+    def readme_frequencies(self, terms):
+        """Returns how many indexed READMEs contain each of the terms, leaving out terms in none."""
+        terms = list(terms)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT term, COUNT(*) AS documents FROM readme_terms WHERE term IN ({', '.join('?' * len(terms))}) GROUP BY term",
+                terms).fetchall()
+        return {row["term"]: row["documents"] for row in rows}
+
+    def score_readmes(self, weights, k1, b, average_length, limit):
+        """
+        Returns the `limit` best (repo name, BM25 score) pairs of the indexed READMEs, best first.
+
+        `weights` maps each query term to its inverse document frequency, `k1`
+        and `b` are the BM25 parameters. The scores are summed up by SQLite,
+        so only the best READMEs are read back.
+        """
+        values = ", ".join("(?, ?)" for _ in weights)
+        parameters = [value for item in weights.items() for value in item]
+        with self._lock:
+            rows = self._connect().execute(f"""
+                WITH weights (term, idf) AS (VALUES {values})
+                SELECT terms.repo AS repo,
+                       SUM(weights.idf * terms.count * (? + 1)
+                           / (terms.count + ? * (1 - ? + ? * readmes.length / ?))) AS score
+                FROM weights
+                JOIN readme_terms AS terms ON terms.term = weights.term
+                JOIN readme_index AS readmes ON readmes.repo = terms.repo
+                GROUP BY terms.repo
+                ORDER BY score DESC, terms.repo
+                LIMIT ?""", parameters + [k1, k1, b, b, average_length or 1.0, limit]).fetchall()
+        return [(row["repo"], row["score"]) for row in rows]
+
+    def get_readme_text(self, sha):
+        with self._lock:
+            row = self._connect().execute("SELECT text FROM readme_texts WHERE sha = ?", (sha,)).fetchone()
+        return row["text"] if row else None
+
+    def put_readme_text(self, sha, text):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO readme_texts (sha, text) VALUES (?, ?)", (sha, text))
+
+    @staticmethod
+    def _commit_rows(name, commits):
+        return [(name, commit["sha"], commit["date"], commit["contributor"], commit["message"]) for commit in commits]
+
+    def add_commits(self, name, commits):
+        """Adds commits to a repo's log, ignoring the ones already in it."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(f"INSERT OR IGNORE INTO commits ({', '.join(COMMIT_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                                       self._commit_rows(name, commits))
+
+    def replace_commits(self, name, commits):
+        """Starts a repo's commit log over with the given commits, in one transaction."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM commits WHERE repo = ?", (name,))
+                connection.executemany(f"INSERT OR IGNORE INTO commits ({', '.join(COMMIT_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                                       self._commit_rows(name, commits))
+
+    def get_commits(self, name, limit=None, since=None):
+        """Returns a repo's logged commits, newest first, optionally only the ones from `since` on."""
+        sql = "SELECT sha, date, contributor, message FROM commits WHERE repo = ?"
+        params = [name]
+        if since:
+            sql += " AND date >= ?"
+            params.append(since)
+        sql += " ORDER BY date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def commit_range(self, name):
+        """Returns the dates of the oldest and newest logged commits of a repo, (None, None) for an empty log."""
+        with self._lock:
+            row = self._connect().execute("SELECT MIN(date), MAX(date) FROM commits WHERE repo = ?", (name,)).fetchone()
+        return row[0], row[1]
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+
+SUMMARY_PATH = os.path.expanduser('~/.config/consolebot/summaries.json')
+
+
+class SummaryCache:
+    """
+    Persistent store of generated repo summaries.
+
+    Each summary is stored with the blob SHA of the README it was generated
+    from, so it stays valid until the README content changes.
+    """
+
+    def __init__(self, path=SUMMARY_PATH):
+        self.path = path
+        self._entries = None
+        self._mtime = None
+        self._unsaved = set()  # Repos put since the last save
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Reload when another process (e.g. a nightly `summarize`) rewrote the file
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if self._entries is None or (mtime is not None and mtime != self._mtime):
+            entries = {}
+            if mtime is not None:
+                with open(self.path, 'r') as file:
+                    entries = json.load(file)
+            for repo_name in self._unsaved:
+                entries[repo_name] = self._entries[repo_name]  # Keep summaries not saved yet over the file's
+            self._entries = entries
+            self._mtime = mtime
+        return self._entries
+
+    def get(self, repo_name, readme_sha):
+        """Returns the stored summary if it was generated from this README, otherwise None."""
+        with self._lock:
+            entry = self._load().get(repo_name)
+        if entry and entry.get('sha') == readme_sha:
+            return entry['summary']
+        return None
+
+    def put(self, repo_name, readme_sha, summary):
+        with self._lock:
+            self._load()[repo_name] = {'sha': readme_sha, 'summary': summary}
+            self._unsaved.add(repo_name)
+
+    def save(self):
+        with self._lock:
+            entries = dict(self._load())
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(entries, file)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._mtime = os.path.getmtime(self.path)
+            # Summaries put again while saving are still unsaved
+            self._unsaved = {repo_name for repo_name in self._unsaved if self._entries[repo_name] is not entries.get(repo_name)}
@@ -0,0 +1,145 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+from rich.table import Table
+
+_spans = []
+_lock = threading.Lock()
+_local = threading.local()
+_state = {"enabled": False, "origin": 0.0}
+
+
+class Span:
+    """One timed stage: a name, a category, when it started and how long it took, plus free-form attributes."""
+
+    __slots__ = ("name", "category", "start", "duration", "attributes", "depth", "thread")
+
+    def __init__(self, name, category, start, depth, attributes):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = None
+        self.depth = depth
+        self.thread = threading.get_ident()
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "category": self.category,
+            "start_ms": round(self.start * 1000, 3),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "depth": self.depth,
+            "thread": self.thread,
+            "attributes": self.attributes,
+        }
+
+
+class _NullSpan:
+    """What `span` yields while tracing is off, so callers can set attributes unconditionally."""
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    """Starts recording spans, forgetting any recorded before."""
+    with _lock:
+        _spans.clear()
+        _state.update(enabled=True, origin=time.perf_counter())
+
+
+def disable():
+    _state["enabled"] = False
+
+
+def enabled():
+    return _state["enabled"]
+
+
+@contextlib.contextmanager
+def span(name, category="stage", **attributes):
+    """
+    Records how long the block took as a span, when tracing is enabled.
+
+    Spans opened inside the block on the same thread are nested under it.
+    The yielded span takes extra attributes, e.g. a response status.
+    """
+    if not _state["enabled"]:
+        yield _NULL_SPAN
+        return
+    depth = getattr(_local, "depth", 0)
+    current = Span(name, category, time.perf_counter() - _state["origin"], depth, attributes)
+    with _lock:
+        _spans.append(current)
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        _local.depth = depth
+
+
+def spans():
+    """Returns the finished spans, in the order they started."""
+    with _lock:
+        return sorted((s for s in _spans if s.duration is not None), key=lambda s: s.start)
+
+
+def _details(attributes):
+    parts = []
+    for key, value in attributes.items():
+        if key == "bytes":
+            value = f"{value / 1024:.1f} KiB"
+        parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+
+def render_timings():
+    """A table of every span, indented by nesting, followed by totals per category."""
+    table = Table(title="Timings")
+    table.add_column("Stage")
+    table.add_column("Start", justify="right")
+    table.add_column("Duration", justify="right")
+    table.add_column("Details", overflow="fold")
+    totals = {}
+    for recorded in spans():
+        table.add_row("  " * recorded.depth + recorded.name, f"{recorded.start * 1000:.1f} ms",
+                      f"{recorded.duration * 1000:.1f} ms", _details(recorded.attributes))
+        count, seconds = totals.get(recorded.category, (0, 0.0))
+        totals[recorded.category] = (count + 1, seconds + recorded.duration)
+    for category, (count, seconds) in totals.items():
+        table.add_row(f"[bold]{category}[/bold] x{count}", "", f"[bold]{seconds * 1000:.1f} ms[/bold]", "")
+    return table
+
+
+def export(path, format="chrome"):
+    """
+    Writes the recorded spans to `path`.
+
+    Args:
+        path (str): File to write.
+        format (str): "chrome" for the Trace Event format read by chrome://tracing
+            and Perfetto, "json" for a plain list of spans.
+    """
+    if format == "chrome":
+        pid = os.getpid()
+        payload = {"traceEvents": [
+            {"name": s.name, "cat": s.category, "ph": "X", "ts": round(s.start * 1e6, 1),
+             "dur": round(s.duration * 1e6, 1), "pid": pid, "tid": s.thread, "args": s.attributes}
+            for s in spans()
+        ]}
+    else:
+        payload = [s.to_dict() for s in spans()]
+    with open(path, "w") as file:
+        json.dump(payload, file, indent=1, default=str)
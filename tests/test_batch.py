@@ -0,0 +1,113 @@
+import io
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from consolebot import batch, query
+
+REPOS = {
+    "frontend-operator": {"description": "Deploys frontends"},
+    "insights-core": {"description": "Rules engine"},
+    "ledger": {"description": "Billing backend"},
+}
+
+STOP_WORDS = frozenset({"who", "on", "the", "is", "what", "in", "about", "me", "tell"})
+
+
+class MockModel:
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, normalize_embeddings=False):
+        self.calls.append(sentences)
+        if isinstance(sentences, str):
+            return np.ones(2, dtype=np.float32)
+        return np.ones((len(sentences), 2), dtype=np.float32)
+
+
+@patch('consolebot.query.english_stop_words', return_value=STOP_WORDS)
+@patch('consolebot.query.cached_github_data', REPOS)
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.model = MockModel()
+        patcher = patch('consolebot.query.sbert_model', return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('consolebot.query.contributor_logins', return_value={"alice": "Alice"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('consolebot.query.language_pattern', return_value=query.compile_language_pattern(["Go"]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('consolebot.query.indexed_languages', return_value={"go": "Go"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_queries(self, mock_stop_words):
+        lines = ['who works on ledger\n', '\n', '{"id": 7, "query": "describe insights-core"}\n']
+        records = batch.read_queries(lines)
+        self.assertEqual([record["query"] for record in records], ["who works on ledger", "describe insights-core"])
+        self.assertEqual(records[1]["id"], 7)
+
+    @patch('consolebot.query.repo_embeddings', return_value=Mock(search=Mock(return_value=[])))
+    @patch('consolebot.query.answer_intent', return_value="Alice, Bob")
+    def test_bad_lines_are_reported_and_the_rest_answered(self, mock_answer, mock_embeddings, mock_stop_words):
+        output = io.StringIO()
+        lines = ['who works on ledger\n', '{"id": 2, "query": \n', '{"id": 3}\n', '{"id": 4, "query": "ledger contributors"}\n']
+        with patch('sys.stderr', io.StringIO()):
+            batch.run_batch(lines, output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([result["answer"] for result in results], ["Alice, Bob", None, None, "Alice, Bob"])
+        self.assertEqual(results[1]["line"], 2)
+        self.assertIn("Line 2 is not valid JSON", results[1]["error"])
+        self.assertEqual(results[2]["error"], 'Line 3 has no "query" field')
+        self.assertEqual(results[3]["id"], 4)
+
+    def test_fuzzy_matches_do_not_load_the_model(self, mock_stop_words):
+        records = batch.resolve(batch.read_queries(["who works on ledger", "describe insights core"]))
+        self.assertEqual([(record["repo"], record["intent"]) for record in records],
+                         [("ledger", "contributors"), ("insights-core", "summary")])
+        self.assertEqual(self.model.calls, [])
+
+    def test_person_queries_skip_repo_matching(self, mock_stop_words):
+        records = batch.resolve(batch.read_queries(["what does alice work on"]))
+        self.assertEqual([(record["person"], record["repo"], record["intent"]) for record in records], [("Alice", None, "person")])
+        with patch('consolebot.query.answer_intent', return_value="ledger (3 contributions)") as mock_answer:
+            batch.answer(records)
+        mock_answer.assert_called_once_with("person", "Alice", since=None)
+        self.assertEqual(records[0]["answer"], "ledger (3 contributions)")
+
+    def test_language_searches_skip_repo_matching(self, mock_stop_words):
+        records = batch.resolve(batch.read_queries(["which repos use go", "which language is ledger written in"]))
+        self.assertEqual([(record["language"], record["repo"]) for record in records], [("Go", None), (None, "ledger")])
+        self.assertEqual(records[0]["intent"], "language_search")
+
+    @patch('consolebot.query.intent_matrix')
+    @patch('consolebot.query.repo_embeddings')
+    def test_model_is_called_once_for_all_pending_queries(self, mock_embeddings, mock_intents, mock_stop_words):
+        mock_embeddings.return_value.search.return_value = [("ledger", 0.9), ("insights-core", 0.2)]
+        mock_intents.return_value.best.return_value = ("summary", 0.8, 0.3)
+        queries = ["ledger purpose of it", "the money thing wherever", "insights-core purpose of it"]
+        records = batch.resolve(batch.read_queries(queries))
+        self.assertEqual(len(self.model.calls), 1)
+        self.assertEqual([(record["repo"], record["intent"]) for record in records],
+                         [("ledger", "summary"), ("ledger", "summary"), ("insights-core", "summary")])
+
+    @patch('consolebot.query.repo_embeddings', return_value=Mock(search=Mock(return_value=[])))
+    @patch('consolebot.query.answer_intent', return_value="Alice, Bob")
+    def test_answers_are_looked_up_once_per_repo_and_intent(self, mock_answer, mock_embeddings, mock_stop_words):
+        output = io.StringIO()
+        with patch('sys.stderr', io.StringIO()):
+            batch.run_batch(["who works on ledger", "ledger contributors", "who is behind nothingatall"], output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(mock_answer.call_count, 1)
+        self.assertEqual([result["answer"] for result in results], ["Alice, Bob", "Alice, Bob", None])
+        self.assertIn("Ambiguous repository", results[2]["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from benchmarks.run import compare, percentile, summarize
+from benchmarks.synthetic import QUERY_LENGTHS, generate_org, generate_queries
+
+
+class TestSyntheticOrg(unittest.TestCase):
+
+    def test_org_is_deterministic(self):
+        self.assertEqual(generate_org(200, seed=1), generate_org(200, seed=1))
+        self.assertNotEqual(list(generate_org(200, seed=1)), list(generate_org(200, seed=2)))
+
+    def test_org_has_requested_size(self):
+        org = generate_org(5000)
+        self.assertEqual(len(org), 5000)
+        self.assertTrue(all(name == repo["name"] and repo["description"] for name, repo in org.items()))
+
+    def test_queries_fit_their_length(self):
+        org = generate_org(100)
+        for length, (low, _) in QUERY_LENGTHS.items():
+            for item in generate_queries(org, 20, length):
+                self.assertGreaterEqual(len(item["query"].split()), low)
+                self.assertIn(item["repo"], org)
+
+
+class TestResults(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_summarize(self):
+        stats = summarize([1_000_000, 2_000_000, 3_000_000], 2048, correct=2)
+        self.assertEqual(stats["p50_ms"], 2.0)
+        self.assertEqual(stats["peak_memory_kib"], 2.0)
+        self.assertEqual(stats["accuracy"], 0.667)
+
+    def test_compare_flags_slowdowns(self):
+        def results(p50):
+            return {"results": {"100": {"stage": {"p50_ms": p50, "p90_ms": p50}}}}
+        self.assertTrue(compare(results(1.0), results(1.5))[0][-1])
+        self.assertFalse(compare(results(1.0), results(1.1))[0][-1])
+        self.assertFalse(compare(results(0.01), results(0.03))[0][-1])  # Within timer noise
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import Mock, patch
+
+from rich import print as rich_print
+
+from consolebot import daemon
+
+
+def fake_runner(user_query, prompt=input):
+    rich_print(f"[bold]Query:[/bold] {user_query}")
+    choice = prompt("Pick one: ")
+    print(f"Picked {choice}")
+
+
+def failing_runner(user_query, prompt=input):
+    raise RuntimeError("boom")
+
+
+class TestDaemon(unittest.TestCase):
+
+    def start_server(self, runner, **kwargs):
+        self.tmpdir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmpdir, "cb.sock")
+        self.server = daemon.QueryServer(self.socket_path, runner, **kwargs)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    @patch('builtins.input', return_value="2")
+    def test_ask_streams_output_and_prompts(self, mock_input):
+        self.start_server(fake_runner)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertTrue(daemon.ask("who works on clowder", self.socket_path))
+        self.assertIn("Query: who works on clowder", out.getvalue())
+        self.assertIn("Picked 2", out.getvalue())
+        mock_input.assert_called_once_with("Pick one: ")
+
+    def test_ask_reports_runner_errors(self):
+        self.start_server(failing_runner)
+        err = io.StringIO()
+        with patch('sys.stderr', err):
+            self.assertTrue(daemon.ask("anything", self.socket_path))
+        self.assertIn("boom", err.getvalue())
+
+    def test_ask_without_daemon(self):
+        self.start_server(fake_runner)
+        self.assertFalse(daemon.ask("anything", os.path.join(self.tmpdir, "missing.sock")))
+        self.assertTrue(daemon.is_running(self.socket_path))
+
+    def test_reloads_when_the_data_changes(self):
+        versions = ["synced-1", "synced-1", "synced-2"]
+        reload = Mock()
+        self.start_server(fake_runner, data_version=lambda: versions.pop(0), reload=reload)
+        with redirect_stdout(io.StringIO()), patch('builtins.input', return_value="1"):
+            daemon.ask("first", self.socket_path)
+            reload.assert_not_called()
+            daemon.ask("second", self.socket_path)
+        reload.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
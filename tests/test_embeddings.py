@@ -0,0 +1,134 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from consolebot.embeddings import IntentMatrix, RepoEmbeddings
+
+VECTORS = {
+    "describe": [1.0, 0.0, 0.0],
+    "overview": [0.9, 0.1, 0.0],
+    "who works": [0.0, 1.0, 0.0],
+    "written in": [0.0, 0.0, 1.0],
+}
+
+
+class MockModel:
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False):
+        self.calls.append(list(sentences))
+        matrix = np.array([VECTORS[s] for s in sentences], dtype=np.float32)
+        if normalize_embeddings:
+            matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix
+
+
+class TestIntentMatrix(unittest.TestCase):
+
+    intents = {
+        "summary": ["describe", "overview"],
+        "contributors": ["who works"],
+        "language": ["written in"],
+    }
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_build_encodes_in_one_batch(self):
+        model = MockModel()
+        matrix = IntentMatrix.build(model, self.intents, "test-model", self.cache_dir)
+        self.assertEqual(model.calls, [["describe", "overview", "who works", "written in"]])
+        self.assertEqual(matrix.labels, ["summary", "summary", "contributors", "language"])
+
+    def test_build_reuses_cached_matrix(self):
+        IntentMatrix.build(MockModel(), self.intents, "test-model", self.cache_dir)
+        model = MockModel()
+        matrix = IntentMatrix.build(model, self.intents, "test-model", self.cache_dir)
+        self.assertEqual(model.calls, [])
+        self.assertEqual(matrix.matrix.shape, (4, 3))
+
+    def test_changed_phrases_invalidate_cache(self):
+        IntentMatrix.build(MockModel(), self.intents, "test-model", self.cache_dir)
+        model = MockModel()
+        IntentMatrix.build(model, {"summary": ["describe"]}, "test-model", self.cache_dir)
+        self.assertEqual(model.calls, [["describe"]])
+
+    def test_best_returns_intent_and_margin(self):
+        matrix = IntentMatrix.build(MockModel(), self.intents, "test-model", self.cache_dir)
+        intent, similarity, margin = matrix.best([0.1, 2.0, 0.0])
+        self.assertEqual(intent, "contributors")
+        self.assertAlmostEqual(similarity, 2.0 / np.linalg.norm([0.1, 2.0]), places=5)
+        self.assertGreater(margin, 0.5)
+
+    def test_rank_keeps_best_phrase_per_intent(self):
+        matrix = IntentMatrix.build(MockModel(), self.intents, "test-model", self.cache_dir)
+        ranked = matrix.rank([1.0, 0.0, 0.0])
+        self.assertEqual([intent for intent, _ in ranked], ["summary", "contributors", "language"])
+        self.assertAlmostEqual(ranked[0][1], 1.0, places=5)
+
+
+class KeywordModel:
+    """Embeds text by counting a few keywords, one dimension each."""
+
+    KEYWORDS = ("auth", "billing", "dashboard")
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False):
+        self.calls.append(list(sentences))
+        matrix = np.array([[s.lower().count(k) + 0.01 for k in self.KEYWORDS] for s in sentences], dtype=np.float32)
+        if normalize_embeddings:
+            matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix
+
+
+class TestRepoEmbeddings(unittest.TestCase):
+
+    repos = {
+        "gatekeeper": {"description": "Auth service"},
+        "ledger": {"description": "Billing backend"},
+        "frontend-ui": {"description": "Customer dashboard"},
+    }
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_search_ranks_by_description(self):
+        embeddings = RepoEmbeddings.build(KeywordModel(), self.repos, "test-model", self.cache_dir)
+        matches = embeddings.search([0.0, 1.0, 0.0], k=2)
+        self.assertEqual(len(matches), 2)
+        self.assertEqual(matches[0][0], "ledger")
+        self.assertGreater(matches[0][1], 0.9)
+
+    def test_rebuild_only_encodes_changed_repos(self):
+        RepoEmbeddings.build(KeywordModel(), self.repos, "test-model", self.cache_dir)
+        repos = dict(self.repos, ledger={"description": "Billing dashboard"}, vault={"description": "Secrets"})
+        model = KeywordModel()
+        embeddings = RepoEmbeddings.build(model, repos, "test-model", self.cache_dir)
+        self.assertEqual(model.calls, [["ledger. Billing dashboard", "vault. Secrets"]])
+        self.assertEqual(embeddings.names, list(repos))
+
+    def test_unchanged_repos_are_not_encoded(self):
+        RepoEmbeddings.build(KeywordModel(), self.repos, "test-model", self.cache_dir)
+        model = KeywordModel()
+        RepoEmbeddings.build(model, self.repos, "test-model", self.cache_dir)
+        self.assertEqual(model.calls, [])
+
+    def test_no_repos(self):
+        embeddings = RepoEmbeddings.build(KeywordModel(), {}, "test-model", self.cache_dir)
+        self.assertEqual(embeddings.search([1.0, 0.0, 0.0]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,373 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from consolebot import readmetext
+from consolebot.githubdata import GithubData
+from consolebot.httpcache import ResponseCache
+from consolebot.refresh import refresh_repo_details
+from consolebot.ratelimit import RateLimiter
+from consolebot.store import RepoStore
+from tests.test_standin import StandinTestCase
+
+
+def make_response(status_code, content=b"", headers=None):
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers or {})
+    return response
+
+
+class FakeSession:
+    """Stands in for requests.Session, answering GETs from a queue of responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+class GithubDataTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.sleeps = []
+        for attribute, value in (('response_cache', ResponseCache(self.cache_dir)),
+                                 ('rate_limiter', RateLimiter(sleep=self.sleeps.append))):
+            patcher = patch.object(GithubData, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def use_session(self, responses):
+        session = FakeSession(responses)
+        patcher = patch.object(GithubData, '_session', session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return session
+
+
+class TestConditionalRequests(GithubDataTestCase):
+
+    url = "https://api.github.com/repos/RedHatInsights/clowder/languages"
+
+    def test_304_is_served_from_cache(self):
+        session = self.use_session([
+            make_response(200, b'{"Go": 100}', {"ETag": '"v1"', "Link": '<https://next>; rel="next"'}),
+            make_response(304),
+        ])
+        first = GithubData._safe_request(self.url, {"Authorization": "Bearer x"})
+        second = GithubData._safe_request(self.url, {"Authorization": "Bearer x"})
+
+        self.assertNotIn("If-None-Match", session.requests[0][1])
+        self.assertEqual(session.requests[1][1]["If-None-Match"], '"v1"')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.links["next"]["url"], "https://next")
+        self.assertTrue(second.from_cache)
+
+    def test_changed_resource_replaces_cache_entry(self):
+        self.use_session([
+            make_response(200, b'{"Go": 100}', {"ETag": '"v1"'}),
+            make_response(200, b'{"Go": 200}', {"ETag": '"v2"'}),
+        ])
+        GithubData._safe_request(self.url, {})
+        response = GithubData._safe_request(self.url, {})
+        self.assertEqual(response.json(), {"Go": 200})
+        self.assertEqual(GithubData.response_cache.conditional_headers(self.url, {}), {"If-None-Match": '"v2"'})
+
+    def test_accept_header_is_part_of_the_key(self):
+        self.use_session([make_response(200, b'{}', {"ETag": '"v1"'})])
+        GithubData._safe_request(self.url, {})
+        self.assertEqual(GithubData.response_cache.conditional_headers(self.url, {"Accept": "application/vnd.github.raw"}), {})
+
+    def test_failures_return_none(self):
+        self.use_session([make_response(500)] * 3)
+        self.assertIsNone(GithubData._safe_request(self.url, {}, max_retries=3))
+
+
+class TestRetries(GithubDataTestCase):
+
+    url = "https://api.github.com/orgs/RedHatInsights/repos"
+
+    def test_server_errors_back_off(self):
+        session = self.use_session([make_response(502), make_response(502), make_response(200, b'[]')])
+        self.assertEqual(GithubData._safe_request(self.url, {}).json(), [])
+        self.assertEqual(len(session.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertLess(self.sleeps[0], self.sleeps[1] + 0.5)
+        self.assertEqual(GithubData.rate_limiter.stats()["retries"], 2)
+
+    def test_not_found_is_not_retried(self):
+        session = self.use_session([make_response(404)])
+        self.assertIsNone(GithubData._safe_request(self.url, {}))
+        self.assertEqual(len(session.requests), 1)
+
+    def test_secondary_rate_limit_honours_retry_after(self):
+        self.use_session([
+            make_response(403, b'{"message": "You have exceeded a secondary rate limit"}', {"Retry-After": "7"}),
+            make_response(200, b'[]'),
+        ])
+        self.assertIsNotNone(GithubData._safe_request(self.url, {}))
+        self.assertEqual(self.sleeps, [7.0])
+
+
+def repo(repo_id, name, updated_at):
+    return {"id": repo_id, "name": name, "updated_at": updated_at}
+
+
+class TestSyncRepos(GithubDataTestCase):
+
+    now = datetime.datetime(2023, 10, 20, 12, 0, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        super().setUp()
+        self.legacy_path = os.path.join(self.cache_dir, "repos.json")
+        self.store = RepoStore(os.path.join(self.cache_dir, "consolebot.db"))
+        self.addCleanup(self.store.close)
+        for attribute, value in (('LEGACY_DATA_PATH', self.legacy_path),
+                                 ('_store', self.store),
+                                 ('_formatted_repos_cache', None),
+                                 ('TOKEN_PATH', os.path.join(self.cache_dir, "token")),
+                                 ('_now', staticmethod(lambda: self.now))):
+            patcher = patch.object(GithubData, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_cache(self, repos, synced_at, full_synced_at):
+        self.store.replace_repos(repos)
+        self.store.set_meta(synced_at=synced_at, full_synced_at=full_synced_at)
+
+    def test_incremental_sync_stops_at_last_sync(self):
+        self.write_cache(
+            [repo(1, "clowder", "2023-10-01T00:00:00Z"), repo(2, "old-name", "2023-10-01T00:00:00Z"), repo(3, "chrome", "2023-10-01T00:00:00Z")],
+            "2023-10-19T12:00:00+00:00", "2023-10-18T12:00:00+00:00")
+        session = self.use_session([make_response(200, json.dumps([
+            repo(2, "new-name", "2023-10-20T09:00:00Z"),
+            repo(3, "chrome-build", "2023-10-20T08:00:00Z"),
+            repo(4, "brand-new", "2023-10-19T13:00:00Z"),
+            repo(1, "clowder", "2023-10-01T00:00:00Z"),
+        ]).encode(), {"Link": '<https://api.github.com/next>; rel="next"'})])
+
+        repos = GithubData.sync_repos()
+
+        self.assertEqual(len(session.requests), 1)  # Never followed the next page
+        self.assertIn("sort=updated", session.requests[0][0])
+        self.assertEqual(sorted(r["name"] for r in repos), ["brand-new", "clowder", "new-name"])
+        self.assertEqual(self.store.get_meta("synced_at"), self.now.isoformat())
+        self.assertEqual(self.store.get_meta("full_synced_at"), "2023-10-18T12:00:00+00:00")
+        self.assertEqual(GithubData.get_repo("new-name")["id"], 2)
+        self.assertIsNone(GithubData.get_repo("old-name"))
+
+    def test_full_sync_when_last_full_sync_is_old(self):
+        self.write_cache([repo(1, "deleted", "2023-10-01T00:00:00Z")], "2023-10-19T12:00:00+00:00", "2023-10-01T12:00:00+00:00")
+        session = self.use_session([
+            make_response(200, json.dumps([repo(2, "clowder", "2023-10-01T00:00:00Z")]).encode(), {"Link": '<https://api.github.com/page2>; rel="next"'}),
+            make_response(200, json.dumps([repo(3, "chrome", "2023-10-01T00:00:00Z")]).encode()),
+        ])
+        repos = GithubData.sync_repos()
+        self.assertEqual(len(session.requests), 2)
+        self.assertEqual([r["name"] for r in repos], ["clowder", "chrome"])
+
+    def test_get_repos_uses_fresh_cache_without_requests(self):
+        self.write_cache([repo(1, "clowder", "2023-10-01T00:00:00Z")], "2023-10-20T11:00:00+00:00", "2023-10-20T11:00:00+00:00")
+        session = self.use_session([])
+        self.assertEqual(GithubData.get_repos()[0]["name"], "clowder")
+        self.assertEqual(session.requests, [])
+
+    def test_get_repos_falls_back_to_cache_when_sync_fails(self):
+        self.write_cache([repo(1, "clowder", "2023-10-01T00:00:00Z")], "2023-10-18T11:00:00+00:00", "2023-10-18T11:00:00+00:00")
+        self.use_session([make_response(404)])
+        self.assertEqual(GithubData.get_repos()[0]["name"], "clowder")
+
+    def test_legacy_json_cache_is_migrated(self):
+        with open(self.legacy_path, 'w') as file:
+            json.dump({"repos": [dict(repo(1, "clowder", "2023-10-01T00:00:00Z"), owner={"login": "RedHatInsights"})],
+                       "timestamp": "2023-10-20T11:00:00+00:00"}, file)
+        session = self.use_session([])
+        repos = GithubData.get_formatted_repos()
+        self.assertEqual(session.requests, [])
+        self.assertEqual(repos["clowder"]["updated_at"], "2023-10-01T00:00:00Z")
+        self.assertNotIn("owner", repos["clowder"])
+        self.assertFalse(os.path.exists(self.legacy_path))
+
+    def test_parse_time_handles_github_and_legacy_timestamps(self):
+        self.assertEqual(GithubData._parse_time("2023-10-20T12:00:00Z"), self.now)
+        self.assertIsNotNone(GithubData._parse_time("2023-10-20T11:59:00").tzinfo)
+
+
+class TestContributors(GithubDataTestCase):
+
+    repo = {"contributors_url": "https://api.github.com/repos/RedHatInsights/clowder/contributors"}
+
+    def test_every_page_is_fetched(self):
+        session = self.use_session([
+            make_response(200, b'[{"login": "alice", "contributions": 40}, {"type": "Anonymous", "contributions": 9}]',
+                          {"Link": '<https://api.github.com/repos/RedHatInsights/clowder/contributors?page=2>; rel="next"'}),
+            make_response(200, b'[{"login": "bob", "contributions": 2}]'),
+        ])
+        self.assertEqual(GithubData.get_repo_contributions(self.repo),
+                         [{"login": "alice", "contributions": 40}, {"login": "bob", "contributions": 2}])
+        self.assertEqual(session.requests[0][0], self.repo["contributors_url"] + "?per_page=100")
+        self.assertEqual(len(session.requests), 2)
+
+
+class TestCommitLog(StandinTestCase):
+
+    def setUp(self):
+        self.server = self.start()
+        self.data_source = self.use_github_data(self.server)
+        self.repo_name = next(iter(self.org))
+        self.repo = {"name": self.repo_name,
+                     "commits_url": f"{self.server.base_url}/repos/RedHatInsights/{self.repo_name}/commits{{/sha}}"}
+        self.commits = self.server.backend.commits[self.repo_name]
+
+    def add_commit(self, number, date):
+        self.commits.insert(0, {"sha": f"new-{number}", "commit": {"message": f"New change {number}",
+                                                                  "committer": {"name": "alice", "date": date}}})
+
+    def test_few_commits_are_one_small_request(self):
+        commits = self.data_source.get_commits(self.repo, max_commits=3)
+        self.assertEqual([commit["message"] for commit in commits], [f"Change {i} to {self.repo_name}" for i in range(3)])
+        self.assertEqual(self.server.stats["requests"], 1)
+
+    def test_paging_stops_at_max_commits(self):
+        self.assertEqual(len(self.data_source.get_commits(self.repo, max_commits=5)), 5)
+        with patch.object(GithubData, 'COMMITS_PER_PAGE', 2):
+            self.assertEqual(len(self.data_source.get_commits(self.repo, max_commits=5)), 5)
+        self.assertEqual(self.server.stats["requests"], 4)
+
+    def test_log_is_updated_incrementally(self):
+        first = self.data_source.get_recent_commits(self.repo, count=3)
+        self.assertEqual(len(first), 3)
+        self.add_commit(1, "2024-01-02T00:00:00Z")
+        requests = self.server.stats["requests"]
+        latest = self.data_source.get_recent_commits(self.repo, count=3)
+        self.assertEqual(self.server.stats["requests"], requests + 1)
+        self.assertEqual([commit["message"] for commit in latest], ["New change 1"] + [c["message"] for c in first[:2]])
+        self.assertEqual(len(self.data_source.get_store().get_commits(self.repo_name)), 4)
+
+    def test_time_window_older_than_the_log_is_backfilled(self):
+        self.data_source.get_recent_commits(self.repo, count=3)
+        window = self.data_source.get_recent_commits(self.repo, since="2023-12-31T14:00:00Z")
+        self.assertEqual(len(window), 11)  # An hour apart from 2024-01-01T00:00:00Z
+        self.assertEqual(self.data_source.get_store().commit_range(self.repo_name),
+                         ("2023-12-31T14:00:00Z", "2024-01-01T00:00:00Z"))
+
+    def test_log_is_started_over_when_too_much_changed(self):
+        self.data_source.get_recent_commits(self.repo, count=3)
+        for number in range(3):
+            self.add_commit(number, f"2024-01-02T0{number}:00:00Z")
+        with patch.object(GithubData, 'COMMIT_LOG_FETCH', 2):
+            latest = self.data_source.get_recent_commits(self.repo)
+        self.assertEqual([commit["message"] for commit in latest], ["New change 2", "New change 1"])
+
+
+class TestReadme(StandinTestCase):
+
+    def setUp(self):
+        self.server = self.start()
+        self.data_source = self.use_github_data(self.server)
+        self.repo_name = next(iter(self.org))
+        self.repo = {"name": self.repo_name,
+                     "contents_url": f"{self.server.base_url}/repos/RedHatInsights/{self.repo_name}/contents/{{+path}}"}
+
+    def test_readme_is_one_raw_request(self):
+        readme = self.data_source.get_readme(self.repo)
+        self.assertEqual(readme["sha"], self.org[self.repo_name]["readme_sha"])
+        self.assertEqual(readme["content"], self.org[self.repo_name]["readme"])
+        self.assertEqual(readme["text"], readmetext.plain_text(self.org[self.repo_name]["readme"]))
+        self.assertEqual(self.server.stats["requests"], 1)
+
+    def test_unchanged_readme_is_not_downloaded_or_cleaned_again(self):
+        first = self.data_source.get_readme(self.repo)
+        with patch('consolebot.readmetext.plain_text') as mock_plain_text:
+            second = self.data_source.get_readme(self.repo)
+        mock_plain_text.assert_not_called()
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.stats["not_modified"], 1)
+
+    def test_missing_readme(self):
+        self.repo["contents_url"] = self.repo["contents_url"].replace(self.repo_name, "nope")
+        with patch('builtins.print') as mock_print:
+            self.assertIsNone(self.data_source.get_readme(self.repo))
+        mock_print.assert_called_once_with(f"No README found for {self.repo_name}. Skipping...")
+        self.assertEqual(self.server.stats["requests"], 1)
+
+    def test_blob_sha_matches_git(self):
+        self.assertEqual(GithubData.blob_sha(b"hello\n"), "ce013625030ba8dba906f756967f9e9ca394464a")
+
+
+class TestRepoMetadata(StandinTestCase):
+
+    def setUp(self):
+        self.server = self.start()
+        self.data_source = self.use_github_data(self.server)
+        self.repos = [{"name": name} for name in list(self.org)[:30]]
+
+    def test_metadata_of_many_repos_per_request(self):
+        metadata = self.data_source.get_repos_metadata(self.repos, commits=5)
+        self.assertEqual(self.server.stats["requests"], 2)  # 25 repos per query
+        self.assertEqual(len(metadata), 30)
+        name = self.repos[0]["name"]
+        repo = self.org[name]
+        self.assertEqual(metadata[name]["description"], repo["description"])
+        self.assertEqual(metadata[name]["languages"], list(repo["languages"]))
+        self.assertEqual(metadata[name]["readme"]["sha"], repo["readme_sha"])
+        self.assertEqual(metadata[name]["readme"]["text"], readmetext.plain_text(repo["readme"]))
+        self.assertEqual(len(metadata[name]["commits"]), 5)
+        self.assertEqual(self.data_source.get_store().get_commits(name), metadata[name]["commits"])
+
+    def test_chunks_stay_under_the_node_limit(self):
+        with patch.object(GithubData, 'GRAPHQL_NODE_LIMIT', 1000):
+            self.assertEqual(GithubData.graphql_chunk_size(commits=100, languages=100), 5)
+            self.data_source.get_repos_metadata(self.repos[:10], commits=100, languages=100)
+        self.assertEqual(self.server.stats["requests"], 2)
+
+    def test_failing_chunks_are_split(self):
+        graphql = GithubData._graphql.__func__
+
+        def time_out_big_queries(cls, query, variables, max_retries=5):
+            return None if query.count("repository(") > 8 else graphql(cls, query, variables, max_retries)
+
+        with patch.object(GithubData, '_graphql', classmethod(time_out_big_queries)):
+            metadata = self.data_source.get_repos_metadata(self.repos[:20])
+        self.assertEqual(len(metadata), 20)
+        self.assertEqual(self.server.stats["requests"], 4)
+
+    def test_unknown_repos_are_left_out(self):
+        metadata = self.data_source.get_repos_metadata(self.repos[:2] + [{"name": "nope"}])
+        self.assertEqual(sorted(metadata), sorted(repo["name"] for repo in self.repos[:2]))
+
+    def test_graphql_refresh(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.data_source.sync_repos(full=True)
+            requests = self.server.stats["requests"]
+            refresh_repo_details(concurrency=4, data_source=self.data_source, graphql=True)
+        repos = self.data_source.get_formatted_repos()
+        chunks = -(-len(repos) // GithubData.GRAPHQL_MAX_REPOS)
+        self.assertEqual(self.server.stats["requests"] - requests, len(repos) + chunks)  # Contributors are still per repo
+        name = next(iter(repos))
+        details = self.data_source.get_store().get_details(name)
+        self.assertEqual(details["readme"], self.org[name]["readme"])
+        self.assertEqual(details["languages"], list(self.org[name]["languages"]))
+        language, size = max(self.org[name]["languages"].items(), key=lambda item: item[1])
+        self.assertIn((name, size), [(repo, size) for repo, size, _ in self.data_source.get_language_repos(language)])
+        self.assertEqual(len(details["contributors"]), len({c["login"] for c in self.org[name]["contributors"]}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from rapidfuzz import fuzz, process, utils
+
+from consolebot.intents import IntentTable
+
+
+class TestIntentTable(unittest.TestCase):
+
+    intents = {
+        "summary": ["describe", "tell me about", "info"],
+        "contributors": ["who works", "contributors", "team"],
+        "language": ["written in", "which language", "info"],
+    }
+
+    def test_scores_match_per_phrase_extract(self):
+        table = IntentTable(self.intents)
+        for query in ["who works on it", "what is it written in", "descrbe", "nothing relevant"]:
+            expected = {
+                intent: max(round(process.extractOne(query, [phrase], scorer=fuzz.WRatio, processor=utils.default_process)[1])
+                            for phrase in phrases)
+                for intent, phrases in self.intents.items()
+            }
+            self.assertEqual(dict(table.rank(query)), expected)
+
+    def test_rank_is_highest_first(self):
+        ranked = IntentTable(self.intents).rank("who works on it")
+        self.assertEqual(ranked[0][0], "contributors")
+        self.assertEqual([score for _, score in ranked], sorted((score for _, score in ranked), reverse=True))
+
+    def test_ties_keep_intent_order(self):
+        ranked = IntentTable(self.intents).rank("info")
+        self.assertEqual(ranked[:2], [("summary", 100), ("language", 100)])
+
+    def test_shared_phrases_are_scored_once(self):
+        table = IntentTable(self.intents)
+        self.assertEqual(len(table.phrases), 8)
+        self.assertEqual(table.phrases["info"], ["summary", "language"])
+
+    def test_empty_query(self):
+        ranked = IntentTable(self.intents).rank("?!")
+        self.assertEqual(ranked, [("summary", 0), ("contributors", 0), ("language", 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import time
+import unittest
+
+from consolebot import lazy
+
+
+class TestLazyComponent(unittest.TestCase):
+
+    def test_loads_once_on_first_call(self):
+        calls = []
+
+        @lazy.component("test once")
+        def loader():
+            calls.append(1)
+            return {"a": 1}
+
+        self.assertEqual(calls, [])
+        self.assertEqual(loader(), {"a": 1})
+        self.assertIs(loader(), loader())
+        self.assertEqual(calls, [1])
+        self.assertIn("test once", dict(lazy.startup_profile()))
+
+    def test_nested_load_time_is_not_double_counted(self):
+        @lazy.component("test inner")
+        def inner():
+            time.sleep(0.05)
+            return 1
+
+        @lazy.component("test outer")
+        def outer():
+            return inner() + 1
+
+        self.assertEqual(outer(), 2)
+        profile = dict(lazy.startup_profile())
+        self.assertGreaterEqual(profile["test inner"], 0.05)
+        self.assertLess(profile["test outer"], 0.05)
+
+    def test_reset(self):
+        calls = []
+
+        @lazy.component("test reset")
+        def loader():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(loader(), 1)
+        loader.reset()
+        self.assertEqual(loader(), 2)
+
+
+class TestLazyMapping(unittest.TestCase):
+
+    def test_mapping_loads_on_first_access(self):
+        calls = []
+
+        @lazy.component("test mapping")
+        def repos():
+            calls.append(1)
+            return {"clowder": {"name": "clowder"}}
+
+        mapping = lazy.LazyMapping(repos)
+        self.assertEqual(calls, [])
+        self.assertEqual(mapping["clowder"]["name"], "clowder")
+        self.assertEqual(list(mapping.items()), [("clowder", {"name": "clowder"})])
+        self.assertIsNone(mapping.get("missing"))
+        self.assertEqual(len(mapping), 1)
+        self.assertEqual(calls, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
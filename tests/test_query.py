@@ -1,6 +1,11 @@
+import datetime
+import os
+import shutil
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
-from consolebot.query import determine_repo_name, generate_combinations, cached_github_data, get_language,get_recent_activity, get_contributors, get_wordnet_pos, preprocess_text, determine_intent, get_summary, generate_combinations, disambiguate_repo_name
+from consolebot.summaries import SummaryCache
+from consolebot.query import determine_repo_name, generate_combinations, cached_github_data, get_language,get_recent_activity, get_contributors, get_wordnet_pos, preprocess_text, preprocess_texts, lemmatize, determine_intent, get_summary, generate_combinations, disambiguate_repo_name, activity_window, determine_person, get_person_repos, determine_language, compile_language_pattern, get_language_repos, determine_search, search_readmes, language_pattern, reload_data
 import nltk
 from unittest.mock import patch, Mock
 
@@ -27,13 +32,14 @@ class MockGithubData:
         }[repo_name]
     
     @classmethod
-    def get_readme_content(cls, repo):
+    def get_readme(cls, repo):
         if repo["name"] == "EmptyRepo":
             return None
-        return "# Title\nJohn Jingleheimer Schmidt, his name is my name too"
+        return {"sha": "abc123", "content": "# Title\nJohn Jingleheimer Schmidt, his name is my name too",
+                "text": "Title John Jingleheimer Schmidt, his name is my name too"}
     
     @classmethod
-    def get_commits(cls, repo):
+    def get_recent_commits(cls, repo, count=None, since=None):
         if isinstance(repo, dict):
             if repo["name"]  == "EmptyRepo":
                 return []
@@ -44,12 +50,28 @@ class MockGithubData:
             {"message": "commit4"},
             {"message": "commit5"},
             {"message": "commit6"}
-        ]
+        ][:count]
     
     @classmethod
     def get_repo_contributors(cls, repo):
         return ["Alice", "Bob", "Github", "Charlie"]
 
+    @classmethod
+    def get_indexed_contributors(cls, repo_name):
+        return [("Dana", 9), ("Github", 4), ("Carol", 2)] if repo_name == "IndexedRepo" else []
+
+    @classmethod
+    def get_person_repos(cls, login):
+        return {"Alice": [("TestRepo", 40), ("OtherRepo", 2)]}.get(login, [])
+
+    @classmethod
+    def get_indexed_languages(cls, repo_name):
+        return [("Go", 3000, 75.0), ("Shell", 1000, 25.0)] if repo_name == "IndexedRepo" else []
+
+    @classmethod
+    def get_language_repos(cls, language):
+        return {"Go": [("IndexedRepo", 3072, 75.0), ("TestRepo", 1024, 12.5)]}.get(language, [])
+
     @classmethod
     def get_repo_languages(cls, repo):
         if repo["name"] == "EmptyRepo":
@@ -76,7 +98,7 @@ class TestPreprocessText(unittest.TestCase):
     def test_preprocess_text_without_stopwords(self):
         text = "This is a simple test."
         result = preprocess_text(text, remove_stopwords=False)
-        self.assertEqual(result, "This is a simple test .")
+        self.assertEqual(result, "This be a simple test .")  # "is" is lemmatized as a verb
 
     @patch('consolebot.query.data_source', MockGithubData)
     def test_preprocess_text_empty_string(self):
@@ -88,13 +110,26 @@ class TestPreprocessText(unittest.TestCase):
     def test_preprocess_text_only_stopwords(self):
         text = "The is are were was and or if"
         result = preprocess_text(text)
-        self.assertEqual(result, "wa")
+        self.assertEqual(result, "")
 
     def test_preprocess_text_with_punctuation(self):
         text = "Hello! How are you doing?"
         result = preprocess_text(text)
         self.assertEqual(result, "Hello ! ?")
 
+    def test_preprocess_texts_matches_one_at_a_time(self):
+        texts = ["The operator deploys running apps.", "", "Hello! How are you doing?"]
+        self.assertEqual(preprocess_texts(texts), [preprocess_text(text) for text in texts])
+
+    @patch('consolebot.query.lemmatizer')
+    def test_lemmas_are_memoized_by_token_and_pos(self, mock_lemmatizer):
+        lemmatize.cache_clear()
+        self.addCleanup(lemmatize.cache_clear)
+        mock_lemmatizer.return_value.lemmatize.side_effect = lambda token, pos: f"{token}/{pos}"
+        self.assertEqual([lemmatize("running", "v"), lemmatize("running", "v"), lemmatize("running", "n")],
+                         ["running/v", "running/v", "running/n"])
+        self.assertEqual(mock_lemmatizer.return_value.lemmatize.call_count, 2)
+
     @patch('consolebot.query.data_source', MockGithubData)
     def test_preprocess_text_with_stopwords(self):
         text = "This is a sample sentence, showing off the stop words filtration."
@@ -130,8 +165,21 @@ class TestDetermineIntent(unittest.TestCase):
     def test_query_with_repo_name(self):
         self.assertEqual(determine_intent('describe TestRepo', 'TestRepo', self.intents), 'description')
 
+    @patch('consolebot.query.data_source', MockGithubData)
+    def test_close_call_is_left_to_inference(self):
+        # 'information on' and 'license info' both score 86
+        self.assertIsNone(determine_intent('info on', 'TestRepo', self.intents, min_margin=5))
+
 class TestGetSummary(unittest.TestCase):
 
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.summary_cache = SummaryCache(os.path.join(self.cache_dir, "summaries.json"))
+        patcher = patch('consolebot.query.summary_cache', self.summary_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
     @patch('consolebot.query.data_source', MockGithubData)
     @patch('consolebot.query.cached_github_data', {"TestRepo": {"name": "TestRepo", "readme": "# Title\nOver the meadow and through the wood to grandomter's house we go", "description": "A test repo."}})
     def test_repo_with_readme(self):
@@ -166,12 +214,30 @@ class TestGetSummary(unittest.TestCase):
 
     # Mocking the Summarizer so that it doesn't call the actual model for summarization
     @patch('consolebot.query.data_source', MockGithubData)
-    @patch('consolebot.query.Summarizer', return_value=Mock(spec=[], side_effect=lambda x, num_sentences: "Summarized content."))
+    @patch('consolebot.query.summarizer_model', return_value=Mock(spec=[], side_effect=lambda x, num_sentences: "Summarized content."))
     @patch('consolebot.query.cached_github_data', {"TestRepo": {"name": "TestRepo", "readme": "# Title\nThis is a sample readme.", "description": "A test repo."}})
     def test_nlp_summary(self, mock_summarizer):
         summary = get_summary("TestRepo")
         self.assertTrue("Summarized content." in summary)
 
+    @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.summarizer_model', return_value=Mock(spec=[], side_effect=lambda x, num_sentences: "Summarized content."))
+    @patch('consolebot.query.cached_github_data', {"TestRepo": {"name": "TestRepo", "description": "A test repo."}})
+    def test_summary_is_cached_by_readme_sha(self, mock_summarizer):
+        first = get_summary("TestRepo")
+        second = get_summary("TestRepo")
+        mock_summarizer.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(SummaryCache(self.summary_cache.path).get("TestRepo", "abc123"), first)
+
+    @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.summarizer_model', return_value=Mock(spec=[], side_effect=lambda x, num_sentences: "Summarized content."))
+    @patch('consolebot.query.cached_github_data', {"TestRepo": {"name": "TestRepo", "description": "A test repo."}})
+    def test_changed_readme_is_summarized_again(self, mock_summarizer):
+        self.summary_cache.put("TestRepo", "old-sha", "Stale summary.")
+        summary = get_summary("TestRepo")
+        self.assertEqual(summary, "A test repo.\nSummarized content.")
+
 class TestRepoMethods(unittest.TestCase):
 
     mock_data = {
@@ -195,6 +261,24 @@ class TestRepoMethods(unittest.TestCase):
         result = get_recent_activity("TestRepo")
         self.assertEqual(result, "commit1\ncommit2\ncommit3")
 
+    @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.cached_github_data', mock_data)
+    def test_get_recent_activity_in_time_window(self):
+        with patch.object(MockGithubData, 'get_recent_commits', return_value=[]) as mock_commits:
+            result = get_recent_activity("TestRepo", since="2023-10-16T00:00:00Z")
+        mock_commits.assert_called_once_with(self.mock_data["TestRepo"], count=20, since="2023-10-16T00:00:00Z")
+        self.assertEqual(result, "No commits since then.")
+
+    def test_activity_window(self):
+        now = datetime.datetime(2023, 10, 20, 15, 30, tzinfo=datetime.timezone.utc)  # A Friday
+        midnight = now.replace(hour=0, minute=0)
+        self.assertEqual(activity_window("what changed in clowder today", now), midnight)
+        self.assertEqual(activity_window("what changed in clowder this week", now), midnight - datetime.timedelta(days=4))
+        self.assertEqual(activity_window("clowder commits this month", now), midnight.replace(day=1))
+        self.assertEqual(activity_window("clowder activity in the last 3 days", now), now - datetime.timedelta(days=3))
+        self.assertEqual(activity_window("clowder activity past week", now), now - datetime.timedelta(days=7))
+        self.assertIsNone(activity_window("what's new in clowder", now))
+
     @patch('consolebot.query.data_source', MockGithubData)
     @patch('consolebot.query.cached_github_data', mock_data)
     def test_get_recent_activity_invalid_repo(self):
@@ -238,6 +322,83 @@ class TestRepoMethods(unittest.TestCase):
         result = get_language("EmptyRepo")
         self.assertEqual(result, "Unknown")
 
+    @patch('consolebot.query.english_stop_words', return_value=frozenset({"who", "what", "does", "on", "is", "in", "the", "has", "to"}))
+    @patch('consolebot.query.contributor_logins', return_value={"alice": "Alice", "testrepo": "testrepo", "api": "api", "works": "works"})
+    @patch('consolebot.query.cached_github_data', {"testrepo": {}})
+    def test_determine_person(self, mock_logins, mock_stop_words):
+        self.assertEqual(determine_person("what does @alice work on"), "Alice")
+        self.assertEqual(determine_person("which repos has ALICE contributed to"), "Alice")
+        self.assertEqual(determine_person("tell me about @api"), "api")
+        self.assertIsNone(determine_person("who works on testrepo"))  # A repo name and an intent word, not people
+        self.assertIsNone(determine_person("what does malice-bot work on"))
+        self.assertIsNone(determine_person("what language is the api written in"))  # Not a question about a person
+
+    @patch('consolebot.query.data_source', MockGithubData)
+    def test_get_person_repos(self):
+        self.assertEqual(get_person_repos("Alice"), "TestRepo (40 contributions)\nOtherRepo (2 contributions)")
+        self.assertEqual(get_person_repos("Nobody"), "No repositories found.")
+
+    @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.cached_github_data', {"IndexedRepo": {"name": "IndexedRepo"}})
+    def test_get_contributors_from_index(self):
+        self.assertEqual(get_contributors("IndexedRepo"), "Carol, Dana")
+
+    @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.cached_github_data', {"IndexedRepo": {"name": "IndexedRepo"}})
+    def test_get_language_from_index(self):
+        self.assertEqual(get_language("IndexedRepo"), "Go 75.0%, Shell 25.0%")
+
+    @patch('consolebot.query.language_pattern', return_value=compile_language_pattern(["JavaScript", "Java", "C++", "Go"]))
+    @patch('consolebot.query.indexed_languages', return_value={"javascript": "JavaScript", "java": "Java", "c++": "C++", "go": "Go"})
+    def test_determine_language(self, mock_languages, mock_pattern):
+        self.assertEqual(determine_language("which repos use go"), "Go")
+        self.assertEqual(determine_language("list the JavaScript projects"), "JavaScript")
+        self.assertEqual(determine_language("Repositories written in C++?"), "C++")
+        self.assertIsNone(determine_language("is clowder written in go"))  # About one repo
+        self.assertIsNone(determine_language("which repos use rust"))
+        self.assertIsNone(determine_language("which repos use golang"))
+        self.assertIsNone(determine_language("which repositories go to prod"))
+        self.assertEqual(determine_language("which services are written in java"), "Java")
+
+    def test_reload_data_picks_up_a_refreshed_language_index(self):
+        data_source = Mock()
+        data_source.get_language_totals.return_value = []
+        with patch('consolebot.query.data_source', data_source):
+            reload_data()
+            self.assertIsNone(language_pattern())
+            data_source.get_language_totals.return_value = [("Go", 3072, 2)]
+            self.assertIsNone(language_pattern())  # Still the index loaded at startup
+            reload_data()
+            self.assertIsNotNone(language_pattern())
+        data_source.forget_formatted_repos.assert_called_with()
+        reload_data()
+
+    @patch('consolebot.query.data_source', MockGithubData)
+    def test_get_language_repos(self):
+        self.assertEqual(get_language_repos("Go"), "2 repositories, 4.0 KiB in total\n"
+                                                    "IndexedRepo: 3.0 KiB, 75% of the repo\nTestRepo: 1.0 KiB, 12% of the repo")
+        self.assertEqual(get_language_repos("Rust"), "No repositories found.")
+
+    @patch('consolebot.query.english_stop_words', return_value=frozenset({"the", "of", "does", "what", "which"}))
+    @patch('consolebot.query.cached_github_data', {"clowder": {}, "frontend-operator": {}})
+    def test_determine_search(self, mock_stop_words):
+        self.assertTrue(determine_search("which repo handles kafka ingestion"))
+        self.assertTrue(determine_search("Find the billing service"))
+        self.assertTrue(determine_search("search for clowder dependencies"))
+        self.assertTrue(determine_search("which repos mention clowder"))
+        self.assertFalse(determine_search("find the owner of clowder"))  # Names a repo
+        self.assertFalse(determine_search("what service does frontend operator provide"))
+        self.assertFalse(determine_search("who works on chrome"))
+        self.assertFalse(determine_search("what is clowder"))
+
+    @patch('consolebot.query.readme_index')
+    def test_search_readmes(self, mock_index):
+        mock_index.return_value.search.return_value = [("ingest", 4.21), ("ledger", 1.5)]
+        self.assertEqual(search_readmes("kafka ingestion"), "ingest (4.2)\nledger (1.5)")
+        mock_index.return_value.search.assert_called_once_with("kafka ingestion", 5)
+        mock_index.return_value.search.return_value = []
+        self.assertEqual(search_readmes("kafka"), "No repositories found.")
+
 class TestGenerateCombinations(unittest.TestCase):
 
     @patch('consolebot.query.data_source', MockGithubData)
@@ -320,17 +481,28 @@ class TestDetermineRepoName(unittest.TestCase):
         self.assertEqual(determine_repo_name(query), expected_repo_name)
 
     @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.match_repo_description', return_value=None)
     @patch('consolebot.query.cached_github_data', {
         "apple": {},
         "banana": {},
         "cherry": {}
     })
-    def test_no_appropriate_match(self):
+    def test_no_appropriate_match(self, mock_semantic_match):
         query = "unknownrepo"
         with self.assertRaises(Exception) as context:
             determine_repo_name(query)
         self.assertTrue("Could not identify a repository" in str(context.exception))
 
+    @patch('consolebot.query.data_source', MockGithubData)
+    @patch('consolebot.query.sbert_model', return_value=Mock(encode=Mock(return_value=[1.0, 0.0])))
+    @patch('consolebot.query.repo_embeddings', return_value=Mock(search=Mock(return_value=[("gatekeeper", 0.8), ("ledger", 0.3)])))
+    @patch('consolebot.query.cached_github_data', {
+        "gatekeeper": {"description": "Auth service"},
+        "ledger": {"description": "Billing backend"},
+    })
+    def test_semantic_match_by_description(self, mock_embeddings, mock_model):
+        self.assertEqual(determine_repo_name("who handles login tokens"), "gatekeeper")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from consolebot.ratelimit import RateLimiter
+
+
+def make_response(status_code, headers=None, content=b""):
+    response = Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = content
+    return response
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.limiter = RateLimiter(sleep=self.sleeps.append, clock=lambda: self.now)
+
+    def test_no_pause_with_plenty_of_budget(self):
+        self.limiter.update(make_response(200, {"X-RateLimit-Remaining": "4000", "X-RateLimit-Reset": "2000"}))
+        self.limiter.before_request()
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.limiter.stats()["requests"], 1)
+
+    def test_low_budget_spreads_requests_over_window(self):
+        self.limiter.update(make_response(200, {"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": "1100"}))
+        self.limiter.before_request()
+        self.assertEqual(self.sleeps, [10.0])
+
+    def test_exhausted_budget_waits_for_reset(self):
+        self.limiter.update(make_response(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1300"}))
+        self.limiter.before_request()
+        self.assertEqual(self.sleeps, [300.0])
+        self.assertEqual(self.limiter.stats()["throttled_seconds"], 300.0)
+
+    def test_primary_limit_response_waits_until_reset(self):
+        response = make_response(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1060"})
+        self.assertEqual(self.limiter.retry_delay(response, 0), 61.0)
+
+    def test_secondary_limit_without_retry_after(self):
+        response = make_response(403, content=b'{"message": "You have exceeded a secondary rate limit."}')
+        self.assertEqual(self.limiter.retry_delay(response, 0), RateLimiter.SECONDARY_LIMIT_WAIT)
+
+    def test_too_long_wait_gives_up(self):
+        response = make_response(429, {"Retry-After": "3600"})
+        self.assertIsNone(self.limiter.retry_delay(response, 0))
+
+    def test_retry_after_as_http_date(self):
+        response = make_response(429, {"Retry-After": "Thu, 01 Jan 1970 00:17:10 GMT"})
+        self.assertEqual(self.limiter.retry_delay(response, 0), 30.0)
+
+    def test_unparseable_retry_after_uses_default_wait(self):
+        response = make_response(429, {"Retry-After": "soon"})
+        self.assertEqual(self.limiter.retry_delay(response, 0), RateLimiter.SECONDARY_LIMIT_WAIT)
+
+    def test_forbidden_without_rate_limit_is_not_retried(self):
+        self.assertIsNone(self.limiter.retry_delay(make_response(403, content=b'{"message": "Forbidden"}'), 0))
+
+    def test_backoff_grows_and_is_capped(self):
+        for attempt in range(10):
+            delay = self.limiter.backoff(attempt)
+            expected = min(self.limiter.max_delay, self.limiter.base_delay * 2 ** attempt)
+            self.assertGreaterEqual(delay, expected / 2)
+            self.assertLessEqual(delay, expected)
+
+    def test_network_errors_back_off(self):
+        self.assertIsNotNone(self.limiter.retry_delay(None, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
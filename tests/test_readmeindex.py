@@ -0,0 +1,82 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from consolebot.readmeindex import ReadmeIndex, tokenize
+from consolebot.store import RepoStore
+
+DETAILS = {
+    "ingest": {"readme_sha": "a1", "readme": "# Ingest\n\nConsumes **Kafka** topics. Kafka ingestion for uploads."},
+    "ledger": {"readme_sha": "b1", "readme": "# Ledger\n\nBilling backend. Publishes invoices to Kafka."},
+    "chrome": {"readme_sha": "c1", "readme": "# Chrome\n\nThe frontend shell, navigation and header."},
+    "clowder": {"readme_sha": "d1", "readme": "# Clowder\n\nAn operator that deploys the apps and their dependencies."},
+    "insights-core": {"readme_sha": "e1", "readme": "# Insights Core\n\nThe rules engine, for parsing archives."},
+    "empty": {"readme_sha": None},
+}
+
+
+class TestReadmeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.store = RepoStore(os.path.join(self.tmpdir, "consolebot.db"))
+        self.addCleanup(self.store.close)
+        self.index = ReadmeIndex(self.store)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Kafka-ingestion, for UPLOADS v2!"), ["kafka", "ingestion", "for", "uploads", "v2"])
+
+    def test_search_ranks_by_bm25(self):
+        self.assertEqual(self.index.update(DETAILS), (5, 0))
+        results = self.index.search("which repo handles kafka ingestion")
+        self.assertEqual([name for name, _ in results], ["ingest", "ledger"])
+        self.assertGreater(results[0][1], results[1][1])
+        self.assertEqual(self.index.search("navigation", limit=1)[0][0], "chrome")
+        self.assertEqual(self.index.search("nothing matches"), [])
+
+    def test_common_terms_are_left_out_of_rarer_searches(self):
+        self.index.update(DETAILS)
+        self.assertEqual([name for name, _ in self.index.search("the navigation")], ["chrome"])
+        self.assertEqual(len(self.index.search("the")), 3)  # Unless nothing rarer is asked for
+
+    def test_score(self):
+        self.index.update({"a": {"readme_sha": "1", "readme": "kafka kafka topics"}, "b": {"readme_sha": "2", "readme": "billing"}})
+        (name, score), = self.index.search("kafka")
+        idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+        self.assertEqual(name, "a")
+        self.assertAlmostEqual(score, idf * 2 * 2.2 / (2 + 1.2 * (0.25 + 0.75 * 3 / 2)))
+
+    def test_only_changed_readmes_are_reindexed(self):
+        self.index.update(DETAILS)
+        self.assertEqual(self.index.update(DETAILS), (0, 0))
+        details = dict(DETAILS, ledger={"readme_sha": "b2", "readme": "# Ledger\n\nBilling backend."})
+        del details["chrome"]
+        self.assertEqual(self.index.update(details), (1, 1))
+        self.assertEqual([name for name, _ in self.index.search("kafka")], ["ingest"])
+        self.assertEqual(self.index.search("navigation"), [])
+
+    def test_renamed_and_deleted_repos_are_not_found(self):
+        self.store.replace_repos([{"id": index, "name": name} for index, name in enumerate(DETAILS)])
+        for name, details in DETAILS.items():
+            self.store.update_details(name, **details)
+        self.index.update(self.store.all_details())
+
+        names = ["ingest-service" if name == "ingest" else name for name in DETAILS if name != "chrome"]
+        self.store.replace_repos([{"id": index, "name": name} for index, name in enumerate(names)])
+        self.store.update_details("ingest-service", **DETAILS["ingest"])
+        self.assertNotIn("chrome", self.store.all_details())
+        self.assertEqual(self.index.search("navigation"), [])
+        self.index.update(self.store.all_details())
+        self.assertEqual([name for name, _ in self.index.search("kafka ingestion")], ["ingest-service", "ledger"])
+
+    def test_cached_readme_text_is_used(self):
+        self.store.put_readme_text("a1", "Streams telemetry.")
+        self.index.update(DETAILS)
+        self.assertEqual(self.index.search("telemetry")[0][0], "ingest")
+
+
+if __name__ == '__main__':
+    unittest.main()
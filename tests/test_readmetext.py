@@ -0,0 +1,69 @@
+import unittest
+
+from consolebot.readmetext import plain_text, readme_format, sentences
+
+
+class TestReadmeFormat(unittest.TestCase):
+
+    def test_formats_are_told_by_markup(self):
+        self.assertEqual(readme_format("= Clowder\n:toc:\n\nAn operator."), "adoc")
+        self.assertEqual(readme_format("Clowder\n=======\n\n.. image:: logo.png\n"), "rst")
+        self.assertEqual(readme_format("# Clowder\n\nAn operator.\n\n---\n"), "md")
+
+    def test_emoji_shortcodes_are_not_asciidoc_attributes(self):
+        readme = "# Clowder\n\n:rocket: Fast deploys for every app.\n:lock: Secure by default.\n"
+        self.assertEqual(readme_format(readme), "md")
+        self.assertEqual(sentences(readme), ["Clowder :rocket: Fast deploys for every app. :lock: Secure by default."])
+        self.assertEqual(readme_format("Clowder\n\nimage::logo.png[Logo]\n"), "adoc")
+
+
+class TestSentences(unittest.TestCase):
+
+    def test_markdown(self):
+        readme = (
+            "# Clowder\n\n"
+            "[![Build](https://ci/badge.svg)](https://ci) ![logo](logo.png)\n\n"
+            "Clowder is an *operator* that deploys [apps](https://docs) on OpenShift. It is written in `Go`, e.g. for my_app.\n\n"
+            "```bash\nmake install\n```\n\n"
+            "| Name | Use |\n|------|-----|\n| api | Serves requests. |\n"
+        )
+        self.assertEqual(sentences(readme), [
+            "Clowder Clowder is an operator that deploys apps on OpenShift.",
+            "It is written in Go, e.g. for my_app.",
+            "Name Use api Serves requests.",
+        ])
+
+    def test_asciidoc(self):
+        readme = (
+            "= Clowder\n:toc:\n:note-caption: :information_source:\n\n"
+            "Clowder is a *Kubernetes* operator. See link:docs/usage.adoc[the usage guide].\n\n"
+            "image::logo.png[Logo]\n\nNOTE: Needs a cluster.\n\n"
+            "[source,go]\n----\nfunc main() {}\n----\n\n"
+            "== Usage\n\n* Deploy it\n\nApply it with +oc apply+.\n"
+        )
+        self.assertEqual(sentences(readme), [
+            "Clowder is a Kubernetes operator.",
+            "See the usage guide.",
+            "Apply it with oc apply.",
+        ])
+
+    def test_restructuredtext(self):
+        readme = (
+            "Clowder\n=======\n\n.. image:: logo.png\n   :alt: logo\n\n"
+            "Clowder is an **operator**. See `the docs <https://docs>`_ and :ref:`usage`. Run ``make``.\n\n"
+            "Example::\n\n    make deploy\n\nThat is all.\n"
+        )
+        self.assertEqual(sentences(readme), [
+            "Clowder Clowder is an operator.",
+            "See the docs and usage.",
+            "Run make.",
+            "Example: That is all.",
+        ])
+
+    def test_plain_text_is_one_sentence_per_line(self):
+        self.assertEqual(plain_text("# Title\nFirst one. Second one!"), "Title First one.\nSecond one!")
+        self.assertEqual(plain_text("![logo](logo.png)"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from consolebot.readmeindex import ReadmeIndex
+from consolebot.refresh import refresh_repo_details
+from consolebot.store import RepoStore
+
+
+class MockGithubData:
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    @classmethod
+    def _request(cls):
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.01)
+        with cls.lock:
+            cls.in_flight -= 1
+
+    @classmethod
+    def get_formatted_repos(cls):
+        return {f"repo-{i}": {"name": f"repo-{i}"} for i in range(10)}
+
+    @classmethod
+    def get_repo_contributions(cls, repo):
+        cls._request()
+        return [{"login": "alice", "contributions": int(repo["name"].split("-")[1]) + 1}, {"login": "bob", "contributions": 1}]
+
+    @classmethod
+    def get_repo_language_bytes(cls, repo):
+        cls._request()
+        if repo["name"] == "repo-3":
+            raise RuntimeError("boom")
+        return {"Go": 3000, "Shell": 1000 * int(repo["name"].split("-")[1])}
+
+    @classmethod
+    def get_readme(cls, repo):
+        cls._request()
+        return {"sha": "sha-" + repo["name"], "content": "# " + repo["name"]}
+
+    @classmethod
+    def get_recent_commits(cls, repo, count=None, since=None):
+        cls._request()
+        return [{"message": "initial commit"}]
+
+
+class TestRefreshRepoDetails(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = RepoStore(os.path.join(self.tmpdir, "consolebot.db"))
+        MockGithubData.max_in_flight = 0
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_refresh_fetches_every_resource(self):
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        details = RepoStore(self.store.path).get_details("repo-1")
+        self.assertEqual(details["contributors"], ["alice", "bob"])
+        self.assertEqual(details["languages"], ["Go", "Shell"])
+        self.assertEqual(details["readme"], "# repo-1")
+        self.assertEqual(details["readme_sha"], "sha-repo-1")
+        self.assertEqual(details["commits"], [{"message": "initial commit"}])
+        self.assertIn("refreshed_at", details)
+        self.assertEqual(len(self.store.all_details()), 10)
+        self.assertEqual(self.store.get_meta("refreshed_at"), details["refreshed_at"])
+
+    def test_contributions_are_indexed_by_login(self):
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        repos = self.store.get_person_repos("Alice")
+        self.assertEqual(repos[:2], [("repo-9", 10), ("repo-8", 9)])
+        self.assertEqual(len(repos), 10)
+        self.assertEqual(sorted(self.store.get_logins()), ["alice", "bob"])
+        self.assertEqual(self.store.get_repo_contributions("repo-2"), [("alice", 3), ("bob", 1)])
+
+    def test_indexes_drop_removed_repos(self):
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        self.store.replace_repos([{"id": index, "name": f"repo-{index}"} for index in range(9)])  # repo-9 was deleted
+        self.assertEqual(self.store.get_person_repos("alice")[0], ("repo-8", 9))
+        self.assertEqual(self.store.get_repo_contributions("repo-9"), [])
+        self.assertEqual(self.store.get_language_repos("shell")[0], ("repo-8", 8000, 8000 / 110))
+
+    def test_languages_are_indexed_with_bytes(self):
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        self.assertEqual(self.store.get_language_repos("shell")[:2], [("repo-9", 9000, 75.0), ("repo-8", 8000, 8000 / 110)])
+        self.assertEqual(len(self.store.get_language_repos("Go")), 9)  # Not repo-3, whose languages failed
+        self.assertEqual(self.store.get_repo_languages("repo-1"), [("Go", 3000, 75.0), ("Shell", 1000, 25.0)])
+        self.assertEqual(self.store.get_language_totals()[0], ("Shell", 42000, 9))
+
+    def test_readmes_are_indexed_for_search(self):
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        self.assertEqual(len(self.store.indexed_readmes()), 10)
+        self.assertEqual(ReadmeIndex(self.store).search("repo 7", limit=1)[0][0], "repo-7")
+
+    def test_repos_no_longer_listed_are_not_indexed(self):
+        self.store.update_details("deleted-repo", readme_sha="sha-deleted", readme="# repo 7")
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        self.assertNotIn("deleted-repo", self.store.indexed_readmes())
+
+    def test_concurrency_is_bounded(self):
+        refresh_repo_details(concurrency=3, data_source=MockGithubData, store=self.store)
+        self.assertGreater(MockGithubData.max_in_flight, 1)
+        self.assertLessEqual(MockGithubData.max_in_flight, 3)
+
+    def test_failed_resource_does_not_stop_refresh(self):
+        refresh_repo_details(concurrency=4, data_source=MockGithubData, store=self.store)
+        details = self.store.get_details("repo-3")
+        self.assertNotIn("languages", details)
+        self.assertEqual(details["contributors"], ["alice", "bob"])
+
+
+if __name__ == '__main__':
+    unittest.main()
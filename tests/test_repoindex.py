@@ -0,0 +1,87 @@
+import unittest
+
+from consolebot.repoindex import RepoNameIndex, split_repo_name, trigrams
+
+
+class TestSplitRepoName(unittest.TestCase):
+
+    def test_splits_on_hyphens_and_underscores(self):
+        self.assertEqual(split_repo_name("frontend-operator"), ("frontend", "operator"))
+        self.assertEqual(split_repo_name("insights_core-api"), ("insights", "core", "api"))
+        self.assertEqual(split_repo_name("clowder"), ("clowder",))
+
+
+class TestRepoNameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = RepoNameIndex(["apple-banana", "apple-banana-cherry", "frontend-operator", "insights_core", "grape"])
+
+    def test_contiguous_match(self):
+        self.assertEqual(self.index.multi_word_matches(["about", "apple", "banana"]), {"apple-banana"})
+
+    def test_longer_contiguous_match(self):
+        self.assertEqual(self.index.multi_word_matches(["apple", "banana", "cherry"]), {"apple-banana", "apple-banana-cherry"})
+
+    def test_underscore_names(self):
+        self.assertEqual(self.index.multi_word_matches(["insights", "core", "tests"]), {"insights_core"})
+
+    def test_tokens_may_be_apart_but_in_order(self):
+        self.assertEqual(self.index.multi_word_matches(["frontend", "for", "the", "operator"]), {"frontend-operator"})
+        self.assertEqual(self.index.multi_word_matches(["apple", "and", "banana", "or", "cherry"]),
+                         {"apple-banana", "apple-banana-cherry"})
+
+    def test_reordered_tokens_do_not_match(self):
+        self.assertEqual(self.index.multi_word_matches(["operator", "for", "the", "frontend"]), set())
+        self.assertEqual(self.index.multi_word_matches(["banana", "apple"]), set())
+
+    def test_repeated_tokens_must_be_repeated_in_the_query(self):
+        index = RepoNameIndex(["api-api-gateway"])
+        self.assertEqual(index.multi_word_matches(["api", "gateway"]), set())
+        self.assertEqual(index.multi_word_matches(["gateway", "api", "api"]), set())
+        self.assertEqual(index.multi_word_matches(["api", "api", "gateway"]), {"api-api-gateway"})
+
+    def test_partial_token_set_does_not_match(self):
+        self.assertEqual(self.index.multi_word_matches(["frontend", "stuff"]), set())
+
+    def test_single_word_matches(self):
+        self.assertEqual(self.index.single_word_matches(["who", "works", "on", "grape"]), {"grape"})
+        self.assertEqual(self.index.single_word_matches(["apple"]), set())
+
+    def test_long_queries_stay_cheap(self):
+        names = [f"service-{i}-api" for i in range(2000)]
+        index = RepoNameIndex(names)
+        query_words = [f"word{i}" for i in range(200)] + ["service", "42", "api"]
+        self.assertEqual(index.multi_word_matches(query_words), {"service-42-api"})
+
+
+class TestFuzzyMatching(unittest.TestCase):
+
+    names = [f"service-{i}-api" for i in range(200)] + ["apple-fruit", "apple-phone", "grape"]
+
+    def test_trigrams_ignore_case_and_separators(self):
+        self.assertEqual(trigrams("Apple-Fruit"), trigrams("apple fruit"))
+        self.assertIn(" ap", trigrams("apple"))
+
+    def test_small_orgs_score_every_name(self):
+        index = RepoNameIndex(["apple-fruit", "apple-phone", "grape"])
+        self.assertEqual(index.fuzzy_candidates("anything"), index.names)
+
+    def test_shortlist_is_bounded_and_keeps_best_match(self):
+        index = RepoNameIndex(self.names, shortlist_size=10)
+        candidates = index.fuzzy_candidates("tell me about aple frt")
+        self.assertLessEqual(len(candidates), 10)
+        self.assertIn("apple-fruit", candidates)
+        self.assertEqual(index.fuzzy_matches("tell me about aple frt", limit=3)[0][0], "apple-fruit")
+
+    def test_no_shared_trigrams_falls_back_to_all_names(self):
+        index = RepoNameIndex(self.names, shortlist_size=10)
+        self.assertEqual(len(index.fuzzy_candidates("zzzz")), len(self.names))
+
+    def test_scores_are_integers(self):
+        index = RepoNameIndex(["apple-fruit", "apple-phone", "grape"])
+        for name, score in index.fuzzy_matches("apl frut"):
+            self.assertIsInstance(score, int)
+
+
+if __name__ == '__main__':
+    unittest.main()
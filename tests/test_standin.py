@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.crawl import isolated_github_data
+from benchmarks.standin import Cassette, RecordingSession, ReplayBackend, StandinServer, SyntheticBackend
+from benchmarks.synthetic import generate_org
+from consolebot.githubdata import GithubData
+from consolebot.refresh import RESOURCES, refresh_repo_details
+from consolebot.ratelimit import RateLimiter
+
+
+class StandinTestCase(unittest.TestCase):
+
+    org = generate_org(120)
+
+    def start(self, backend=None, **options):
+        server = StandinServer(backend or SyntheticBackend(self.org), **options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def use_github_data(self, server):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        self.sleeps = []
+        context = isolated_github_data(server.base_url, state_dir, RateLimiter(sleep=self.sleeps.append))
+        data_source = context.__enter__()
+        self.addCleanup(context.__exit__, None, None, None)
+        return data_source
+
+
+class TestStandinServer(StandinTestCase):
+
+    def test_repos_are_paginated_with_link_headers(self):
+        server = self.start()
+        data_source = self.use_github_data(server)
+        with patch('builtins.print'):
+            repos = data_source._get_all_repos(f"{data_source.BASE_URL}?per_page=50", data_source.get_headers())
+        self.assertEqual(sorted(repo["name"] for repo in repos), sorted(name for name in self.org if not name.endswith("-build")))
+        self.assertEqual(server.stats["requests"], 3)
+
+    def test_per_repo_urls_point_at_the_standin(self):
+        server = self.start()
+        data_source = self.use_github_data(server)
+        with patch('builtins.print'):
+            repo = data_source.sync_repos(full=True)[0]
+        self.assertEqual(data_source.get_readme_content(repo), self.org[repo["name"]]["readme"])
+        self.assertEqual(data_source.get_repo_languages(repo), list(self.org[repo["name"]]["languages"]))
+
+    def test_rate_limit_headers_count_down(self):
+        server = self.start(rate_limit=10)
+        data_source = self.use_github_data(server)
+        repo_url = f"{GithubData.GITHUB_API_URL}/repos/RedHatInsights/{next(iter(self.org))}/languages"
+        response = data_source._safe_request(repo_url, {})
+        self.assertEqual(response.headers["X-RateLimit-Remaining"], "9")
+        self.assertEqual(data_source.rate_limiter.remaining, 9)
+
+    def test_injected_429s_are_retried(self):
+        server = self.start(fail_every=2, retry_after=0)
+        data_source = self.use_github_data(server)
+        repo_url = f"{GithubData.GITHUB_API_URL}/repos/RedHatInsights/{next(iter(self.org))}/languages"
+        data_source._safe_request(repo_url, {})
+        with patch('builtins.print'):
+            response = data_source._safe_request(repo_url + "?x=1", {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(server.stats["throttled"], 1)
+        self.assertEqual(data_source.rate_limiter.retries, 1)
+
+    def test_conditional_requests_get_304(self):
+        server = self.start()
+        data_source = self.use_github_data(server)
+        repo_url = f"{GithubData.GITHUB_API_URL}/repos/RedHatInsights/{next(iter(self.org))}/languages"
+        first = data_source._safe_request(repo_url, {})
+        second = data_source._safe_request(repo_url, {})
+        self.assertEqual(second.json(), first.json())
+        self.assertTrue(second.from_cache)
+        self.assertEqual(server.stats["not_modified"], 1)
+        self.assertEqual(server.used, 1)
+
+    def test_isolation_is_undone_when_the_crawl_fails(self):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        db_path, real_store = GithubData.DB_PATH, GithubData._store
+        with self.assertRaises(RuntimeError):
+            with isolated_github_data("http://127.0.0.1:1", state_dir, RateLimiter()) as data_source:
+                store = data_source.get_store()
+                store.get_meta("synced_at")
+                raise RuntimeError("crawl failed")
+        self.assertIsNone(store._connection)
+        self.assertEqual(GithubData.DB_PATH, db_path)
+        self.assertIs(GithubData._store, real_store)
+
+
+class TestRecordReplay(StandinTestCase):
+
+    def test_recording_replays_the_same_data(self):
+        live = self.start()
+        cassette = Cassette()
+        data_source = self.use_github_data(live)
+        with patch.object(GithubData, '_session', RecordingSession(cassette)), patch('builtins.print'):
+            repos = data_source._get_all_repos(f"{data_source.BASE_URL}?per_page=100", data_source.get_headers())
+            contributors = data_source.get_repo_contributors(repos[0])
+
+        path = os.path.join(tempfile.mkdtemp(), "cassette.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        # Recorded URLs look like the real API's, as they would coming from api.github.com
+        cassette.interactions = {key: {**value, "body": value["body"].replace(live.base_url, GithubData.GITHUB_API_URL),
+                                       "headers": {k: v.replace(live.base_url, GithubData.GITHUB_API_URL)
+                                                   for k, v in value["headers"].items()}}
+                                 for key, value in cassette.interactions.items()}
+        cassette.save(path)
+
+        replay = self.start(ReplayBackend(Cassette.load(path)))
+        data_source = self.use_github_data(replay)
+        with patch('builtins.print'):
+            replayed = data_source._get_all_repos(f"{data_source.BASE_URL}?per_page=100", data_source.get_headers())
+        self.assertEqual([repo["name"] for repo in replayed], [repo["name"] for repo in repos])
+        self.assertTrue(replayed[0]["contributors_url"].startswith(replay.base_url))
+        self.assertEqual(data_source.get_repo_contributors(replayed[0]), contributors)
+
+    def test_unrecorded_requests_are_not_found(self):
+        server = self.start(ReplayBackend(Cassette()))
+        data_source = self.use_github_data(server)
+        with patch('builtins.print'):
+            self.assertIsNone(data_source._safe_request(f"{server.base_url}/repos/RedHatInsights/nope/languages", {}))
+        self.assertEqual(server.stats["not_found"], 1)
+
+
+class TestFailedRefresh(StandinTestCase):
+    """A refresh whose requests fail keeps what the previous refresh stored."""
+
+    def refresh_until_rate_limited(self, resource):
+        server = self.start()
+        data_source = self.use_github_data(server)
+        resources = {resource: RESOURCES[resource]}
+        with patch('builtins.print'), patch('consolebot.refresh.print') as self.refresh_print:
+            store = refresh_repo_details(data_source=data_source, resources=resources)
+            server.rate_limit = server.used  # Every later request is answered 403 until a reset that is too far off
+            before = store.all_details()
+            refresh_repo_details(data_source=data_source, resources=resources)
+        return store, before
+
+    def test_failed_contributor_pages_keep_the_contributions(self):
+        store, before = self.refresh_until_rate_limited("contributors")
+        repo_name = next(iter(before))
+        self.assertTrue(store.get_repo_contributions(repo_name))
+        self.assertEqual(store.get_details(repo_name)["contributions"], before[repo_name]["contributions"])
+
+
+    def test_failed_language_requests_keep_the_language_index(self):
+        store, before = self.refresh_until_rate_limited("languages")
+        repo_name = next(name for name, details in before.items() if details["language_bytes"])
+        self.assertEqual({language: size for language, size, _ in store.get_repo_languages(repo_name)},
+                         before[repo_name]["language_bytes"])
+        self.assertEqual(store.get_details(repo_name)["languages"], before[repo_name]["languages"])
+
+
+    def test_failed_readme_requests_keep_the_readme_and_count_as_failures(self):
+        store, before = self.refresh_until_rate_limited("readme")
+        repo_name = next(iter(before))
+        self.assertIsNotNone(before[repo_name]["readme_sha"])
+        self.assertEqual(store.get_details(repo_name)["readme_sha"], before[repo_name]["readme_sha"])
+        self.assertEqual(store.get_details(repo_name)["readme"], before[repo_name]["readme"])
+        self.assertEqual(set(store.indexed_readmes()), {name for name, details in before.items() if details["readme_sha"]})
+        self.assertIn(f"with {len(before)} failures.", self.refresh_print.call_args_list[-3].args[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from consolebot.summaries import SummaryCache
+
+
+class TestSummaryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_dir, "summaries.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_requires_matching_sha(self):
+        cache = SummaryCache(self.path)
+        cache.put("clowder", "sha1", "An operator.")
+        self.assertEqual(cache.get("clowder", "sha1"), "An operator.")
+        self.assertIsNone(cache.get("clowder", "sha2"))
+        self.assertIsNone(cache.get("chrome", "sha1"))
+
+    def test_save_persists_across_instances(self):
+        cache = SummaryCache(self.path)
+        cache.put("clowder", "sha1", "An operator.")
+        cache.save()
+        self.assertEqual(SummaryCache(self.path).get("clowder", "sha1"), "An operator.")
+
+    def test_picks_up_summaries_written_by_another_process(self):
+        cache = SummaryCache(self.path)
+        self.assertIsNone(cache.get("clowder", "sha1"))
+        other = SummaryCache(self.path)
+        other.put("clowder", "sha1", "An operator.")
+        other.save()
+        os.utime(self.path, (0, 0))  # Make sure the mtime differs on coarse filesystems
+        self.assertEqual(cache.get("clowder", "sha1"), "An operator.")
+
+    def test_unsaved_summaries_win_over_the_file(self):
+        cache = SummaryCache(self.path)
+        cache.put("clowder", "sha1", "An operator.")
+        cache.save()
+        cache.put("clowder", "sha2", "A newer operator.")
+        other = SummaryCache(self.path)
+        other.put("chrome", "sha1", "A frontend.")
+        other.save()
+        os.utime(self.path, (0, 0))  # Make sure the mtime differs on coarse filesystems
+        self.assertEqual(cache.get("clowder", "sha2"), "A newer operator.")
+        self.assertEqual(cache.get("chrome", "sha1"), "A frontend.")
+        cache.save()
+        self.assertEqual(SummaryCache(self.path).get("clowder", "sha2"), "A newer operator.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from rich.console import Console
+
+from consolebot import lazy, tracing
+from consolebot.githubdata import GithubData
+from tests.test_githubdata import GithubDataTestCase, make_response
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tracing.enable()
+        self.addCleanup(tracing.disable)
+
+
+class TestSpans(TracingTestCase):
+
+    def test_nothing_is_recorded_when_disabled(self):
+        tracing.disable()
+        with tracing.span("stage") as span:
+            span.set(status=200)
+        tracing.enable()
+        self.assertEqual(tracing.spans(), [])
+
+    def test_nested_spans_and_attributes(self):
+        with tracing.span("outer"):
+            with tracing.span("inner", "http") as inner:
+                inner.set(status=200)
+        outer, inner = tracing.spans()
+        self.assertEqual((outer.name, outer.depth), ("outer", 0))
+        self.assertEqual((inner.name, inner.depth, inner.category), ("inner", 1, "http"))
+        self.assertEqual(inner.attributes, {"status": 200})
+        self.assertGreaterEqual(outer.duration, inner.duration)
+
+    def test_lazy_loads_are_spans(self):
+        with lazy.timed("some model"):
+            pass
+        self.assertEqual([(s.name, s.category) for s in tracing.spans()], [("some model", "load")])
+
+    def test_render_timings(self):
+        with tracing.span("determine_intent", intent="summary"):
+            pass
+        console = Console(record=True, width=200)
+        console.print(tracing.render_timings())
+        output = console.export_text()
+        self.assertIn("determine_intent", output)
+        self.assertIn("intent=summary", output)
+
+    def test_export(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with tracing.span("stage", repo="clowder"):
+            pass
+        chrome_path = os.path.join(directory, "trace.json")
+        tracing.export(chrome_path)
+        with open(chrome_path) as file:
+            event, = json.load(file)["traceEvents"]
+        self.assertEqual((event["name"], event["ph"], event["args"]), ("stage", "X", {"repo": "clowder"}))
+
+        json_path = os.path.join(directory, "spans.json")
+        tracing.export(json_path, "json")
+        with open(json_path) as file:
+            self.assertEqual(json.load(file)[0]["attributes"], {"repo": "clowder"})
+
+
+class TestRequestSpans(GithubDataTestCase):
+
+    url = "https://api.github.com/repos/RedHatInsights/clowder/languages"
+
+    def setUp(self):
+        super().setUp()
+        tracing.enable()
+        self.addCleanup(tracing.disable)
+
+    def test_request_span_records_status_bytes_and_retries(self):
+        self.use_session([make_response(502), make_response(200, b'{"Go": 100}')])
+        GithubData._safe_request(self.url, {})
+        request, = tracing.spans()
+        self.assertEqual(request.name, "GET /repos/RedHatInsights/clowder/languages")
+        self.assertEqual(request.category, "http")
+        self.assertEqual(request.attributes, {"url": self.url, "status": 200, "bytes": 11, "retries": 1})
+
+    def test_failed_request_span(self):
+        self.use_session([make_response(404)])
+        GithubData._safe_request(self.url, {})
+        self.assertEqual(tracing.spans()[0].attributes["status"], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()